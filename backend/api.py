@@ -1,12 +1,20 @@
 # backend/api.py
-from flask import Blueprint, jsonify, request, current_app, make_response, render_template, Response
-from sqlalchemy import func, desc
+from flask import Blueprint, jsonify, request, current_app, make_response, render_template, Response, redirect, stream_with_context, g, has_request_context
+from sqlalchemy import func, desc, text, literal, case
 import os, json, time, datetime as dt, yaml
+import csv, io
 import threading
 
 from .models import db, AuditEvent, Detection
+from .db_util import audit_rows_unique, has_column
 from .ingest_samples import project_root, ingest_audit
 import backend.notify as _bus  # <— canonical import for the single SSE bus
+from .sse_async import async_stream_url, async_state
+from .live_deltas import publish_scan_deltas
+from .resp_cache import cached_view, cache_stats, cache_clear, version_token
+from .search_fts import apply_text_search
+from .paging import decode_cursor, keyset_newest_first, page_with_cursor
+from . import report_snapshots
 
 # --------- Blueprints ---------
 sample_bp = Blueprint("sample_api", __name__, url_prefix="/api/sample")  # DB-backed SAMPLE mode (auto-syncs from file)
@@ -25,6 +33,9 @@ def _audit_sample_path():
 def _dashboard_sample_path():
     return os.path.join(_samples_dir(), "dashboard.json")
 
+def _dashboard_files():
+    return [_dashboard_sample_path()]
+
 def _state_path():
     return os.path.join(current_app.instance_path, "samples_state.json")
 
@@ -54,53 +65,107 @@ def _save_state(state: dict):
         json.dump(state, f)
 
 # --------- SAMPLE: auto-sync samples/audit.json -> DB ---------
+# Sync state lives in memory (seeded once from samples_state.json). Requests only compare a
+# monotonic clock; audit.json is stat'ed at most every SAMPLES_SYNC_CHECK_SEC and a change
+# is re-ingested on a background thread (responses pick it up via data_versions).
+SAMPLES_SYNC_CHECK_SEC = 2.0
+_SAMPLES_INGEST_LOCK = threading.RLock()     # re-entered by the inline first sync
+_samples_sync = {"loaded": False, "synced_mtime": 0.0, "checked_at": 0.0, "running": False,
+                 "first_running": False}
+
 def _ensure_samples_synced():
     """If samples/audit.json changed since last time, (re)ingest into DB.
-       Protected by a lock to avoid double ingestion on concurrent requests."""
-    audit_path = _audit_sample_path()
-    mtime = _file_mtime(audit_path)
-    state = _load_state()
-    last = state.get("audit_json_mtime", 0.0)
-    if mtime <= last:
+       Cheap on the hot path: no file I/O between throttled checks."""
+    st = _samples_sync
+    now = time.monotonic()
+    if st["loaded"] and not st["first_running"] and now - st["checked_at"] < SAMPLES_SYNC_CHECK_SEC:
         return
-
-    # --- Lock + re-check to prevent races ---
     with _SAMPLES_SYNC_LOCK:
-        state = _load_state()
-        last = state.get("audit_json_mtime", 0.0)
-        if mtime <= last:
+        if not st["loaded"]:
+            st["synced_mtime"] = float(_load_state().get("audit_json_mtime", 0.0) or 0.0)
+            st["loaded"] = True
+        elif not st["first_running"] and now - st["checked_at"] < SAMPLES_SYNC_CHECK_SEC:
             return
-        count = ingest_audit(current_app, audit_path)
-        state["audit_json_mtime"] = _file_mtime(audit_path)
+        wait = st["first_running"]
+        if not wait:
+            st["checked_at"] = now
+            audit_path = _audit_sample_path()
+            if st["running"] or _file_mtime(audit_path) <= st["synced_mtime"]:
+                return
+            first = st["synced_mtime"] == 0.0
+            # the first sync holds the ingest lock from here, so callers arriving meanwhile
+            # wait for it; if a rescan holds it, that rescan is the first ingest
+            wait = first and not _SAMPLES_INGEST_LOCK.acquire(blocking=False)
+            if not wait:
+                st["running"] = True
+                st["first_running"] = first
+    if wait:
+        # Never synced yet: don't read the still-empty DB while the first ingest runs
+        with _SAMPLES_INGEST_LOCK:
+            return
+    app = current_app._get_current_object()
+    if first:
+        # Never synced: ingest inline so the first page isn't served from an empty DB
+        try:
+            _run_samples_sync(app, audit_path)
+        finally:
+            st["first_running"] = False
+            _SAMPLES_INGEST_LOCK.release()
+    else:
+        threading.Thread(target=_run_samples_sync, args=(app, audit_path),
+                         name="occt-samples-sync", daemon=True).start()
+
+def _run_samples_sync(app, audit_path):
+    try:
+        with app.app_context(), _SAMPLES_INGEST_LOCK:
+            mtime = _file_mtime(audit_path)
+            if mtime <= _samples_sync["synced_mtime"]:
+                return                      # a rescan got there first
+            count = ingest_audit(app, audit_path)
+            _remember_samples_mtime(mtime)
+            print(f"[samples] synced -> DB: {count} rows from {audit_path}", flush=True)
+        publish_scan_deltas(app, "sample")
+    except Exception as e:
+        print(f"[samples] sync failed: {e}", flush=True)
+    finally:
+        _samples_sync["running"] = False
+
+def _remember_samples_mtime(mtime):
+    with _SAMPLES_SYNC_LOCK:
+        _samples_sync.update({"loaded": True, "synced_mtime": mtime})
+        state = _load_state()
+        state["audit_json_mtime"] = mtime
         _save_state(state)
-        current_app.logger.info(f"Samples synced -> DB: {count} rows from {audit_path}")
 
 def _force_reingest_samples():
     """Always (re)ingest samples/audit.json into DB, ignoring mtime."""
     audit_path = _audit_sample_path()
-    count = ingest_audit(current_app, audit_path)
-    state = _load_state()
-    state["audit_json_mtime"] = _file_mtime(audit_path)
-    _save_state(state)
+    with _SAMPLES_INGEST_LOCK:
+        mtime = _file_mtime(audit_path)
+        count = ingest_audit(current_app, audit_path)
+        _remember_samples_mtime(mtime)
     return count
 
-# --------- SQLA helpers ---------
-def _has_column(model, colname: str) -> bool:
-    try:
-        from sqlalchemy import inspect
-        return colname in [c.key for c in inspect(model).c]
-    except Exception:
-        return False
+# --------- Per-request memo (flask.g): shared intermediates computed once per request ---------
+def _request_memo(key, fn):
+    memo = g.setdefault("occt_memo", {})
+    if key not in memo:
+        memo[key] = fn()
+    return memo[key]
 
 # --------- Unique rows query (API-level dedupe) ---------
-def _unique_rows_query(*, category=None, outcome=None, date_from=None, date_to=None, q=None):
+def _request_mode():
     # Decide dataset by blueprint (sample_api vs live_api vs api(alias->sample))
-    mode = "live" if (request.blueprint == "live_api") else "sample"
+    return "live" if (request.blueprint == "live_api") else "sample"
+
+def _unique_rows_query(*, mode=None, category=None, outcome=None, date_from=None, date_to=None, q=None):
+    # mode is explicit for background callers (no request context), else taken from the blueprint
+    mode = mode or _request_mode()
 
     base = db.session.query(AuditEvent)
 
     # Filter by source only if column exists
-    if _has_column(AuditEvent, "source"):
+    if has_column(AuditEvent.__tablename__, "source"):
         base = base.filter(AuditEvent.source == mode)
 
     # Filters
@@ -113,14 +178,18 @@ def _unique_rows_query(*, category=None, outcome=None, date_from=None, date_to=N
     if date_to:
         base = base.filter(AuditEvent.time <= dt.datetime.fromisoformat(date_to + "T23:59:59"))
     if q:
-        like = f"%{q.strip().lower()}%"
-        base = base.filter(
-            (func.lower(AuditEvent.description).like(like)) |
-            (func.lower(AuditEvent.control).like(like)) |
-            (func.lower(AuditEvent.account).like(like))
+        base, _ = apply_text_search(base, AuditEvent, q,
+                                    [AuditEvent.description, AuditEvent.control, AuditEvent.account])
+
+    # ux_audit_events_unique already keeps one row per (source, time, category, control,
+    # outcome, account, description): plain (index-backed) select, no GROUP BY.
+    if audit_rows_unique():
+        return base.with_entities(
+            AuditEvent.id, AuditEvent.time, AuditEvent.category, AuditEvent.control,
+            AuditEvent.outcome, AuditEvent.account, AuditEvent.description
         )
 
-    # Dedupe by (time, category, control, outcome, account, description)
+    # Fallback: dedupe by (time, category, control, outcome, account, description)
     sub = base.subquery()
     uq = db.session.query(
         func.min(sub.c.id).label("id"),
@@ -130,37 +199,101 @@ def _unique_rows_query(*, category=None, outcome=None, date_from=None, date_to=N
     )
     return uq
 
-def _unique_count():
-    uq_sub = _unique_rows_query().subquery()
+def _unique_count(mode=None):
+    uq_sub = _unique_rows_query(mode=mode).subquery()
     return db.session.query(func.count()).select_from(uq_sub).scalar() or 0
 
-def _unique_failed_count():
-    uq_sub = _unique_rows_query().subquery()
+def _unique_failed_count(mode=None):
+    uq_sub = _unique_rows_query(mode=mode).subquery()
     return db.session.query(func.count()).select_from(uq_sub).filter(uq_sub.c.outcome == "Failed").scalar() or 0
 
 # --------- Dashboard builder (summary from unique rows; monthly DB fallback + optional override) ---------
-def _build_dashboard_json_with_optional_override():
-    total_unique  = _unique_count()
-    failed_unique = _unique_failed_count()
+def _compliance_summary(mode=None):
+    if has_request_context():
+        mode = mode or _request_mode()
+        return dict(_request_memo(("compliance_summary", mode), lambda: _compliance_summary_uncached(mode)))
+    return _compliance_summary_uncached(mode)
+
+def _compliance_summary_uncached(mode=None):
+    total_unique  = _unique_count(mode)
+    failed_unique = _unique_failed_count(mode)
     passed_unique = max(total_unique - failed_unique, 0)
 
     compliant_percent     = round((passed_unique / total_unique) * 100, 2) if total_unique else 0.0
     non_compliant_percent = round(100.0 - compliant_percent, 2)
+    return {
+        "compliant_percent": compliant_percent,
+        "non_compliant_percent": non_compliant_percent,
+        "passed_count": passed_unique,
+        "failed_count": failed_unique,
+        "total_checks": total_unique
+    }
+
+def _arg_int(name, default, lo, hi):
+    try:
+        return max(lo, min(int(request.args.get(name, default)), hi))
+    except (TypeError, ValueError):
+        return default
+
+def _month_start(d, back=0):
+    m = d.year * 12 + d.month - 1 - back
+    return dt.date(m // 12, m % 12 + 1, 1)
+
+def _rollup_series(mode, unit="month", count=6):
+    """
+    Compliance per month/week for the last `count` buckets ending at this source's newest
+    row, from audit_rollup_daily in one grouped query. Empty buckets are reported as 0.
+    """
+    last = db.session.execute(
+        text("SELECT max(day) FROM audit_rollup_daily WHERE source = :s AND n > 0"), {"s": mode}
+    ).scalar()
+    if not last:
+        return []
+    last = dt.date.fromisoformat(last)
+    if unit == "week":
+        monday = last - dt.timedelta(days=last.weekday())
+        starts = [monday - dt.timedelta(weeks=i) for i in range(count - 1, -1, -1)]
+        bucket_of = lambda d: d - dt.timedelta(days=d.weekday())
+    else:
+        starts = [_month_start(last, i) for i in range(count - 1, -1, -1)]
+        bucket_of = lambda d: d.replace(day=1)
+    # Per-day sums (covering index range scan); bucketing happens here, not per row in SQL
+    rows = db.session.execute(text("""
+        SELECT day, SUM(n), SUM(CASE WHEN outcome = 'Failed' THEN n ELSE 0 END)
+        FROM audit_rollup_daily
+        WHERE source = :s AND day >= :lo AND day <= :hi
+        GROUP BY day
+    """), {"s": mode, "lo": starts[0].isoformat(), "hi": last.isoformat()}).all()
+    by_bucket = {}
+    for day, total, failed in rows:
+        b = bucket_of(dt.date.fromisoformat(day))
+        t0, f0 = by_bucket.get(b, (0, 0))
+        by_bucket[b] = (t0 + int(total or 0), f0 + int(failed or 0))
+
+    out = []
+    for start in starts:
+        mtotal, mfailed = by_bucket.get(start, (0, 0))
+        if mtotal > 0:
+            comp_pct = round((max(mtotal - mfailed, 0) / mtotal) * 100, 2)
+            nonc_pct = round(100.0 - comp_pct, 2)
+        else:
+            comp_pct = nonc_pct = 0.0
+        label = {"week": start.isoformat()} if unit == "week" else {"month": start.strftime("%Y-%m")}
+        out.append({**label, "compliant": comp_pct, "noncompliant": nonc_pct})
+    return out
 
-    # Default monthly from UNIQUE DB rows
+def _monthly_from_unique_rows(mode, count=6):
+    # Fallback when audit_events isn't deduplicated by index (rollup would count duplicates)
     months = []
-    min_dt = db.session.query(func.min(AuditEvent.time)).scalar()
-    max_dt = db.session.query(func.max(AuditEvent.time)).scalar()
+    bounds = db.session.query(func.min(AuditEvent.time), func.max(AuditEvent.time))
+    if has_column(AuditEvent.__tablename__, "source"):
+        bounds = bounds.filter(AuditEvent.source == mode)
+    min_dt, max_dt = bounds.one()
     if min_dt and max_dt:
-        uq_all = _unique_rows_query().subquery()
-        cursor = dt.datetime(max_dt.year, max_dt.month, 1)
-        for _ in range(6):
-            mstart = cursor
-            mend = dt.datetime(
-                cursor.year + (1 if cursor.month == 12 else 0),
-                1 if cursor.month == 12 else cursor.month + 1,
-                1
-            )
+        uq_all = _unique_rows_query(mode=mode).subquery()
+        for back in range(count - 1, -1, -1):
+            mstart = dt.datetime.combine(_month_start(max_dt, back), dt.time())
+            mend = dt.datetime.combine(_month_start(max_dt, back - 1), dt.time())
             mtotal  = db.session.query(func.count()).select_from(uq_all)\
                         .filter(uq_all.c.time >= mstart, uq_all.c.time < mend).scalar() or 0
             mfailed = db.session.query(func.count()).select_from(uq_all)\
@@ -178,24 +311,25 @@ def _build_dashboard_json_with_optional_override():
                 "compliant": comp_pct,
                 "noncompliant": nonc_pct
             })
+    return months
+
+def _build_dashboard_json_with_optional_override():
+    mode = _request_mode()
+    summary = _compliance_summary(mode)
 
-            cursor = dt.datetime(
-                cursor.year - (1 if cursor.month == 1 else 0),
-                12 if cursor.month == 1 else cursor.month - 1,
-                1
-            )
-        months.reverse()
+    # Monthly (and optional weekly) trend from the daily rollup; ?months=N, ?bucket=week&weeks=N
+    n_months = _arg_int("months", 6, 1, 120)
+    if audit_rows_unique():
+        months = _rollup_series(mode, "month", n_months)
+    else:
+        months = _monthly_from_unique_rows(mode, n_months)
 
     payload = {
-        "summary": {
-            "compliant_percent": compliant_percent,
-            "non_compliant_percent": non_compliant_percent,
-            "passed_count": passed_unique,
-            "failed_count": failed_unique,
-            "total_checks": total_unique
-        },
+        "summary": summary,
         "monthly": months
     }
+    if request.args.get("bucket") == "week" and audit_rows_unique():
+        payload["weekly"] = _rollup_series(mode, "week", _arg_int("weeks", 12, 1, 520))
 
     # If samples/dashboard.json exists, override monthly (and optional summary)
     dash_path = _dashboard_sample_path()
@@ -220,8 +354,34 @@ def _build_dashboard_json_with_optional_override():
     return payload
 
 # --------- Remediation overview (unique failed only) ---------
-def _build_remediation_overview():
-    uq = _unique_rows_query().subquery()
+def _build_remediation_overview(mode=None):
+    mode = mode or _request_mode()
+    if audit_rows_unique():
+        return _remediation_from_rollups(mode)
+    return _remediation_from_unique_rows(mode)
+
+def _remediation_from_rollups(mode):
+    """Same payload from the trigger-maintained failed counts (db_util.ensure_failed_rollups)."""
+    by_cat = db.session.execute(text("""
+        SELECT category, SUM(n) AS n FROM audit_failed_controls
+        WHERE source = :s GROUP BY category ORDER BY n DESC, category
+    """), {"s": mode}).all()
+    by_ctrl = db.session.execute(text("""
+        SELECT control, SUM(n) AS n FROM audit_failed_controls
+        WHERE source = :s GROUP BY control ORDER BY n DESC, control LIMIT 10
+    """), {"s": mode}).all()
+    # ix_audit_source_outcome_time: newest ten failures are a short index walk
+    recent = db.session.query(
+        AuditEvent.time, AuditEvent.category, AuditEvent.control, AuditEvent.account, AuditEvent.description
+    ).filter(AuditEvent.source == mode, AuditEvent.outcome == "Failed"
+    ).order_by(desc(AuditEvent.time)).limit(10).all()
+    accounts = db.session.execute(text(
+        "SELECT COUNT(*) FROM audit_failed_accounts WHERE source = :s AND account <> ''"
+    ), {"s": mode}).scalar() or 0
+    return _remediation_payload(by_cat, by_ctrl, recent, accounts)
+
+def _remediation_from_unique_rows(mode):
+    uq = _unique_rows_query(mode=mode).subquery()
     # counts by category (Failed)
     by_cat = db.session.query(
         uq.c.category, func.count().label("n")
@@ -241,7 +401,9 @@ def _build_remediation_overview():
     accounts = db.session.query(func.count(func.distinct(uq.c.account))).filter(
         uq.c.outcome == "Failed", uq.c.account.isnot(None), uq.c.account != ""
     ).scalar() or 0
+    return _remediation_payload(by_cat, by_ctrl, recent, accounts)
 
+def _remediation_payload(by_cat, by_ctrl, recent, accounts):
     return {
         "by_category": [{"category": c or "(Uncategorized)", "failed": int(n)} for c, n in by_cat],
         "top_controls": [{"control": c or "(N/A)", "failed": int(n)} for c, n in by_ctrl],
@@ -261,7 +423,12 @@ def _resp_json(obj, *, source_header="db-sample", dashboard_source=None, status=
     return resp
 
 # --------- Core responder for audit list (UNIQUE rows only) ---------
-def _build_audit_list_from_unique():
+AUDIT_PAGE_DEFAULT = 500
+AUDIT_PAGE_MAX = 5000
+AUDIT_EXPORT_COLS = ("id", "time", "category", "control", "outcome", "account", "description")
+
+def _audit_rows_ordered(after=None):
+    """Unique audit rows for the request's filters, newest first, keyset on (time, id)."""
     q        = (request.args.get("q") or "").strip()
     category = request.args.get("category")
     outcome  = request.args.get("outcome")
@@ -279,20 +446,78 @@ def _build_audit_list_from_unique():
     rows = db.session.query(
         uq.c.id, uq.c.time, uq.c.category, uq.c.control,
         uq.c.outcome, uq.c.account, uq.c.description
-    ).order_by(desc(uq.c.time)).limit(500).all()
+    )
+    return keyset_newest_first(rows, uq.c.time, uq.c.id, after)
 
-    out = []
-    for r in rows:
-        out.append({
-            "id": r.id,
-            "time": r.time.isoformat() + "Z" if r.time else None,
-            "category": r.category,
-            "control": r.control,
-            "outcome": r.outcome,
-            "account": r.account,
-            "description": r.description,
-        })
-    return out
+def _audit_row_dict(r):
+    return {
+        "id": r.id,
+        "time": r.time.isoformat() + "Z" if r.time else None,
+        "category": r.category,
+        "control": r.control,
+        "outcome": r.outcome,
+        "account": r.account,
+        "description": r.description,
+    }
+
+def _build_audit_list_from_unique(limit=AUDIT_PAGE_DEFAULT, after=None):
+    """One page of rows plus the cursor for the next page (None on the last page)."""
+    rows, next_cursor = page_with_cursor(_audit_rows_ordered(after), limit, "time")
+    return [_audit_row_dict(r) for r in rows], next_cursor
+
+def _audit_export_response(fmt, source_header):
+    """Stream the whole filtered set (no page cap) as NDJSON or CSV, batch by batch."""
+    query = _audit_rows_ordered().yield_per(1000)
+
+    def ndjson():
+        for r in query:
+            yield json.dumps(_audit_row_dict(r), ensure_ascii=False) + "\n"
+
+    def csv_rows():
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(AUDIT_EXPORT_COLS)
+        for n, r in enumerate(query, 1):
+            d = _audit_row_dict(r)
+            w.writerow([d[c] for c in AUDIT_EXPORT_COLS])
+            if n % 500 == 0:
+                yield buf.getvalue()
+                buf.seek(0); buf.truncate()
+        yield buf.getvalue()
+
+    if fmt == "csv":
+        resp = Response(stream_with_context(csv_rows()), mimetype="text/csv")
+        fname = f"occt-audit-{_request_mode()}-{dt.datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.csv"
+        resp.headers["Content-Disposition"] = f'attachment; filename="{fname}"'
+    else:
+        resp = Response(stream_with_context(ndjson()), mimetype="application/x-ndjson")
+    resp.headers["X-OCCT-Source"] = source_header
+    return resp
+
+def _audit_response(source_header):
+    """
+    GET .../audit
+      ?limit=N (default 500, max 5000) &cursor=<X-OCCT-Next-Cursor of previous page>
+      ?format=ndjson|csv streams every matching row instead of one page.
+    Body stays a JSON array; the next-page cursor travels in the X-OCCT-Next-Cursor header.
+    """
+    fmt = (request.args.get("format") or "").lower()
+    if fmt in ("ndjson", "csv"):
+        return _audit_export_response(fmt, source_header)
+
+    after = None
+    if request.args.get("cursor"):
+        try:
+            after = decode_cursor(request.args["cursor"])
+        except Exception:
+            return _resp_json({"error": "bad_cursor"}, source_header=source_header, status=400)
+    limit = _arg_int("limit", AUDIT_PAGE_DEFAULT, 1, AUDIT_PAGE_MAX)
+
+    rows, next_cursor = _build_audit_list_from_unique(limit, after)
+    resp = _resp_json(rows, source_header=source_header)
+    if next_cursor:
+        resp.headers["X-OCCT-Next-Cursor"] = next_cursor
+    return resp
 
 # ===================== WEIGHTED COMPLIANCE =====================
 
@@ -306,10 +531,17 @@ def _candidate_controls_paths():
         os.path.join(project_root(), "config", "controls.yml"),
         os.path.join(project_root(), "controls.yml"),
     ]
-    # First existing path wins
-    return [p for p in roots if os.path.exists(p)]
+    # First existing path wins; the same file reached through two roots is listed once
+    # (the list keys cached_view and the severity-index memo, so each entry is stat'ed)
+    seen, out = set(), []
+    for p in roots:
+        real = os.path.realpath(p)
+        if real not in seen and os.path.exists(real):
+            seen.add(real)
+            out.append(real)
+    return out
 
-def _rules_severity_index():
+def _load_rules_severity_index():
     """
     Return {<id or title lower>: 'low'|'medium'|'high'|'critical'} from controls.yml.
     Works with list or dict YAML layouts. Falls back to 'low' if unknown.
@@ -365,12 +597,35 @@ def _rules_severity_index():
             continue
     return index  # may be empty
 
+_SEV_INDEX_MEMO = {"version": None, "index": {}}
+
+def _rules_version():
+    """(path, mtime, size) of every candidate controls file; changes when a rules file does."""
+    out = []
+    for p in _candidate_controls_paths():
+        try:
+            st = os.stat(p)
+            out.append((p, st.st_mtime_ns, st.st_size))
+        except OSError:
+            pass
+    return tuple(out)
+
+def _rules_severity_index():
+    """Memoized _load_rules_severity_index(), re-parsed only when the rules files change."""
+    version = _rules_version()
+    memo = _SEV_INDEX_MEMO
+    if memo["version"] != version:
+        memo["index"] = _load_rules_severity_index()
+        memo["version"] = version
+    return memo["index"]
+
 def _compute_weighted_compliance():
     """
     Risk-weighted compliance:
       - Each PASS contributes 1 unit.
       - Each FAIL contributes severity-weight units (low=1, med=2, high=3, critical=4).
     Score = 100 * P / (P + weighted_fail_units)
+    One aggregate over the unique rows; control -> severity is a CASE built from controls.yml.
     """
     weights = {"low": 1, "medium": 2, "high": 3, "critical": 4}
 
@@ -378,22 +633,32 @@ def _compute_weighted_compliance():
     sev_index = _rules_severity_index()
 
     uq = _unique_rows_query().subquery()
-    rows = db.session.query(uq.c.control, uq.c.outcome).all()
-
-    pass_units = 0                      # 1 per pass
-    fail_units = {"low": 0, "medium": 0, "high": 0, "critical": 0}  # weighted by severity
-
-    for control, outcome in rows:
-        key = (control or "").strip().lower()
-        sev = sev_index.get(key, "low")
-        w = weights.get(sev, 1)
-
-        if (outcome or "").lower() == "failed":
-            fail_units[sev] = fail_units.get(sev, 0) + w  # severity-weighted
-        else:
-            pass_units += 1                               # unweighted pass
-
-    denom = pass_units + sum(fail_units.values())
+    # Count per (control, outcome) first so the control -> severity CASE runs once per
+    # distinct control, not once per row; the outer query folds it into one row.
+    per_ctrl = db.session.query(
+        uq.c.control.label("control"),
+        (func.lower(func.coalesce(uq.c.outcome, "")) == "failed").label("failed"),
+        func.count().label("n"),
+    ).group_by(uq.c.control, uq.c.outcome).subquery()
+    control_key = func.lower(func.trim(func.coalesce(per_ctrl.c.control, "")))
+    sev = case(sev_index, value=control_key, else_="low") if sev_index else literal("low")
+    per_row = db.session.query(sev.label("sev"), per_ctrl.c.failed, per_ctrl.c.n).subquery()
+
+    def fail_units_for(name):
+        return func.sum(case(((per_row.c.failed == 1) & (per_row.c.sev == name), per_row.c.n * weights[name]), else_=0))
+
+    row = db.session.query(
+        func.sum(case((per_row.c.failed == 1, 0), else_=per_row.c.n)),
+        *[fail_units_for(name) for name in weights],
+        # unknown severities count 1 unit each (not shown per bucket)
+        func.sum(case(((per_row.c.failed == 1) & per_row.c.sev.notin_(list(weights)), per_row.c.n), else_=0)),
+    ).one()
+
+    pass_units = int(row[0] or 0)                                   # 1 per pass
+    fail_units = {name: int(v or 0) for name, v in zip(weights, row[1:5])}
+    fail_other = int(row[5] or 0)
+
+    denom = pass_units + sum(fail_units.values()) + fail_other
     score = round((pass_units / denom) * 100) if denom else 0
 
     return {
@@ -410,23 +675,88 @@ def _compute_weighted_compliance():
     }
 
 
+# --------- Report (rendered once per data version; see report_snapshots.py) ---------
+def _render_report_html(mode, generated_at):
+    dash = _build_dashboard_json_with_optional_override()
+    rem  = _build_remediation_overview(mode)
+    return render_template(
+        "report.html",
+        dashboard=dash,
+        remediation=rem,
+        generated_at=generated_at,
+        mode=mode
+    )
+
+def _report_response(mode):
+    row = report_snapshots.ensure_snapshot(current_app._get_current_object(), mode)
+    return report_snapshots.snapshot_response(row, download=request.args.get("download") == "1")
+
+def _snapshot_by_id(mode, snapshot_id):
+    row = report_snapshots.find_snapshot(mode, snapshot_id)
+    if not row:
+        return _resp_json({"error": "not_found"}, source_header=f"db-{mode}", status=404)
+    return report_snapshots.snapshot_response(row, download=request.args.get("download") == "1")
+
+# --------- Page bootstrap (one request, one data version) ---------
+BOOTSTRAP_PARTS = ("dashboard", "audit", "rules", "last_scan", "weighted")
+BOOTSTRAP_DEFAULT = ("dashboard", "audit", "rules")
+
+def _bootstrap_files():
+    from .live_facts import RULES_PATH
+    return _dashboard_files() + _candidate_controls_paths() + [RULES_PATH]
+
+def _bootstrap_rules(mode):
+    # same rule list as GET /rules, which both blueprints serve (attach_live_rules_api)
+    from .live_facts import rules_for_ui
+    try:
+        return rules_for_ui()
+    except Exception:
+        return []
+
+def _build_bootstrap(mode):
+    """
+    ?include=dashboard,audit,rules,last_scan,weighted (default: dashboard,audit,rules);
+    audit honours the same filters/limit as /audit. Parts are built against one data
+    version: if a write lands meanwhile, the bundle is rebuilt (up to 3 tries).
+    """
+    wanted = [p for p in (request.args.get("include") or ",".join(BOOTSTRAP_DEFAULT)).split(",") if p in BOOTSTRAP_PARTS]
+    for _ in range(3):
+        g.pop("occt_memo", None)
+        version = version_token(("audit",), mode)
+        out = {"mode": mode}
+        if "dashboard" in wanted:
+            out["dashboard"] = _build_dashboard_json_with_optional_override()
+        if "audit" in wanted:
+            out["audit"], out["audit_next_cursor"] = _build_audit_list_from_unique(
+                _arg_int("limit", AUDIT_PAGE_DEFAULT, 1, AUDIT_PAGE_MAX))
+        if "rules" in wanted:
+            out["rules"] = _bootstrap_rules(mode)
+        if "last_scan" in wanted:
+            out["last_scan"] = _last_scan_stats(mode)
+        if "weighted" in wanted:
+            out["weighted"] = _compute_weighted_compliance()
+        if version_token(("audit",), mode) == version:
+            break
+    out["data_version"] = version
+    return out
+
 # --------- SAMPLE endpoints (/api/sample/*) ---------
 @sample_bp.get("/dashboard")
+@cached_view(prepare=_ensure_samples_synced, files=_dashboard_files)
 def sample_dashboard():
-    _ensure_samples_synced()
     payload = _build_dashboard_json_with_optional_override()
     dash_src = "file-dashboard" if payload.get("_note_monthly") else "db"
     return _resp_json(payload, source_header="db-sample", dashboard_source=dash_src)
 
 @sample_bp.get("/audit")
+@cached_view(prepare=_ensure_samples_synced)
 def sample_audit():
-    _ensure_samples_synced()
-    rows = _build_audit_list_from_unique()
-    return _resp_json(rows, source_header="db-sample")
+    return _audit_response("db-sample")
 
 @sample_bp.post("/rescan")
 def sample_rescan():
     n = _force_reingest_samples()
+    publish_scan_deltas(current_app._get_current_object(), "sample")
     total_unique  = _unique_count()
     failed_unique = _unique_failed_count()
     return _resp_json({
@@ -437,167 +767,172 @@ def sample_rescan():
 @sample_bp.get("/report")
 def sample_report():
     _ensure_samples_synced()
-    dash = _build_dashboard_json_with_optional_override()
-    rem  = _build_remediation_overview()
-    html = render_template(
-        "report.html",
-        dashboard=dash,
-        remediation=rem,
-        generated_at=dt.datetime.utcnow(),
-        mode="sample"
-    )
-    resp = make_response(html, 200)
-    if request.args.get("download") == "1":
-        fname = f"occt-report-{dt.datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.html"
-        resp.headers["Content-Disposition"] = f'attachment; filename="{fname}"'
-    resp.headers["Content-Type"] = "text/html; charset=utf-8"
-    return resp
+    return _report_response("sample")
 
-@sample_bp.get("/last-scan")
-def sample_last_scan():
-    _ensure_samples_synced()
-    # Latest timestamp (for display only)
-    q = db.session.query(func.max(AuditEvent.time))
-    if _has_column(AuditEvent, "source"):
+@sample_bp.get("/report/snapshots")
+def sample_report_snapshots():
+    return _resp_json(report_snapshots.list_snapshots("sample"), source_header="db-sample")
+
+@sample_bp.get("/report/snapshots/<int:snapshot_id>")
+def sample_report_snapshot(snapshot_id):
+    return _snapshot_by_id("sample", snapshot_id)
+
+_NO_SCAN = {"has_data": False, "completed_at": None, "event_count": 0, "failed_count": 0, "host_count": 0}
+
+_NON_HOST_ACCOUNTS = ("domain", "ad-policy", "ad policy", "adpolicy", "admingroup", "all users")
+
+def _sample_last_scan_stats():
+    # One aggregate over the sample rows: latest time (display only), totals, and distinct
+    # hosts (host column, else a host-like account: single word, not a policy/group name).
+    host = func.trim(func.coalesce(AuditEvent.host, ""))
+    acct = func.trim(func.coalesce(AuditEvent.account, ""))
+    host_key = case(
+        (host != "", host),
+        ((acct != "") & (func.instr(acct, " ") == 0) & func.lower(acct).notin_(_NON_HOST_ACCOUNTS), acct),
+        else_=None,
+    )
+    q = db.session.query(
+        func.max(AuditEvent.time),
+        func.count(AuditEvent.id),
+        func.sum(case((func.lower(AuditEvent.outcome) == "failed", 1), else_=0)),
+        func.count(func.distinct(host_key)),
+    )
+    if has_column(AuditEvent.__tablename__, "source"):
         q = q.filter(AuditEvent.source == "sample")
-    t = q.scalar()
+    t, total_events, failed_events, host_count = q.one()
 
     if not t:
-        return _resp_json({
-            "has_data": False,
-            "completed_at": None,
-            "event_count": 0,
-            "failed_count": 0,
-            "host_count": 0
-        }, source_header="db-sample")
-
-    # Totals across sample dataset
-    q_total = db.session.query(func.count(AuditEvent.id))
-    q_failed = db.session.query(func.count(AuditEvent.id)).filter(func.lower(AuditEvent.outcome) == "failed")
-    q_rows = db.session.query(AuditEvent.host, AuditEvent.account)
-
-    if _has_column(AuditEvent, "source"):
-        q_total  = q_total.filter(AuditEvent.source == "sample")
-        q_failed = q_failed.filter(AuditEvent.source == "sample")
-        q_rows   = q_rows.filter(AuditEvent.source == "sample")
-
-    total_events  = q_total.scalar() or 0
-    failed_events = q_failed.scalar() or 0
-
-    rows = q_rows.all()
-    NON_HOST_ACCOUNTS = {"domain", "ad-policy", "ad policy", "adpolicy", "admingroup".lower(), "all users"}
-    host_set = set()
-    for h, a in rows:
-        h = (h or "").strip()
-        a = (a or "").strip()
-        if h:
-            host_set.add(h)
-            continue
-        if a and " " not in a and a.lower() not in NON_HOST_ACCOUNTS:
-            host_set.add(a)
+        return dict(_NO_SCAN)
 
-    return _resp_json({
+    return {
         "has_data": True,
         "completed_at": t.isoformat() + "Z",
-        "event_count": int(total_events),
-        "failed_count": int(failed_events),
-        "host_count": int(len(host_set))
-    }, source_header="db-sample")
+        "event_count": int(total_events or 0),
+        "failed_count": int(failed_events or 0),
+        "host_count": int(host_count or 0)
+    }
+
+@sample_bp.get("/bootstrap")
+@cached_view(prepare=_ensure_samples_synced, files=_bootstrap_files)
+def sample_bootstrap():
+    return _resp_json(_build_bootstrap("sample"), source_header="db-sample")
+
+@sample_bp.get("/last-scan")
+@cached_view(prepare=_ensure_samples_synced)
+def sample_last_scan():
+    return _resp_json(_sample_last_scan_stats(), source_header="db-sample")
 
 # ---- Weighted compliance (sample) ----
 @sample_bp.get("/weighted-compliance")
+@cached_view(prepare=_ensure_samples_synced, files=_candidate_controls_paths)
 def sample_weighted_compliance():
-    _ensure_samples_synced()
     payload = _compute_weighted_compliance()
     return _resp_json(payload, source_header="db-sample")
 
 # --------- /api/* alias (same as sample so UI keeps working) ---------
 @api_bp.get("/dashboard")
+@cached_view(prepare=_ensure_samples_synced, files=_dashboard_files)
 def alias_dashboard():
-    _ensure_samples_synced()
     payload = _build_dashboard_json_with_optional_override()
     dash_src = "file-dashboard" if payload.get("_note_monthly") else "db"
     return _resp_json(payload, source_header="db-sample", dashboard_source=dash_src)
 
 @api_bp.get("/audit")
+@cached_view(prepare=_ensure_samples_synced)
 def alias_audit():
-    _ensure_samples_synced()
-    rows = _build_audit_list_from_unique()
-    return _resp_json(rows, source_header="db-sample")
+    return _audit_response("db-sample")
 
 @api_bp.post("/rescan")
 def alias_rescan():
     return sample_rescan()
 
+@api_bp.get("/bootstrap")
+@cached_view(prepare=_ensure_samples_synced, files=_bootstrap_files)
+def alias_bootstrap():
+    return _resp_json(_build_bootstrap("sample"), source_header="db-sample")
+
 @api_bp.get("/report")
 def alias_report():
     return sample_report()
 
 # ---- Weighted compliance (alias) ----
 @api_bp.get("/weighted-compliance")
+@cached_view(prepare=_ensure_samples_synced, files=_candidate_controls_paths)
 def alias_weighted_compliance():
-    _ensure_samples_synced()
     payload = _compute_weighted_compliance()
     return _resp_json(payload, source_header="db-sample")
 
 # --------- LIVE endpoints (/api/live/*) ---------
 @live_bp.get("/dashboard")
+@cached_view(files=_dashboard_files)
 def live_dashboard():
     payload = _build_dashboard_json_with_optional_override()
     dash_src = "file-dashboard" if payload.get("_note_monthly") else "db"
     return _resp_json(payload, source_header="db-live", dashboard_source=dash_src)
 
 @live_bp.get("/audit")
+@cached_view()
 def live_audit():
-    rows = _build_audit_list_from_unique()
-    return _resp_json(rows, source_header="db-live")
+    return _audit_response("db-live")
 
 @live_bp.get("/report")
 def live_report():
-    dash = _build_dashboard_json_with_optional_override()
-    rem  = _build_remediation_overview()
-    html = render_template(
-        "report.html",
-        dashboard=dash,
-        remediation=rem,
-        generated_at=dt.datetime.utcnow(),
-        mode="live"
-    )
-    resp = make_response(html, 200)
-    if request.args.get("download") == "1":
-        fname = f"occt-report-{dt.datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.html"
-        resp.headers["Content-Disposition"] = f'attachment; filename="{fname}"'
-    resp.headers["Content-Type"] = "text/html; charset=utf-8"
-    return resp
+    return _report_response("live")
 
-@live_bp.get("/last-scan")
-def live_last_scan():
-    # Most recent minute bucket for live
+@live_bp.get("/report/snapshots")
+def live_report_snapshots():
+    return _resp_json(report_snapshots.list_snapshots("live"), source_header="db-live")
+
+@live_bp.get("/report/snapshots/<int:snapshot_id>")
+def live_report_snapshot(snapshot_id):
+    return _snapshot_by_id("live", snapshot_id)
+
+def _live_last_scan_stats():
+    # Most recent minute bucket for live; counted in SQL over the (source, time) index range
     q = db.session.query(func.max(AuditEvent.time))
-    if _has_column(AuditEvent, "source"):
+    if has_column(AuditEvent.__tablename__, "source"):
         q = q.filter(AuditEvent.source == "live")
     t = q.scalar()
     if not t:
-        return _resp_json({"has_data": False, "completed_at": None, "event_count": 0, "failed_count": 0, "host_count": 0}, source_header="db-live")
+        return dict(_NO_SCAN)
 
     start = t.replace(second=0, microsecond=0)
     end   = start + dt.timedelta(minutes=1)
 
-    rows_q = db.session.query(AuditEvent).filter(AuditEvent.time >= start, AuditEvent.time < end)
-    if _has_column(AuditEvent, "source"):
-        rows_q = rows_q.filter(AuditEvent.source == "live")
-    rows = rows_q.all()
+    host = func.trim(func.coalesce(AuditEvent.host, ""))
+    stats_q = db.session.query(
+        func.count(AuditEvent.id),
+        func.sum(case((func.lower(AuditEvent.outcome) == "failed", 1), else_=0)),
+        func.count(func.distinct(case((host != "", host), else_=None))),
+    ).filter(AuditEvent.time >= start, AuditEvent.time < end)
+    if has_column(AuditEvent.__tablename__, "source"):
+        stats_q = stats_q.filter(AuditEvent.source == "live")
+    event_count, failed_count, host_count = stats_q.one()
 
-    return _resp_json({
+    return {
         "has_data": True,
         "completed_at": t.isoformat() + "Z",
-        "event_count": len(rows),
-        "failed_count": sum(1 for r in rows if (r.outcome or "").lower() == "failed"),
-        "host_count": len({(r.host or "").strip() for r in rows if (r.host or "").strip()}),
-    }, source_header="db-live")
+        "event_count": int(event_count or 0),
+        "failed_count": int(failed_count or 0),
+        "host_count": int(host_count or 0),
+    }
+
+def _last_scan_stats(mode):
+    return _live_last_scan_stats() if mode == "live" else _sample_last_scan_stats()
+
+@live_bp.get("/bootstrap")
+@cached_view(files=_bootstrap_files)
+def live_bootstrap():
+    return _resp_json(_build_bootstrap("live"), source_header="db-live")
+
+@live_bp.get("/last-scan")
+@cached_view()
+def live_last_scan():
+    return _resp_json(_live_last_scan_stats(), source_header="db-live")
 
 # ---- Weighted compliance (live) ----
 @live_bp.get("/weighted-compliance")
+@cached_view(files=_candidate_controls_paths)
 def live_weighted_compliance():
     payload = _compute_weighted_compliance()
     return _resp_json(payload, source_header="db-live")
@@ -605,10 +940,18 @@ def live_weighted_compliance():
 # --------- REAL-TIME SSE stream (LIVE) ---------
 @live_bp.get("/stream")
 def live_stream():
-    """Server-Sent Events: stream detections to the UI in real time (no replay)."""
+    """Server-Sent Events: stream detections to the UI in real time (no replay).
+    Accepts server-side filters so clients only receive what they display."""
     import os
+    # Hand the connection to the asyncio sidecar when it runs (no thread pinned per client)
+    target = async_stream_url(request.host_url)
+    if target:
+        qs = request.query_string.decode("latin-1")
+        return redirect(target + ("?" + qs if qs else ""), code=307)
     pid = os.getpid()
-    resp = Response(_bus.sse_stream(), mimetype="text/event-stream")
+    # Optional server-side filters: ?min_severity=high&rule_id=A,B&host=H&account=U
+    filters = _bus.SubscriptionFilter.from_args(request.args)
+    resp = Response(_bus.sse_stream(filters), mimetype="text/event-stream")
     resp.headers["Cache-Control"] = "no-cache, no-transform"
     resp.headers["Connection"] = "keep-alive"
     resp.headers["X-Accel-Buffering"] = "no"
@@ -634,7 +977,34 @@ def live_notify_test():
 # --------- debug (optional) ---------
 @live_bp.get("/debug/notify-state")
 def live_notify_state():
-    return _resp_json(_bus._debug_state(), source_header="db-live")
+    """Bus state + metrics; per-client diagnostics (slowest first) capped by ?clients=N."""
+    try:
+        limit = max(0, min(int(request.args.get("clients", 100)), 10000))
+    except ValueError:
+        limit = 100
+    payload = {**_bus._debug_state(), "async": async_state(client_limit=limit)}
+    payload["metrics"] = _bus.metrics_snapshot(client_limit=limit)
+    return _resp_json(payload, source_header="db-live")
+
+@live_bp.get("/debug/notify-metrics")
+def live_notify_metrics():
+    """Same metrics as notify-state, in a scrape-friendly text format."""
+    st = async_state()
+    body = _bus.metrics_text({"occt_sse_async_clients": st["clients"]})
+    resp = make_response(body, 200)
+    resp.headers["Content-Type"] = "text/plain; version=0.0.4; charset=utf-8"
+    resp.headers["X-OCCT-Source"] = "db-live"
+    return resp
+
+@live_bp.get("/debug/cache-state")
+def live_cache_state():
+    """Response-cache hit/miss/304 counters (this process)."""
+    return _resp_json(cache_stats(), source_header="db-live")
+
+@live_bp.post("/debug/cache-clear")
+def live_cache_clear():
+    cache_clear()
+    return _resp_json({"ok": True}, source_header="db-live")
 
 @live_bp.post("/debug/notify-clear")
 def live_notify_clear():
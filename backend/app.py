@@ -3,13 +3,19 @@ from flask import (
     Flask, render_template, request, jsonify, redirect, url_for, session
 )
 from functools import wraps
-from sqlalchemy import func
-from .db_util import ensure_c1_columns, ensure_unique_index  # NOTE: no ensure_event_tables here
+from sqlalchemy import func, event
+from .db_util import ensure_c1_columns, ensure_unique_index, ensure_audit_indexes, ensure_event_tables, ensure_evidence_columns, ensure_audit_rollup, ensure_audit_current, ensure_failed_rollups, ensure_data_versions, ensure_fts_tables, ensure_report_snapshots, ensure_event_rollups, refresh_schema
 from .live_facts import attach_live_facts, attach_live_compliance, attach_live_rules_api
 from .live_runner import attach_live_runner_api
 from .detections_api import attach_detections_api
+from .fleet_api import attach_fleet_api
+from .facets_api import attach_facets_api
+from .retention import attach_retention_api, start_retention_worker
 from .models import db, AuditEvent
 from .live_poller import start_live_poller_if_enabled
+from .notify import configure_bus
+from .sse_async import start_async_sse_server
+from .compress import attach_compression
 import os
 
 # ---------------- defaults + bootstrap of instance/settings.py ----------------
@@ -22,6 +28,16 @@ DETECTIONS_LOOKBACK_MIN = 5     # minutes
 DETECTIONS_INTERVAL = 15        # seconds
 BRUTE_4625_THRESHOLD = 5
 DETECTIONS_DEDUPE_SEC = 0       # seconds; 0 = no de-dupe (alerts fire immediately)
+# SSE bus: "local" (single process) or "sqlite" (shared event log for multiple workers)
+SSE_BUS_BACKEND = "local"
+SSE_BUS_POLL_MS = 50            # how often each worker tails the shared log
+SSE_ASYNC_PORT = 0              # >0: serve /api/live/stream from an asyncio sidecar on this port
+# Retention (off unless a policy is set): days of raw rows kept per source ("*" = event ids
+# not listed); older rows are archived to instance/archive/ and deleted, events also rolled
+# up into hourly counts. Example: RETENTION_EVENTS = {"live": {"*": 90, 4624: 14}}
+RETENTION_EVENTS = {}
+RETENTION_DETECTIONS = {}       # e.g. {"live": 365}
+RETENTION_INTERVAL_SEC = 3600   # 0 = compact only on POST /api/live/retention/run
 """
 
 def ensure_instance_settings_file(app):
@@ -45,6 +61,20 @@ def apply_default_config(app):
         DETECTIONS_INTERVAL=15,
         BRUTE_4625_THRESHOLD=5,
         DETECTIONS_DEDUPE_SEC=0,
+        SSE_BUS_BACKEND="local",
+        SSE_BUS_POLL_MS=50,
+        SSE_BUS_RETAIN_SEC=300,
+        SSE_ASYNC_PORT=0,
+        SSE_ASYNC_HOST="127.0.0.1",
+        SSE_ASYNC_URL=None,             # public sidecar stream URL (proxy/TLS); default: request host when reachable
+        GZIP_LEVEL=6,                   # 0 disables response compression
+        GZIP_MIN_BYTES=1024,
+        RETENTION_EVENTS={},                            # days of raw security_events per source/event_id
+        RETENTION_DETECTIONS={},                        # days of detections per source
+        RETENTION_INTERVAL_SEC=3600,
+        RETENTION_BATCH_ROWS=2000,                      # rows per delete transaction
+        RETENTION_PAUSE_MS=50,                          # between batches, so other writers get in
+        RETENTION_ARCHIVE_DIR="archive",                # under instance/; "" = no NDJSON archives
     )
     # Optional: allow env overrides if provided
     def env_int(name, default):
@@ -70,11 +100,18 @@ def apply_default_config(app):
     app.config["DETECTIONS_LOOKBACK_MIN"] = env_int("OCCT_DETECTIONS_LOOKBACK_MIN", app.config["DETECTIONS_LOOKBACK_MIN"])
     app.config["DETECTIONS_EVENT_IDS"]    = env_csv_int("OCCT_DETECTIONS_EVENT_IDS", app.config["DETECTIONS_EVENT_IDS"])
     app.config["DETECTIONS_DEDUPE_SEC"]   = env_int("OCCT_DETECTIONS_DEDUPE_SEC",   app.config["DETECTIONS_DEDUPE_SEC"])
+    app.config["SSE_BUS_POLL_MS"]         = env_int("OCCT_SSE_BUS_POLL_MS",         app.config["SSE_BUS_POLL_MS"])
+    app.config["SSE_ASYNC_PORT"]          = env_int("OCCT_SSE_ASYNC_PORT",          app.config["SSE_ASYNC_PORT"])
+    app.config["GZIP_LEVEL"]              = env_int("OCCT_GZIP_LEVEL",              app.config["GZIP_LEVEL"])
+    app.config["RETENTION_INTERVAL_SEC"]  = env_int("OCCT_RETENTION_INTERVAL_SEC",  app.config["RETENTION_INTERVAL_SEC"])
+    if os.getenv("OCCT_SSE_BUS_BACKEND"):
+        app.config["SSE_BUS_BACKEND"] = os.getenv("OCCT_SSE_BUS_BACKEND")
 
 # ---------------------------------- Flask app ---------------------------------
 
 app = Flask(
     __name__,
+    instance_path=os.getenv("OCCT_INSTANCE_PATH") or None,    # e.g. a scratch dir for tests
     template_folder="../frontend",
     static_folder="../frontend",
     static_url_path="",
@@ -100,21 +137,43 @@ app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
 db.init_app(app)
+
+def _sqlite_pragmas(dbapi_con, _record):
+    # per connection (journal_mode=WAL below is stored in the database): without this only the
+    # first pooled connection had them and every other commit paid a full fsync
+    cur = dbapi_con.cursor()
+    cur.execute('PRAGMA synchronous=NORMAL')
+    cur.execute('PRAGMA busy_timeout=5000')
+    cur.close()
+
 with app.app_context():
+    event.listen(db.engine, "connect", _sqlite_pragmas)
     db.create_all()
     ensure_c1_columns()
     ensure_unique_index()
-    # Leave ensure_event_tables() out to avoid quoting issues on reserved names like "when".
+    ensure_audit_indexes()
+    ensure_event_tables()           # composite indexes for /events and /detections filters
+    ensure_evidence_columns()       # JSON1 generated columns + indexes for ?evidence= filters
+    ensure_audit_rollup()           # daily counts for dashboard trends (trigger-maintained)
+    ensure_audit_current()          # latest outcome per host/control for the fleet matrix
+    ensure_failed_rollups()         # failed counts for the remediation overview
+    ensure_data_versions()          # per-source write versions for the response cache
+    ensure_fts_tables()             # FTS5 indexes for q= search (LIKE fallback without FTS5)
+    ensure_report_snapshots()
+    ensure_event_rollups()          # hourly counts of compacted security_events (retention)
+    refresh_schema()                # column registry for has_column()/table_columns()
     # Apply safe PRAGMAs for better concurrency.
     try:
         from sqlalchemy import text
         with db.engine.connect() as con:
             con.execute(text('PRAGMA journal_mode=WAL'))
-            con.execute(text('PRAGMA synchronous=NORMAL'))
-            con.execute(text('PRAGMA busy_timeout=5000'))
     except Exception as e:
         print(f'[sqlite] pragma set failed: {e}')
 
+# SSE bus transport (in-process or shared across worker processes)
+configure_bus(app)
+start_async_sse_server(app)                     # optional asyncio SSE sidecar (SSE_ASYNC_PORT)
+
 # Blueprints + APIs
 from .api import api_bp, sample_bp, live_bp
 start_live_poller_if_enabled(app)               # start background poller if enabled
@@ -124,10 +183,14 @@ attach_live_rules_api(live_bp, app)             # live rules management endpoint
 attach_live_rules_api(sample_bp, app)           # also expose rules mgmt for sample
 attach_live_runner_api(live_bp, app)            # live runner endpoints
 attach_detections_api(sample_bp, live_bp, app)  # detections endpoints (both modes)
+attach_fleet_api(live_bp, app)                  # live fleet compliance matrix
+attach_facets_api(sample_bp, live_bp, app)      # facet counts + histograms (both modes)
+attach_retention_api(sample_bp, live_bp, app)   # retention status + run-now (both modes)
 
 app.register_blueprint(sample_bp)               # /api/sample/*
 app.register_blueprint(api_bp)                  # /api/*
 app.register_blueprint(live_bp)                 # /api/live/*
+attach_compression(app)                         # gzip for large API responses
 
 # ------------------------------- Auth + pages ---------------------------------
 
@@ -241,6 +304,11 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"[auto-ingest] failed: {e}")
 
-    # IMPORTANT: threaded=True so SSE doesn't block other requests.
+    # Background compactor, only in the serving process (never at import: WSGI workers and
+    # tools like backend.query_plans import this module too)
+    start_retention_worker(app)
+
+    # IMPORTANT: threaded=True so SSE doesn't block other requests
+    # (unless SSE_ASYNC_PORT is set, in which case streams are served by the asyncio sidecar).
     # Keep your existing behaviour; if you want to avoid dual-PID logs, add use_reloader=False.
     app.run(debug=True, threaded=True, port=5000, use_reloader=False)
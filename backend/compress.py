@@ -0,0 +1,102 @@
+# backend/compress.py
+"""
+gzip for API responses (stdlib only), applied in one after_request hook.
+
+- buffered responses (jsonify etc.): gzip.compress when the body is >= GZIP_MIN_BYTES
+  and the result is actually smaller;
+- streamed responses (NDJSON/CSV exports): wrapped in a zlib gzip stream, sync-flushed
+  every STREAM_FLUSH_BYTES of input so the client still sees steady progress;
+- skipped for SSE, non-text types, static files (direct passthrough), bodies that already
+  carry a Content-Encoding (report snapshots), and clients without Accept-Encoding: gzip.
+
+Strong ETags become weak on compressed responses (the bytes differ per encoding);
+resp_cache compares If-None-Match weakly, so 304s keep working. A strong ETag also
+identifies the exact body, so its gzip output is memoized (cache hits skip recompressing).
+"""
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+STREAM_FLUSH_BYTES = 64 * 1024
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/csv", "text/html", "text/plain")
+MEMO_ENTRIES = 64
+
+_memo = OrderedDict()           # strong etag -> gzip bytes
+_memo_lock = threading.Lock()
+
+def _gzip_body(data, level, etag):
+    if etag:
+        with _memo_lock:
+            packed = _memo.get(etag)
+            if packed is not None:
+                _memo.move_to_end(etag)
+                return packed
+    packed = gzip.compress(data, compresslevel=level)
+    if etag:
+        with _memo_lock:
+            _memo[etag] = packed
+            while len(_memo) > MEMO_ENTRIES:
+                _memo.popitem(last=False)
+    return packed
+
+def _gzip_stream(chunks, level):
+    co = zlib.compressobj(level, zlib.DEFLATED, 31)      # wbits 31 -> gzip container
+    pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if not chunk:
+                continue
+            out = co.compress(chunk)
+            pending += len(chunk)
+            if pending >= STREAM_FLUSH_BYTES:
+                out += co.flush(zlib.Z_SYNC_FLUSH)
+                pending = 0
+            if out:
+                yield out
+        yield co.flush()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+def _compress_response(resp, level, min_bytes):
+    if resp.mimetype not in COMPRESSIBLE_TYPES or resp.direct_passthrough:
+        return resp
+    if "Content-Encoding" in resp.headers or not (200 <= resp.status_code < 300) or resp.status_code in (204, 206):
+        return resp
+    resp.vary.add("Accept-Encoding")
+    if "gzip" not in request.accept_encodings:
+        return resp
+
+    etag, weak = resp.get_etag()
+    if resp.is_streamed:
+        resp.response = _gzip_stream(resp.response, level)
+        resp.headers.pop("Content-Length", None)
+    else:
+        data = resp.get_data()
+        if len(data) < min_bytes:
+            return resp
+        packed = _gzip_body(data, level, None if weak else etag)
+        if len(packed) >= len(data):
+            return resp
+        resp.set_data(packed)
+    resp.headers["Content-Encoding"] = "gzip"
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    return resp
+
+def attach_compression(app):
+    """Register the gzip hook (GZIP_LEVEL 0 disables it; GZIP_MIN_BYTES is the size threshold)."""
+    level = int(app.config.get("GZIP_LEVEL") or 0)
+    min_bytes = int(app.config.get("GZIP_MIN_BYTES") or 0)
+    if level <= 0:
+        return
+
+    @app.after_request
+    def _gzip_after_request(resp):
+        return _compress_response(resp, level, min_bytes)
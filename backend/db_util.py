@@ -1,13 +1,34 @@
-from sqlalchemy import text
+from sqlalchemy import text, bindparam, DateTime
 from .models import db
 
-def ensure_column(table: str, col: str, coltype: str, default_sql=None):
+# Schema capabilities: table -> columns, read once (startup / after migrations) instead of
+# PRAGMA table_info or sqlalchemy.inspect on every request and insert batch.
+_schema = {}
+
+def refresh_schema(*tables):
+    """Re-read columns for the given tables (all tables when none given)."""
     with db.engine.connect() as con:
-        cols = [r[1] for r in con.execute(text(f"PRAGMA table_info({table})")).all()]
-        if col not in cols:
-            con.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {coltype}"))
-            if default_sql is not None:
-                con.execute(text(f"UPDATE {table} SET {col}={default_sql} WHERE {col} IS NULL"))
+        names = tables or [r[0] for r in con.execute(text("SELECT name FROM sqlite_master WHERE type='table'")).all()]
+        for t in names:
+            # table_xinfo: table_info leaves out generated columns
+            _schema[t] = frozenset(r[1] for r in con.execute(text(f"PRAGMA table_xinfo({t})")).all())
+
+def table_columns(table: str) -> frozenset:
+    if table not in _schema:
+        refresh_schema(table)
+    return _schema[table]
+
+def has_column(table: str, col: str) -> bool:
+    return col in table_columns(table)
+
+def ensure_column(table: str, col: str, coltype: str, default_sql=None):
+    if col in table_columns(table):
+        return
+    with db.engine.begin() as con:
+        con.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {coltype}"))
+        if default_sql is not None:
+            con.execute(text(f"UPDATE {table} SET {col}={default_sql} WHERE {col} IS NULL"))
+    refresh_schema(table)
 
 def ensure_c1_columns():
     # Required for sample/live split
@@ -15,24 +36,461 @@ def ensure_c1_columns():
     # Nice to have for per-host display (safe even if unused yet)
     ensure_column("audit_events", "host", "VARCHAR(128)")
 
+# Columns the ingest paths coalesce to '' (the unique index treats NULLs as distinct).
+AUDIT_TEXT_COLS = ("category", "control", "account", "description")
+
+_audit_unique = {"ready": False}
+
 def ensure_unique_index():
-    """Ensure app-level idempotency even if multiple ingests fire."""
+    """Ensure app-level idempotency even if multiple ingests fire.
+
+    The index is also the deduplicated audit view: once it exists, audit_events holds at
+    most one row per (source, time, category, control, outcome, account, description),
+    so readers can skip the per-request GROUP BY (see audit_rows_unique()).
+    """
     sql = """
     CREATE UNIQUE INDEX IF NOT EXISTS ux_audit_events_unique
     ON audit_events (source, time, category, control, outcome, account, description);
     """
+    try:
+        with db.engine.begin() as con:
+            # Legacy rows may carry NULLs that GROUP BY would have merged; normalize once.
+            nulls = " OR ".join(f"{c} IS NULL" for c in AUDIT_TEXT_COLS)
+            if con.execute(text(f"SELECT 1 FROM audit_events WHERE {nulls} LIMIT 1")).first():
+                for c in AUDIT_TEXT_COLS:
+                    con.execute(text(f"UPDATE audit_events SET {c}='' WHERE {c} IS NULL"))
+            con.execute(text(sql))
+        _audit_unique["ready"] = True
+    except Exception as e:
+        # e.g. pre-existing duplicates: keep serving, readers fall back to GROUP BY
+        print(f"[db] unique audit index unavailable, using GROUP BY dedupe: {e}", flush=True)
+        _audit_unique["ready"] = False
+    return _audit_unique["ready"]
+
+def audit_rows_unique() -> bool:
+    """True when ux_audit_events_unique is in place (rows are already deduplicated)."""
+    return _audit_unique["ready"]
+
+def ensure_audit_indexes():
+    """Composite indexes for the per-source dashboard/remediation reads."""
     with db.engine.connect() as con:
-        con.execute(text(sql))
+        # monthly buckets, recent rows, last-scan window
+        con.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_source_time_outcome ON audit_events (source, time, outcome)"))
+        # failed-by-category / top failed controls
+        con.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_source_outcome_cat ON audit_events (source, outcome, category, control)"))
 
-def ensure_event_tables():
-    """Create helpful indexes/constraints for new detections feature."""
+# Per-day counts of audit rows, kept in step with audit_events by triggers so the
+# dashboard can bucket any range (months/weeks) with one indexed aggregate.
+_ROLLUP_COLS = ("COALESCE({r}.source, 'sample')", "COALESCE({r}.host, '')", "substr({r}.time, 1, 10)",
+                "COALESCE({r}.category, '')", "COALESCE({r}.outcome, '')")
+
+def _rollup_key(ref):
+    return [c.format(r=ref) for c in _ROLLUP_COLS]
+
+def _rollup_inc(ref):
+    return f"""
+        INSERT INTO audit_rollup_daily (source, host, day, category, outcome, n)
+        VALUES ({', '.join(_rollup_key(ref))}, 1)
+        ON CONFLICT (source, host, day, category, outcome) DO UPDATE SET n = n + 1;"""
+
+def _rollup_dec(ref):
+    where = " AND ".join(f"{k} = {v}" for k, v in zip(("source", "host", "day", "category", "outcome"), _rollup_key(ref)))
+    return f"""
+        UPDATE audit_rollup_daily SET n = n - 1 WHERE {where};"""
+
+def ensure_audit_rollup():
+    """Create audit_rollup_daily + its triggers; backfill from audit_events on first run."""
+    with db.engine.begin() as con:
+        exists = con.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='audit_rollup_daily'"
+        )).first()
+        con.execute(text("""
+            CREATE TABLE IF NOT EXISTS audit_rollup_daily (
+                source   VARCHAR(16) NOT NULL,
+                host     VARCHAR(128) NOT NULL DEFAULT '',
+                day      CHAR(10) NOT NULL,          -- YYYY-MM-DD (UTC, as stored in audit_events.time)
+                category VARCHAR(64) NOT NULL DEFAULT '',
+                outcome  VARCHAR(32) NOT NULL DEFAULT '',
+                n        INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, host, day, category, outcome)
+            )
+        """))
+        # covering index for trend reads (range on day, sum n per outcome)
+        con.execute(text("CREATE INDEX IF NOT EXISTS ix_rollup_source_day ON audit_rollup_daily (source, day, outcome, n)"))
+        con.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_audit_rollup_ins AFTER INSERT ON audit_events
+            BEGIN {_rollup_inc("NEW")}
+            END
+        """))
+        con.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_audit_rollup_del AFTER DELETE ON audit_events
+            BEGIN {_rollup_dec("OLD")}
+            END
+        """))
+        con.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_audit_rollup_upd
+            AFTER UPDATE OF time, category, outcome, source, host ON audit_events
+            BEGIN {_rollup_dec("OLD")} {_rollup_inc("NEW")}
+            END
+        """))
+        if not exists:
+            con.execute(text(f"""
+                INSERT INTO audit_rollup_daily (source, host, day, category, outcome, n)
+                SELECT {', '.join(_rollup_key("audit_events"))}, COUNT(*)
+                FROM audit_events GROUP BY 1, 2, 3, 4, 5
+            """))
+
+# Latest outcome per (source, host, control), kept in step with audit_events by triggers
+# so per-host views (fleet matrix, job summaries) read one small indexed table.
+_CURRENT_KEY = ("COALESCE({r}.source, 'sample')", "COALESCE({r}.host, '')", "COALESCE({r}.control, '')")
+
+# keep the newer row when a key already has one
+_CURRENT_NEWER = """
+        ON CONFLICT (source, host, control) DO UPDATE SET
+            outcome = excluded.outcome, time = excluded.time, audit_id = excluded.audit_id
+        WHERE excluded.time > audit_current.time
+           OR (excluded.time = audit_current.time AND excluded.audit_id > audit_current.audit_id);"""
+
+def _current_upsert(ref):
+    key = ", ".join(c.format(r=ref) for c in _CURRENT_KEY)
+    return f"""
+        INSERT INTO audit_current (source, host, control, outcome, time, audit_id)
+        VALUES ({key}, COALESCE({ref}.outcome, ''), {ref}.time, {ref}.id){_CURRENT_NEWER}"""
+
+def _current_refill(ref):
+    # the current row went away: fall back to the newest remaining row for that key. A NULL
+    # and an empty host are one key; each is looked up on its own so both use the index.
+    # (source defaults to 'sample' and control is coalesced on insert, see AUDIT_TEXT_COLS.)
+    newest = """
+        INSERT INTO audit_current (source, host, control, outcome, time, audit_id)
+        SELECT COALESCE(source, 'sample'), COALESCE(host, ''), COALESCE(control, ''), COALESCE(outcome, ''), time, id
+        FROM audit_events
+        WHERE source IS {r}.source AND {host} AND control IS {r}.control
+        ORDER BY time DESC, id DESC LIMIT 1{newer}"""
+    return f"""
+        DELETE FROM audit_current WHERE audit_id = {ref}.id;""" + "".join(
+        newest.format(r=ref, host=host, newer=_CURRENT_NEWER) for host in (
+            f"host = COALESCE({ref}.host, '')",
+            f"host IS NULL AND COALESCE({ref}.host, '') = ''"))
+
+def ensure_audit_current():
+    """Create audit_current + its triggers; backfill from audit_events on first run."""
+    with db.engine.begin() as con:
+        exists = con.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='audit_current'"
+        )).first()
+        con.execute(text("""
+            CREATE TABLE IF NOT EXISTS audit_current (
+                source   VARCHAR(16) NOT NULL,
+                host     VARCHAR(128) NOT NULL DEFAULT '',
+                control  VARCHAR(128) NOT NULL DEFAULT '',
+                outcome  VARCHAR(32) NOT NULL DEFAULT '',
+                time     DATETIME,
+                audit_id INTEGER NOT NULL,
+                PRIMARY KEY (source, host, control)
+            )
+        """))
+        con.execute(text("CREATE INDEX IF NOT EXISTS ix_current_audit_id ON audit_current (audit_id)"))
+        # control dictionary / per-control failure counts
+        con.execute(text("CREATE INDEX IF NOT EXISTS ix_current_source_control ON audit_current (source, control, outcome)"))
+        # refill lookups in the delete trigger; also serves live_runner's per-host deletes
+        con.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_source_host_control ON audit_events (source, host, control, time)"))
+        con.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_audit_current_ins AFTER INSERT ON audit_events
+            BEGIN {_current_upsert("NEW")}
+            END
+        """))
+        con.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_audit_current_del AFTER DELETE ON audit_events
+            WHEN EXISTS (SELECT 1 FROM audit_current WHERE audit_id = OLD.id)
+            BEGIN {_current_refill("OLD")}
+            END
+        """))
+        con.execute(text(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_audit_current_upd
+            AFTER UPDATE OF time, control, outcome, source, host ON audit_events
+            BEGIN {_current_refill("OLD")} {_current_upsert("NEW")}
+            END
+        """))
+        if not exists:
+            con.execute(text("""
+                INSERT INTO audit_current (source, host, control, outcome, time, audit_id)
+                SELECT source, host, control, outcome, time, id FROM (
+                    SELECT COALESCE(source, 'sample') AS source, COALESCE(host, '') AS host,
+                           COALESCE(control, '') AS control, COALESCE(outcome, '') AS outcome, time, id,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY COALESCE(source, 'sample'), COALESCE(host, ''), COALESCE(control, '')
+                               ORDER BY time DESC, id DESC) AS rn
+                    FROM audit_events)
+                WHERE rn = 1
+            """))
+
+# Failed-row counts for the remediation overview, kept in step by triggers:
+#   audit_failed_controls(source, category, control, n) -> by_category / top_controls
+#   audit_failed_accounts(source, account, n)           -> accounts_impacted
+_FAILED_ROLLUPS = {
+    "audit_failed_controls": ("category", "control"),
+    "audit_failed_accounts": ("account",),
+}
+
+def _failed_inc(table, cols, ref):
+    vals = ", ".join(f"COALESCE({ref}.{c}, '')" for c in cols)
+    return f"""
+        INSERT INTO {table} (source, {', '.join(cols)}, n)
+        SELECT COALESCE({ref}.source, 'sample'), {vals}, 1 WHERE {ref}.outcome = 'Failed'
+        ON CONFLICT (source, {', '.join(cols)}) DO UPDATE SET n = n + 1;"""
+
+def _failed_dec(table, cols, ref):
+    where = " AND ".join([f"source = COALESCE({ref}.source, 'sample')"] + [f"{c} = COALESCE({ref}.{c}, '')" for c in cols])
+    return f"""
+        UPDATE {table} SET n = n - 1 WHERE {ref}.outcome = 'Failed' AND {where};
+        DELETE FROM {table} WHERE n <= 0 AND {where};"""
+
+def ensure_failed_rollups():
+    """Create the failed-count rollups + triggers (backfilled on first run) and the
+    (source, outcome, time) index that serves 'recent failed' as a short index walk."""
+    with db.engine.begin() as con:
+        con.execute(text("CREATE INDEX IF NOT EXISTS ix_audit_source_outcome_time ON audit_events (source, outcome, time)"))
+        for table, cols in _FAILED_ROLLUPS.items():
+            exists = con.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name=:t"), {"t": table}).first()
+            col_defs = "".join(f"{c} VARCHAR(128) NOT NULL DEFAULT '',\n" for c in cols)
+            con.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    source VARCHAR(16) NOT NULL,
+                    {col_defs}
+                    n      INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (source, {', '.join(cols)})
+                )
+            """))
+            con.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_n ON {table} (source, n)"))
+            con.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_ins AFTER INSERT ON audit_events
+                BEGIN {_failed_inc(table, cols, "NEW")}
+                END
+            """))
+            con.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_del AFTER DELETE ON audit_events
+                BEGIN {_failed_dec(table, cols, "OLD")}
+                END
+            """))
+            con.execute(text(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_upd
+                AFTER UPDATE OF outcome, source, {', '.join(cols)} ON audit_events
+                BEGIN {_failed_dec(table, cols, "OLD")} {_failed_inc(table, cols, "NEW")}
+                END
+            """))
+            if not exists:
+                keys = ", ".join(f"COALESCE({c}, '')" for c in cols)
+                con.execute(text(f"""
+                    INSERT INTO {table} (source, {', '.join(cols)}, n)
+                    SELECT COALESCE(source, 'sample'), {keys}, COUNT(*)
+                    FROM audit_events WHERE outcome = 'Failed'
+                    GROUP BY {', '.join(str(i) for i in range(1, len(cols) + 2))}
+                """))
+
+# scope -> table whose writes move that scope's per-source data version
+VERSIONED_TABLES = {"audit": "audit_events", "detections": "detections", "events": "security_events"}
+
+def ensure_data_versions():
+    """
+    data_versions(scope, source, version): bumped by triggers on every insert/update/delete
+    of the scope's table, so readers (resp_cache) can tell whether cached output is stale
+    without re-running the query. Works across processes since it lives in the DB.
+    """
+    with db.engine.begin() as con:
+        con.execute(text("""
+            CREATE TABLE IF NOT EXISTS data_versions (
+                scope   VARCHAR(32) NOT NULL,
+                source  VARCHAR(16) NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (scope, source)
+            )
+        """))
+        for scope, table in VERSIONED_TABLES.items():
+            def bump(ref, cond="1"):
+                return f"""
+                    INSERT INTO data_versions (scope, source, version)
+                    SELECT '{scope}', COALESCE({ref}.source, 'sample'), 1 WHERE {cond}
+                    ON CONFLICT (scope, source) DO UPDATE SET version = version + 1;"""
+            # An UPDATE bumps OLD's source only when the row moved to another source;
+            # bumping the same key twice per row doubled the trigger cost of bulk updates.
+            # (trg_*_version_update was the old two-bump body.)
+            con.execute(text(f"DROP TRIGGER IF EXISTS trg_{table}_version_update"))
+            moved = "COALESCE(OLD.source, 'sample') <> COALESCE(NEW.source, 'sample')"
+            for name, op, body in (("insert", "INSERT", bump("NEW")),
+                                   ("delete", "DELETE", bump("OLD")),
+                                   ("upd", "UPDATE", bump("NEW") + bump("OLD", moved))):
+                con.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{name} AFTER {op} ON {table}
+                    BEGIN {body}
+                    END
+                """))
+
+# Full-text indexes (FTS5, external content): table -> (fts table, indexed columns)
+FTS_INDEXES = {
+    "audit_events":    ("audit_fts", ("description", "control", "account")),
+    "security_events": ("events_fts", ("message", "provider")),
+    "detections":      ("detections_fts", ("summary", "evidence")),
+}
+
+_fts_ready = set()
+
+def ensure_fts_tables():
+    """
+    FTS5 shadow indexes for the q= searches, kept in sync by triggers and built from the
+    base table the first time. If this SQLite lacks FTS5 nothing is created and searches
+    stay on LIKE (see fts_ready()).
+    """
+    for table, (fts, cols) in FTS_INDEXES.items():
+        collist = ", ".join(cols)
+        new_vals = ", ".join(f"new.{c}" for c in cols)
+        old_vals = ", ".join(f"old.{c}" for c in cols)
+        try:
+            with db.engine.begin() as con:
+                exists = con.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name=:n"), {"n": fts}).first()
+                con.execute(text(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                        {collist}, content='{table}', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2'
+                    )
+                """))
+                con.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{fts}_ai AFTER INSERT ON {table} BEGIN
+                        INSERT INTO {fts}(rowid, {collist}) VALUES (new.id, {new_vals});
+                    END
+                """))
+                con.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{fts}_ad AFTER DELETE ON {table} BEGIN
+                        INSERT INTO {fts}({fts}, rowid, {collist}) VALUES ('delete', old.id, {old_vals});
+                    END
+                """))
+                con.execute(text(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{fts}_au AFTER UPDATE OF {collist} ON {table} BEGIN
+                        INSERT INTO {fts}({fts}, rowid, {collist}) VALUES ('delete', old.id, {old_vals});
+                        INSERT INTO {fts}(rowid, {collist}) VALUES (new.id, {new_vals});
+                    END
+                """))
+                if not exists:
+                    con.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            _fts_ready.add(fts)
+        except Exception as e:
+            print(f"[db] FTS5 index {fts} unavailable, q= search uses LIKE: {e}", flush=True)
+            _fts_ready.discard(fts)
+
+def fts_ready(fts: str) -> bool:
+    return fts in _fts_ready
+
+def ensure_report_snapshots():
+    """Gzipped report HTML, one row per (source, data version); see report_snapshots.py."""
     with db.engine.connect() as con:
-        # security_events uniqueness
         con.execute(text("""
-            CREATE UNIQUE INDEX IF NOT EXISTS ux_events_unique
-            ON security_events (source, host, channel, record_id);
+            CREATE TABLE IF NOT EXISTS report_snapshots (
+                id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                source       VARCHAR(16) NOT NULL,
+                data_version VARCHAR(255) NOT NULL,
+                generated_at VARCHAR(32) NOT NULL,      -- ISO-8601 UTC, 'Z'
+                etag         VARCHAR(64) NOT NULL,
+                size         INTEGER NOT NULL DEFAULT 0, -- uncompressed bytes
+                html_gz      BLOB NOT NULL,
+                UNIQUE (source, data_version)
+            )
+        """))
+
+def insert_audit_events(rows, extra_cols=()):
+    """
+    Batch INSERT OR IGNORE into audit_events on the current session; duplicates of an
+    existing (source, time, category, control, outcome, account, description) row are
+    skipped instead of failing the whole commit. Returns the number of new rows.
+    Caller commits.
+    """
+    if not rows:
+        return 0
+    cols = ["time", "category", "control", "outcome", "account", "description", "source", "host", *extra_cols]
+    batch = []
+    for r in rows:
+        d = {c: r.get(c) for c in cols}
+        for c in AUDIT_TEXT_COLS:
+            d[c] = d[c] or ""
+        batch.append(d)
+    sql = text(
+        f"INSERT OR IGNORE INTO audit_events ({', '.join(cols)}) "
+        f"VALUES ({', '.join(':' + c for c in cols)})"
+    ).bindparams(bindparam("time", type_=DateTime()))   # same storage format as the ORM
+    res = db.session.execute(sql, batch)
+    return max(res.rowcount or 0, 0)
+
+# Composite indexes for the /events and /detections filters. Every list is newest first on
+# (time, id) within a source; the rowid tail of each entry keeps that order after the
+# equality columns, so filtered pages and cursor seeks are range reads with no sort.
+# "when" is a reserved word and must stay quoted.
+EVENT_INDEXES = {
+    "ix_events_source_time":         ("security_events", "source, time"),
+    "ix_events_source_eid_time":     ("security_events", "source, event_id, time"),       # ?event_id=
+    "ix_detections_source_when":     ("detections", 'source, "when"'),
+    "ix_detections_source_sev_when": ("detections", 'source, lower(severity), "when"'),   # ?severity=
+    "ix_detections_source_st_when":  ("detections", 'source, lower(status), "when"'),     # ?status=
+    "ix_detections_source_rule_when":("detections", 'source, rule_id, "when"'),           # poller dedupe
+    # facet GROUP BYs (facets_api); event hosts are covered by ux_events_unique
+    "ix_events_source_account":      ("security_events", "source, account"),
+    "ix_events_source_ip":           ("security_events", "source, ip"),
+    "ix_detections_source_host":     ("detections", "source, host"),
+    "ix_detections_source_account":  ("detections", "source, account"),
+    "ix_detections_source_ip":       ("detections", "source, ip"),
+}
+
+def ensure_event_tables():
+    """Create the composite indexes for the detections feature (see EVENT_INDEXES)."""
+    with db.engine.begin() as con:
+        for name, (table, cols) in EVENT_INDEXES.items():
+            con.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"))
+        # The model's single-column status index is never read (filters go through
+        # lower(status) above) and every bulk triage UPDATE paid to maintain it.
+        con.execute(text("DROP INDEX IF EXISTS ix_detections_status"))
+
+# Partial indexes on the evidence generated columns (models.EVIDENCE_COLUMNS). Most rules
+# carry only some of these keys, so rows where the key is NULL are left out; "x = ?" and
+# "x > ?" imply NOT NULL, so the planner still uses them for ?evidence= comparisons.
+EVIDENCE_INDEXES = {
+    "ix_detections_ev_last_ip": ("ev_last_ip", 'source, ev_last_ip, "when"'),
+    "ix_detections_ev_count":   ("ev_count",   'source, ev_count, "when"'),
+    "ix_detections_ev_group":   ("ev_group",   'source, ev_group, "when"'),
+    "ix_detections_ev_member":  ("ev_member",  'source, ev_member, "when"'),
+}
+
+def ensure_evidence_columns():
+    """Add the VIRTUAL evidence columns to an existing detections table and index them."""
+    from .models import Detection, EVIDENCE_COLUMNS
+    dialect = db.engine.dialect
+    for col in EVIDENCE_COLUMNS.values():
+        c = Detection.__table__.c[col]
+        # VIRTUAL columns can be added by ALTER TABLE (STORED ones can't); no table rewrite
+        ensure_column("detections", col,
+                      f"{c.type.compile(dialect)} GENERATED ALWAYS AS ({c.computed.sqltext}) VIRTUAL")
+    with db.engine.begin() as con:
+        for name, (col, cols) in EVIDENCE_INDEXES.items():
+            con.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON detections ({cols}) WHERE {col} IS NOT NULL"))
+
+def ensure_event_rollups():
+    """
+    event_rollups: hourly counts per (source, hour, event_id, host, account) of raw
+    security_events the retention compactor has deleted (retention.py). Rows are added in
+    the same transaction as the delete, so every event is counted in exactly one of the
+    two tables and readers can sum both. NULL host/account are stored as ''.
+    """
+    with db.engine.begin() as con:
+        con.execute(text("""
+            CREATE TABLE IF NOT EXISTS event_rollups (
+                source   VARCHAR(16)  NOT NULL,
+                hour     DATETIME     NOT NULL,
+                event_id INTEGER      NOT NULL DEFAULT 0,
+                host     VARCHAR(128) NOT NULL DEFAULT '',
+                account  VARCHAR(128) NOT NULL DEFAULT '',
+                n        INTEGER      NOT NULL DEFAULT 0,
+                PRIMARY KEY (source, hour, event_id, host, account)
+            ) WITHOUT ROWID
         """))
-        # time indexes
-        con.execute(text("CREATE INDEX IF NOT EXISTS ix_security_events_time ON security_events (time)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS ix_detections_when ON detections (when)"))
-        con.execute(text("CREATE INDEX IF NOT EXISTS ix_detections_rule ON detections (rule_id, when)"))
+        # covering (n included) so facet GROUP BYs read one index in group order, no sort
+        for name, cols in (("eid", "event_id, hour"), ("host", "host"), ("account", "account")):
+            con.execute(text(f"CREATE INDEX IF NOT EXISTS ix_event_rollups_{name} ON event_rollups (source, {cols}, n)"))
@@ -1,29 +1,248 @@
 # backend/detections_api.py
 from __future__ import annotations
 import datetime as dt
+import json
+import operator
+import re
+import threading
+from collections import OrderedDict
 from flask import Blueprint, request, jsonify, make_response
-from sqlalchemy import func, desc
-from .models import db, SecurityEvent, Detection
+from sqlalchemy import func, select, update, case
+from .models import db, SecurityEvent, Detection, EVIDENCE_COLUMNS
+from .search_fts import apply_text_search
+from .paging import decode_cursor, keyset_newest_first, page_with_cursor
+from .resp_cache import version_token
+from .live_deltas import publish_detections_triaged
 
 def _resp(obj, status=200):
     resp = make_response(jsonify(obj), status)
     resp.headers["Cache-Control"] = "no-store"
     return resp
 
-def _normalize_int(value, default, lo=None, hi=None):
+def normalize_int(value, default, lo=None, hi=None):
+    """int(value) clamped to [lo, hi]; default when it doesn't parse (shared by the list APIs)."""
     try:
-      v = int(value)
+        v = int(value)
     except Exception:
-      v = default
+        v = default
     if lo is not None: v = max(v, lo)
     if hi is not None: v = min(v, hi)
     return v
 
 def _string_like(s): return f"%{(s or '').strip().lower()}%"
 
+# Filtered totals, reused while the scope's data version is unchanged:
+# (scope, source, filter args) -> (version token, count)
+TOTALS_MAX_ENTRIES = 512
+_PAGING_ARGS = ("page", "pagesz", "limit", "cursor", "sort", "total")
+_totals = OrderedDict()
+_totals_lock = threading.Lock()
+
+def _filtered_total(s, scope: str, source: str):
+    """COUNT(*) of the filtered query, cached per filter signature + data version.
+    ?total=0 skips it (total: null) for callers that only page forward."""
+    if (request.args.get("total") or "").lower() in ("0", "false", "none"):
+        return None
+    sig = (scope, source, tuple(sorted((k, v) for k, v in request.args.items(multi=True) if k not in _PAGING_ARGS)))
+    version = version_token((scope,), source)
+    with _totals_lock:
+        hit = _totals.get(sig)
+        if hit and hit[0] == version:
+            _totals.move_to_end(sig)
+            return hit[1]
+    n = s.order_by(None).count()
+    with _totals_lock:
+        _totals[sig] = (version, n)
+        _totals.move_to_end(sig)
+        while len(_totals) > TOTALS_MAX_ENTRIES:
+            _totals.popitem(last=False)
+    return n
+
+def _page(s, model, time_col, rank, scope: str, source: str):
+    """
+    One page of the filtered query: ({"total", "page", "pagesz", "next_cursor"}, rows).
+    Newest first on (time, id); ?cursor=<next_cursor> seeks past the previous page, so
+    deep pages cost the same as the first. ?page=N (OFFSET) still works for old links
+    and for sort=relevance, which has no (time, id) order to seek on.
+    Raises ValueError on a malformed cursor.
+    """
+    page   = normalize_int(request.args.get("page", 1), 1, 1)
+    pagesz = normalize_int(request.args.get("pagesz") or request.args.get("limit"), 20, 1, 500)
+    total  = _filtered_total(s, scope, source)
+    cursor = request.args.get("cursor")
+    if rank is not None:
+        rows = s.order_by(rank).offset((page - 1) * pagesz).limit(pagesz).all()
+        next_cursor = None
+    else:
+        after = decode_cursor(cursor) if cursor else None
+        q = keyset_newest_first(s, time_col, model.id, after)
+        if after is None and page > 1:
+            q = q.offset((page - 1) * pagesz)
+        rows, next_cursor = page_with_cursor(q, pagesz, time_col.key)
+    return {"total": total, "page": page, "pagesz": pagesz, "next_cursor": next_cursor}, rows
+
+def _bad_cursor():
+    return _resp({"error": "bad_cursor"}, 400)
+
+def bad_evidence_response(e):
+    return _resp({"error": "bad_evidence", "clause": e.args[0],
+                  "syntax": "key<op>value[,key<op>value...] with op = != > >= < <="}, 400)
+
+def _event_dict(r):
+    return {
+        "id": r.id,
+        "time": r.time.isoformat() + "Z" if r.time else None,
+        "event_id": r.event_id,
+        "account": r.account, "ip": r.ip, "message": r.message,
+        "host": r.host, "channel": r.channel, "provider": r.provider,
+    }
+
+def time_bounds(args):
+    """
+    (from, to) naive-UTC datetimes for ?from=/?to= (YYYY-MM-DD or ISO datetime); a
+    date-only ?to= covers that whole day. Unparseable values are ignored like the other filters.
+    """
+    out = []
+    for key in ("from", "to"):
+        raw = (args.get(key) or "").strip()
+        try:
+            v = dt.datetime.fromisoformat(raw.replace("Z", "+00:00")) if raw else None
+        except ValueError:
+            v = None
+        if v is not None and v.tzinfo is not None:
+            v = v.astimezone(dt.timezone.utc).replace(tzinfo=None)
+        if v is not None and key == "to" and len(raw) == 10:
+            v += dt.timedelta(days=1, microseconds=-1)
+        out.append(v)
+    return tuple(out)
+
+def events_query(source: str, args, rank=False):
+    """SecurityEvent query filtered by event_id/account/ip/from/to/q (request args or a dict); (query, rank)."""
+    q          = (args.get("q") or "").strip().lower()
+    f_event_id = (args.get("event_id") or "").strip()
+    f_account  = (args.get("account") or "").strip().lower()
+    f_ip       = (args.get("ip") or "").strip().lower()
+
+    s = db.session.query(SecurityEvent).filter(SecurityEvent.source == source)
+    if f_event_id:
+        ids = [int(x) for x in f_event_id.split(",") if x.strip().isdigit()]
+        if ids: s = s.filter(SecurityEvent.event_id.in_(ids))
+    if f_account:
+        s = s.filter(func.lower(SecurityEvent.account).like(_string_like(f_account)))
+    if f_ip:
+        s = s.filter(func.lower(SecurityEvent.ip).like(_string_like(f_ip)))
+    t_from, t_to = time_bounds(args)
+    if t_from: s = s.filter(SecurityEvent.time >= t_from)
+    if t_to:   s = s.filter(SecurityEvent.time <= t_to)
+    rank_order = None
+    if q:
+        s, rank_order = apply_text_search(s, SecurityEvent, q, [SecurityEvent.message, SecurityEvent.provider], rank=rank)
+    return s, rank_order
+
+# ?evidence=count>50,last_ip=10.0.0.5 - comparisons on evidence keys, ANDed. Keys in
+# EVIDENCE_COLUMNS read their indexed generated column; any other key is json_extract'ed
+# per row (unindexed, narrowed only by the other filters).
+_EVIDENCE_CLAUSE = re.compile(r"^([A-Za-z_]\w*)\s*(>=|<=|!=|=|>|<)\s*(.*)$")
+_EVIDENCE_OPS = {"=": operator.eq, "!=": operator.ne, ">": operator.gt,
+                 ">=": operator.ge, "<": operator.lt, "<=": operator.le}
+
+class BadEvidenceFilter(ValueError):
+    pass
+
+def _evidence_value(raw):
+    for conv in (int, float):
+        try:
+            return conv(raw)
+        except ValueError:
+            pass
+    return raw
+
+def evidence_conditions(spec: str):
+    """SQL conditions for an ?evidence= spec; BadEvidenceFilter on a malformed clause."""
+    conds = []
+    for clause in (c.strip() for c in (spec or "").split(",")):
+        if not clause:
+            continue
+        m = _EVIDENCE_CLAUSE.match(clause)
+        if not m or not m.group(3).strip():
+            raise BadEvidenceFilter(clause)
+        key, op, raw = m.group(1), m.group(2), m.group(3).strip()
+        if key in EVIDENCE_COLUMNS:
+            col = getattr(Detection, EVIDENCE_COLUMNS[key])
+            if isinstance(col.type, db.Integer):
+                try:
+                    raw = int(raw)
+                except ValueError:
+                    raise BadEvidenceFilter(clause)
+        else:
+            col = case((func.json_valid(Detection.evidence), func.json_extract(Detection.evidence, f"$.{key}")))
+            raw = _evidence_value(raw)
+        conds.append(_EVIDENCE_OPS[op](col, raw))
+    return conds
+
+def detections_query(source: str, args, rank=False):
+    """
+    Detection query filtered by severity/status/rule/evidence/q (request args or a dict);
+    (query, rank). Raises BadEvidenceFilter on a malformed ?evidence= spec.
+    """
+    f_sev   = (args.get("severity") or "").strip().lower()
+    f_status= (args.get("status") or "").strip().lower()
+    f_rule  = (args.get("rule") or "").strip()
+    f_ev    = (args.get("evidence") or "").strip()
+    q       = (args.get("q") or "").strip().lower()
+
+    s = db.session.query(Detection).filter(Detection.source == source)
+    if f_sev:    s = s.filter(func.lower(Detection.severity) == f_sev)
+    if f_status: s = s.filter(func.lower(Detection.status) == f_status)
+    if f_rule:   s = s.filter(Detection.rule_id.like(f"%{f_rule}%"))
+    if f_ev:     s = s.filter(*evidence_conditions(f_ev))
+    rank_order = None
+    if q:
+        s, rank_order = apply_text_search(s, Detection, q, [Detection.summary, Detection.evidence], rank=rank)
+    return s, rank_order
+
+TRIAGE_STATUSES = ("new", "ack", "muted")
+TRIAGE_FILTER_ARGS = ("severity", "status", "rule", "evidence", "q")
+
+def set_detection_status(source: str, status: str, ids=None, args=None) -> int:
+    """
+    Set `status` on the source's detections named by `ids`, or on every detection matching
+    the /detections filter `args`, as one UPDATE in one transaction. Rows already at that
+    status are left alone (no trigger work). Returns the number of rows changed.
+    """
+    if ids is not None:
+        # one bound JSON array instead of a parameter per id
+        id_list = func.json_each(json.dumps(ids)).table_valued("value")
+        where = [Detection.source == source, Detection.id.in_(select(id_list.c.value))]
+    else:
+        # the filtered ids are collected first and then updated in rowid order; updating
+        # straight off a (source, ..., "when") index rewrites table pages in random order
+        matched = detections_query(source, args)[0].with_entities(Detection.id).order_by(None)
+        where = [Detection.id.in_(matched.scalar_subquery())]
+    stmt = (update(Detection)
+            .where(*where, Detection.status.is_distinct_from(status))
+            .values(status=status)
+            .execution_options(synchronize_session=False))
+    try:
+        n = db.session.execute(stmt).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return int(n or 0)
+
 def attach_detections_api(sample_bp: Blueprint, live_bp: Blueprint, app):
     """
     Adds /events and /detections endpoints to sample & live blueprints.
+    q= uses the FTS5 index when available; &sort=relevance orders matches by bm25.
+    evidence=count>50,last_ip=10.0.0.5 filters on evidence keys (see evidence_conditions).
+    /events also takes from=/to= (UTC; rows older than the retention window are only in the
+    hourly rollups, which /events/facets reads - see retention.py).
+    Paging: ?pagesz=N&cursor=<next_cursor> (keyset); totals are cached per filter + data version.
+
+    POST /detections/status {"status": "new|ack|muted", "ids": [...]} or {"status": ..., "filter":
+    {severity, status, rule, evidence, q}} (or the same filters as query args) triages in bulk: one
+    UPDATE, one detections-triaged event on the stream.
 
     NOTE: SSE (/api/live/stream) and /api/live/notify/test are intentionally
     NOT defined here to avoid conflicts — they live in backend/api.py.
@@ -32,83 +251,26 @@ def attach_detections_api(sample_bp: Blueprint, live_bp: Blueprint, app):
     # ----------------- EVENTS (LIVE + SAMPLE) -----------------
     @live_bp.get("/events")
     def live_events():
-        page  = _normalize_int(request.args.get("page", 1), 1, 1)
-        pagesz= _normalize_int(request.args.get("pagesz", 20), 20, 1, 500)
-        q = (request.args.get("q") or "").strip().lower()
-        f_event_id = (request.args.get("event_id") or "").strip()
-        f_account  = (request.args.get("account") or "").strip().lower()
-        f_ip       = (request.args.get("ip") or "").strip().lower()
-
-        s = db.session.query(SecurityEvent).filter(SecurityEvent.source == "live")
-        if f_event_id:
-            ids = [int(x) for x in f_event_id.split(",") if x.strip().isdigit()]
-            if ids: s = s.filter(SecurityEvent.event_id.in_(ids))
-        if f_account:
-            s = s.filter(func.lower(SecurityEvent.account).like(_string_like(f_account)))
-        if f_ip:
-            s = s.filter(func.lower(SecurityEvent.ip).like(_string_like(f_ip)))
-        if q:
-            s = s.filter(
-                func.lower(SecurityEvent.message).like(_string_like(q)) |
-                func.lower(SecurityEvent.provider).like(_string_like(q))
-            )
-        s = s.order_by(desc(SecurityEvent.time), desc(SecurityEvent.record_id))
-        total = s.count()
-        rows = s.offset((page - 1) * pagesz).limit(pagesz).all()
-        out = [{
-            "id": r.id,
-            "time": r.time.isoformat() + "Z" if r.time else None,
-            "event_id": r.event_id,
-            "account": r.account, "ip": r.ip, "message": r.message,
-            "host": r.host, "channel": r.channel, "provider": r.provider,
-        } for r in rows]
-        return _resp({"total": total, "page": page, "pagesz": pagesz, "items": out})
+        s, rank = events_query("live", request.args, rank=request.args.get("sort") == "relevance")
+        try:
+            meta, rows = _page(s, SecurityEvent, SecurityEvent.time, rank, "events", "live")
+        except ValueError:
+            return _bad_cursor()
+        return _resp({**meta, "items": [_event_dict(r) for r in rows]})
 
     @sample_bp.get("/events")
     def sample_events():
-        page  = _normalize_int(request.args.get("page", 1), 1, 1)
-        pagesz= _normalize_int(request.args.get("pagesz", 20), 20, 1, 500)
-        q = (request.args.get("q") or "").strip().lower()
-
-        s = db.session.query(SecurityEvent).filter(SecurityEvent.source == "sample")
-        if q:
-            s = s.filter(
-                func.lower(SecurityEvent.message).like(_string_like(q)) |
-                func.lower(SecurityEvent.provider).like(_string_like(q))
-            )
-        s = s.order_by(desc(SecurityEvent.time), desc(SecurityEvent.record_id))
-        total = s.count()
-        rows = s.offset((page - 1) * pagesz).limit(pagesz).all()
-        out = [{
-            "id": r.id,
-            "time": r.time.isoformat() + "Z" if r.time else None,
-            "event_id": r.event_id,
-            "account": r.account, "ip": r.ip, "message": r.message,
-            "host": r.host, "channel": r.channel, "provider": r.provider,
-        } for r in rows]
-        return _resp({"total": total, "page": page, "pagesz": pagesz, "items": out})
+        s, rank = events_query("sample", request.args, rank=request.args.get("sort") == "relevance")
+        try:
+            meta, rows = _page(s, SecurityEvent, SecurityEvent.time, rank, "events", "sample")
+        except ValueError:
+            return _bad_cursor()
+        return _resp({**meta, "items": [_event_dict(r) for r in rows]})
 
     # ----------------- DETECTIONS (LIVE + SAMPLE) -----------------
     def _detections_common(source: str):
-        page   = _normalize_int(request.args.get("page", 1), 1, 1)
-        pagesz = _normalize_int(request.args.get("pagesz", 20), 20, 1, 500)
-        f_sev   = (request.args.get("severity") or "").strip().lower()
-        f_status= (request.args.get("status") or "").strip().lower()
-        f_rule  = (request.args.get("rule") or "").strip()
-        q       = (request.args.get("q") or "").strip().lower()
-
-        s = db.session.query(Detection).filter(Detection.source == source)
-        if f_sev:    s = s.filter(func.lower(Detection.severity) == f_sev)
-        if f_status: s = s.filter(func.lower(Detection.status) == f_status)
-        if f_rule:   s = s.filter(Detection.rule_id.like(f"%{f_rule}%"))
-        if q:
-            s = s.filter(
-                func.lower(Detection.summary).like(_string_like(q)) |
-                func.lower(Detection.evidence).like(_string_like(q))
-            )
-        s = s.order_by(desc(Detection.when), desc(Detection.id))
-        total = s.count()
-        rows = s.offset((page - 1) * pagesz).limit(pagesz).all()
+        s, rank = detections_query(source, request.args, rank=request.args.get("sort") == "relevance")
+        meta, rows = _page(s, Detection, Detection.when, rank, "detections", source)
         out = [{
             "id": r.id,
             "when": r.when.isoformat() + "Z" if r.when else None,
@@ -119,12 +281,57 @@ def attach_detections_api(sample_bp: Blueprint, live_bp: Blueprint, app):
             "host": r.host, "status": r.status,
             "evidence": r.evidence,
         } for r in rows]
-        return {"total": total, "page": page, "pagesz": pagesz, "items": out}
+        return {**meta, "items": out}
 
     @live_bp.get("/detections")
     def live_detections():
-        return _resp(_detections_common("live"))
+        try:
+            return _resp(_detections_common("live"))
+        except BadEvidenceFilter as e:
+            return bad_evidence_response(e)
+        except ValueError:
+            return _bad_cursor()
 
     @sample_bp.get("/detections")
     def sample_detections():
-        return _resp(_detections_common("sample"))
+        try:
+            return _resp(_detections_common("sample"))
+        except BadEvidenceFilter as e:
+            return bad_evidence_response(e)
+        except ValueError:
+            return _bad_cursor()
+
+    # ----------------- BULK TRIAGE (LIVE + SAMPLE) -----------------
+    def _triage(source: str):
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            body = {}
+        status = str(body.get("status") or "").strip().lower()
+        if status not in TRIAGE_STATUSES:
+            return _resp({"error": "bad_status", "allowed": list(TRIAGE_STATUSES)}, 400)
+        ids = body.get("ids")
+        if ids is not None:
+            # a JSON array of integers only: no strings, objects or booleans (True is an int)
+            if not isinstance(ids, list) or not all(type(x) is int for x in ids):
+                return _resp({"error": "bad_ids"}, 400)
+            by = {"ids": len(ids)}
+        else:
+            filt = body.get("filter") if isinstance(body.get("filter"), dict) else request.args
+            args = {k: str(filt.get(k)).strip() for k in TRIAGE_FILTER_ARGS if filt.get(k) not in (None, "")}
+            by = {k: v for k, v in args.items() if v}
+            if not by:
+                return _resp({"error": "empty_filter", "filters": list(TRIAGE_FILTER_ARGS)}, 400)
+        try:
+            updated = set_detection_status(source, status, ids=ids, args=by if ids is None else None)
+        except BadEvidenceFilter as e:
+            return bad_evidence_response(e)
+        publish_detections_triaged(app, source, {"source": source, "status": status, "updated": updated, "by": by})
+        return _resp({"ok": True, "source": source, "status": status, "updated": updated, "by": by})
+
+    @live_bp.post("/detections/status")
+    def live_detections_status():
+        return _triage("live")
+
+    @sample_bp.post("/detections/status")
+    def sample_detections_status():
+        return _triage("sample")
@@ -0,0 +1,199 @@
+# backend/facets_api.py
+"""
+Facet counts and a time histogram for /events and /detections, under the same filters as
+the list endpoints, so the page can pivot without pulling rows into the browser.
+
+Unfiltered, each facet is one GROUP BY that reads a single (source, <column>) index range
+(db_util.EVENT_INDEXES, ux_events_unique for event hosts) and never touches the table.
+With filters, a per-facet GROUP BY would walk that same index and look up every row of
+the source to test the filter, so instead the filtered rows are read once (through the
+filter's own index/FTS, as for the list) and every facet is counted from that one pass.
+The histogram is counted per hour and re-bucketed here.
+
+Events the retention compactor has deleted live on as hourly event_rollups rows; their
+counts are added for event_id/host/account and the histogram whenever the filters are
+ones the rollups keep (not ip or q). Rolled-up events have no ip, so they only show up
+in the ip facet's "other". Rollups are hourly: with a ?from=/?to= that isn't on the hour,
+the partial hour's rollups are left out and the response says so ("rollup_clipped").
+"""
+from __future__ import annotations
+import datetime as dt
+import heapq
+from collections import Counter
+from flask import Blueprint, request, jsonify, make_response
+from sqlalchemy import func
+from .models import db, SecurityEvent, Detection
+from .resp_cache import cached_view
+from .detections_api import (events_query, detections_query, normalize_int, BadEvidenceFilter,
+                             bad_evidence_response)
+from .retention import rollup_where, rollup_hour_bounds, has_rollups, rollup_counts
+
+FACET_TOP_DEFAULT = 10
+FACET_TOP_MAX = 100
+
+# scope -> (query builder, its filter args, time column, facet name -> grouped expression)
+FACETS = {
+    "events": (events_query, ("event_id", "account", "ip", "from", "to", "q"), SecurityEvent.time, {
+        "event_id": SecurityEvent.event_id,
+        "host":     SecurityEvent.host,
+        "account":  SecurityEvent.account,
+        "ip":       SecurityEvent.ip,
+    }),
+    "detections": (detections_query, ("severity", "status", "rule", "evidence", "q"), Detection.when, {
+        "severity": func.lower(Detection.severity),     # same expressions as the filters/indexes
+        "rule_id":  Detection.rule_id,
+        "status":   func.lower(Detection.status),
+        "host":     Detection.host,
+        "account":  Detection.account,
+        "ip":       Detection.ip,
+    }),
+}
+
+# Histogram buckets: floor function and step. "auto" picks the finest bucket that keeps
+# the span within HISTOGRAM_MAX_BUCKETS.
+BUCKETS = {
+    "hour": (lambda t: t, dt.timedelta(hours=1)),
+    "day":  (lambda t: t.replace(hour=0), dt.timedelta(days=1)),
+    "week": (lambda t: t.replace(hour=0) - dt.timedelta(days=t.weekday()), dt.timedelta(days=7)),
+}
+HISTOGRAM_MAX_BUCKETS = 400
+
+# events facet -> event_rollups column
+ROLLUP_FACETS = {"event_id": "event_id", "host": "host", "account": "account"}
+
+def _iso(t):
+    return t.isoformat() + "Z"
+
+def _top(counts, total, top):
+    ranked = heapq.nsmallest(top, counts, key=lambda vc: (-vc[1], "" if vc[0] is None else str(vc[0])))
+    shown = sum(c for _, c in ranked)
+    return {"values": [{"value": v, "count": c} for v, c in ranked], "other": max(total - shown, 0)}
+
+def _grouped(s, expr, top=None):
+    n = func.count().label("n")
+    q = s.with_entities(expr.label("value"), n).group_by(expr)
+    rows = q.order_by(n.desc(), expr).limit(top).all() if top else q.all()
+    return [(v, int(c)) for v, c in rows]
+
+def _one_pass(s, exprs, hour):
+    """(total, [Counter per expr], Counter of hours) from a single read of the filtered rows."""
+    counters = [Counter() for _ in range(len(exprs) + 1)]
+    total = 0
+    rows = db.session.connection().execute(s.with_entities(*exprs, hour).statement)   # Core rows, no ORM loading
+    for chunk in rows.partitions(5000):
+        total += len(chunk)
+        for counter, column in zip(counters, zip(*chunk)):    # column-wise: Counter counts in C
+            counter.update(column)
+    return total, counters[:-1], counters[-1]
+
+def _parse_hour(h):
+    try:
+        return dt.datetime.strptime(h.replace("T", " "), "%Y-%m-%d %H")
+    except (AttributeError, TypeError, ValueError):
+        return None                                   # malformed stored time: left out
+
+def _histogram(hour_counts, bucket):
+    hours = sorted((t, int(n)) for t, n in ((_parse_hour(h), n) for h, n in hour_counts) if t)
+    if not hours:
+        return {"bucket": bucket if bucket in BUCKETS else "hour", "buckets": []}
+    names = list(BUCKETS)
+    name = bucket if bucket in BUCKETS else names[0]
+    for name in names[names.index(name):]:       # coarsen until the span fits
+        floor, step = BUCKETS[name]
+        first, last = floor(hours[0][0]), floor(hours[-1][0])
+        if (last - first) // step < HISTOGRAM_MAX_BUCKETS:
+            break
+    counts = {}
+    for t, n in hours:
+        b = floor(t)
+        counts[b] = counts.get(b, 0) + n
+    out, t = [], first
+    while t <= last:                                  # zero-filled, oldest first
+        out.append({"start": _iso(t), "count": counts.get(t, 0)})
+        t += step
+    return {"bucket": name, "buckets": out}
+
+def build_facets(scope, source, args):
+    query_fn, filter_args, time_col, facets = FACETS[scope]
+    wanted = [f.strip() for f in (args.get("facets") or "").split(",") if f.strip()] or list(facets)
+    unknown = [f for f in wanted if f not in facets]
+    if unknown:
+        raise KeyError(unknown)
+    top = normalize_int(args.get("top"), FACET_TOP_DEFAULT, 1, FACET_TOP_MAX)
+    s = query_fn(source, args)[0].order_by(None)
+    hour = func.substr(time_col, 1, 13)              # 'YYYY-MM-DD HH' of the stored DateTime
+    where = rollup_where(source, args) if scope == "events" and has_rollups(source) else None
+
+    if any((args.get(k) or "").strip() for k in filter_args):
+        total, counters, hours = _one_pass(s, [facets[f] for f in wanted], hour)
+        values = {f: counter.items() for f, counter in zip(wanted, counters)}
+        hour_counts = hours.items()
+    else:
+        total = s.with_entities(func.count()).scalar() or 0
+        # merging with rollups needs every raw group, not just the raw top N
+        values = {f: _grouped(s, facets[f], None if where and f in ROLLUP_FACETS else top) for f in wanted}
+        hour_counts = s.with_entities(hour, func.count()).group_by(hour).all()
+
+    roll_facets = [f for f in wanted if f in ROLLUP_FACETS]
+    rolled_by = rollup_counts(where, ["hour"] + [ROLLUP_FACETS[f] for f in roll_facets]) if where else {}
+    rolled_hours = Counter()
+    for h, n in rolled_by.get("hour", {}).items():
+        rolled_hours[h[:13]] += n
+    rolled = sum(rolled_hours.values())
+    if rolled:
+        total += rolled
+        for f in roll_facets:
+            values[f] = (Counter(dict(values[f])) + rolled_by[ROLLUP_FACETS[f]]).items()
+        hour_counts = (Counter(dict(hour_counts)) + rolled_hours).items()
+    return {
+        "source": source,
+        "total": int(total),
+        "rolled_up": rolled,
+        "rollup_clipped": bool(where) and rollup_hour_bounds(args)[2],
+        "top": top,
+        "facets": {f: _top(values[f], total, top) for f in wanted},
+        "histogram": _histogram(hour_counts, (args.get("bucket") or "auto").strip().lower()),
+    }
+
+def attach_facets_api(sample_bp: Blueprint, live_bp: Blueprint, app):
+    """
+    GET /events/facets and /detections/facets (live + sample) - counts per facet value and a
+    time histogram for the rows the matching list endpoint would page through.
+
+      same filters as /events (event_id, account, ip, from, to, q) or /detections (severity, status, rule, evidence, q)
+      ?facets=host,account  subset (default: all for the scope)
+      ?top=1..100           values per facet, most frequent first (default 10); "other" counts the rest
+      ?bucket=auto|hour|day|week histogram bucket (default auto: the finest that fits;
+                            any bucket is coarsened when the span would need more than
+                            HISTOGRAM_MAX_BUCKETS)
+    """
+
+    def _facets_response(scope, source):
+        try:
+            out = build_facets(scope, source, request.args)
+        except BadEvidenceFilter as e:
+            return bad_evidence_response(e)
+        except KeyError as e:
+            return make_response(jsonify({"error": "bad_facet", "unknown": e.args[0],
+                                          "allowed": list(FACETS[scope][3])}), 400)
+        return make_response(jsonify(out))
+
+    @live_bp.get("/events/facets")
+    @cached_view(scopes=("events",))
+    def live_event_facets():
+        return _facets_response("events", "live")
+
+    @sample_bp.get("/events/facets")
+    @cached_view(scopes=("events",))
+    def sample_event_facets():
+        return _facets_response("events", "sample")
+
+    @live_bp.get("/detections/facets")
+    @cached_view(scopes=("detections",))
+    def live_detection_facets():
+        return _facets_response("detections", "live")
+
+    @sample_bp.get("/detections/facets")
+    @cached_view(scopes=("detections",))
+    def sample_detection_facets():
+        return _facets_response("detections", "sample")
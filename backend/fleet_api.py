@@ -0,0 +1,139 @@
+# backend/fleet_api.py
+from __future__ import annotations
+import base64
+from flask import Blueprint, request, jsonify, make_response
+from sqlalchemy import text
+from .models import db
+from .resp_cache import cached_view
+from .detections_api import normalize_int
+
+FLEET_PAGE_DEFAULT = 100
+FLEET_PAGE_MAX = 1000
+
+# sort key -> column of the per-host aggregate (prefix with "-" for descending)
+FLEET_SORTS = {"score": "score", "failed": "failed", "passed": "passed", "controls": "total",
+               "host": "host", "last_seen": "last_seen"}
+
+# 2-bit cell codes, 4 cells per byte (cell i -> byte i // 4, bits 2*(i % 4))
+CELL_NONE, CELL_PASSED, CELL_FAILED, CELL_OTHER = 0, 1, 2, 3
+CELL_CODES = {"Passed": CELL_PASSED, "Failed": CELL_FAILED}
+
+def _iso(t):
+    return (str(t).replace(" ", "T") + "Z") if t else None
+
+def _pack_cells(codes):
+    out = bytearray((len(codes) + 3) // 4)
+    for i, c in enumerate(codes):
+        if c:
+            out[i >> 2] |= c << ((i & 3) * 2)
+    return base64.b64encode(bytes(out)).decode("ascii")
+
+def _control_dictionary(source):
+    rows = db.session.execute(text("""
+        SELECT control, COUNT(*) AS hosts, SUM(CASE WHEN outcome='Failed' THEN 1 ELSE 0 END) AS failed
+        FROM audit_current
+        WHERE source = :s AND control <> ''
+        GROUP BY control ORDER BY control
+    """), {"s": source}).all()
+    return [{"control": r[0], "hosts": int(r[1]), "failed": int(r[2] or 0)} for r in rows]
+
+def _host_page(source, *, q, sort, descending, limit, offset):
+    col = FLEET_SORTS[sort]
+    where = "source = :s AND control <> ''"
+    params = {"s": source, "lim": limit, "off": offset}
+    if q:
+        where += " AND lower(host) LIKE :q"
+        params["q"] = f"%{q}%"
+    # Score = Passed / (Passed + Failed), same rule as /compliance; hosts with no
+    # pass/fail results sort last either way.
+    return db.session.execute(text(f"""
+        SELECT host, total, passed, failed, last_seen, score, COUNT(*) OVER () AS total_hosts
+        FROM (
+            SELECT host,
+                   COUNT(*) AS total,
+                   SUM(CASE WHEN outcome='Passed' THEN 1 ELSE 0 END) AS passed,
+                   SUM(CASE WHEN outcome='Failed' THEN 1 ELSE 0 END) AS failed,
+                   MAX(time) AS last_seen,
+                   ROUND(100.0 * SUM(CASE WHEN outcome='Passed' THEN 1 ELSE 0 END)
+                         / NULLIF(SUM(CASE WHEN outcome IN ('Passed','Failed') THEN 1 ELSE 0 END), 0), 1) AS score
+            FROM audit_current
+            WHERE {where}
+            GROUP BY host
+        )
+        ORDER BY {col} IS NULL, {col} {"DESC" if descending else "ASC"}, host
+        LIMIT :lim OFFSET :off
+    """), params).all()
+
+def _host_cells(source, hosts, index):
+    cells = {h: [CELL_NONE] * len(index) for h in hosts}
+    if not hosts:
+        return cells
+    rows = db.session.execute(text(f"""
+        SELECT host, control, outcome FROM audit_current
+        WHERE source = :s AND host IN ({', '.join(f':h{i}' for i in range(len(hosts)))})
+    """), {"s": source, **{f"h{i}": h for i, h in enumerate(hosts)}}).all()
+    for host, control, outcome in rows:
+        i = index.get(control)
+        if i is not None:
+            cells[host][i] = CELL_CODES.get(outcome, CELL_OTHER if outcome else CELL_NONE)
+    return cells
+
+def build_fleet(source, *, q="", sort="score", descending=False, limit=FLEET_PAGE_DEFAULT, offset=0):
+    controls = _control_dictionary(source)
+    index = {c["control"]: i for i, c in enumerate(controls)}
+    page = _host_page(source, q=q, sort=sort, descending=descending, limit=limit, offset=offset)
+    cells = _host_cells(source, [r[0] for r in page], index)
+    return {
+        "source": source,
+        "controls": controls,
+        "encoding": {
+            "cells": "base64, 2 bits per control in 'controls' order, 4 per byte, low bits first",
+            "codes": {"none": CELL_NONE, "passed": CELL_PASSED, "failed": CELL_FAILED, "other": CELL_OTHER},
+        },
+        "hosts": [{
+            "host": host,
+            "controls": int(total),
+            "passed": int(passed or 0),
+            "failed": int(failed or 0),
+            "score": score,
+            "last_seen": _iso(last_seen),
+            "cells": _pack_cells(cells[host]),
+        } for host, total, passed, failed, last_seen, score, _ in page],
+        "total_hosts": int(page[0][6]) if page else 0,
+        "sort": ("-" if descending else "") + sort,
+        "limit": limit,
+        "offset": offset,
+    }
+
+def attach_fleet_api(live_bp: Blueprint, app):
+    """
+    GET /api/live/fleet - host x control pass/fail matrix from audit_current
+    (latest outcome per host/control, trigger-maintained; see db_util.ensure_audit_current).
+
+      ?sort=score|failed|passed|controls|host|last_seen  (prefix "-" for descending; default score)
+      ?limit=1..1000 (default 100)  ?offset=N  ?q=host substring
+
+    Controls are a dictionary shared by every page; each host carries its cells bit-packed.
+    """
+
+    @live_bp.get("/fleet")
+    @cached_view()
+    def live_fleet():
+        sort = (request.args.get("sort") or "score").strip()
+        descending = sort.startswith("-")
+        sort = sort.lstrip("-")
+        if sort not in FLEET_SORTS:
+            resp = make_response(jsonify({"error": "bad_sort", "allowed": sorted(FLEET_SORTS)}), 400)
+            resp.headers["X-OCCT-Source"] = "db-live"
+            return resp
+        out = build_fleet(
+            "live",
+            q=(request.args.get("q") or "").strip().lower(),
+            sort=sort,
+            descending=descending,
+            limit=normalize_int(request.args.get("limit"), FLEET_PAGE_DEFAULT, 1, FLEET_PAGE_MAX),
+            offset=normalize_int(request.args.get("offset"), 0, 0),
+        )
+        resp = make_response(jsonify(out))
+        resp.headers["X-OCCT-Source"] = "db-live"
+        return resp
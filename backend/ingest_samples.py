@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 from flask import Flask
 from sqlalchemy.sql import or_
 from .models import db, AuditEvent, SecurityEvent, Detection
+from .db_util import insert_audit_events
 
 def project_root():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
@@ -46,10 +47,12 @@ def ingest_audit(app, audit_json_path):
         db.session.query(AuditEvent).filter(
             or_(AuditEvent.source == "sample", AuditEvent.source.is_(None))
         ).delete(synchronize_session=False)
-        db.session.commit()
+        # no commit until the new rows are in: readers keep seeing the previous scan
+        # (and no data_versions bump caches an empty one) while this runs
 
+        batch = []
         for row in data:
-            evt = AuditEvent(
+            batch.append(dict(
                 time        = parse_time(row.get("time")),
                 category    = (row.get("category") or "Audit").strip(),
                 control     = (row.get("control") or "").strip(),
@@ -58,8 +61,8 @@ def ingest_audit(app, audit_json_path):
                 description = (row.get("description") or "")[:4096],
                 source      = "sample",
                 host        = (row.get("host") or "").strip()[:128] or None
-            )
-            db.session.add(evt); inserted += 1
+            ))
+        inserted = insert_audit_events(batch)   # duplicate rows in the file are skipped
         db.session.commit()
     return inserted
 
@@ -0,0 +1,79 @@
+# backend/live_deltas.py
+"""
+Compact state deltas pushed on the SSE stream after a write commits
+(scan-completed, compliance-changed, detections-count, detections-triaged).
+
+Pages used to poll /last-scan, /dashboard and /detections to notice changes; now the
+runner, poller and ingest paths call in here once per change and every open tab gets
+the result, so each aggregate is computed once per change instead of once per tab.
+"""
+import threading
+from sqlalchemy import func
+
+import backend.notify as _bus
+from .models import db, Detection
+
+_last_sent = {}            # (kind, source) -> last payload, to skip unchanged deltas
+_last_lock = threading.Lock()
+
+def _send(kind, source, payload, only_if_changed=True):
+    with _last_lock:
+        key = (kind, source)
+        if only_if_changed and _last_sent.get(key) == payload:
+            return 0
+        _last_sent[key] = payload
+    return _bus.publish_event(kind, payload)
+
+def publish_scan_deltas(app, source):
+    """After a scan/ingest commit: always scan-completed, compliance-changed when it moved."""
+    from .report_snapshots import schedule_snapshot
+    schedule_snapshot(app, source)          # pre-render the report for the new data version
+    if not _bus.has_listeners():
+        return
+    try:
+        from .api import _last_scan_stats, _compliance_summary
+        with app.app_context():
+            stats = _last_scan_stats(source)
+            summary = _compliance_summary(source)
+        _send("scan-completed", source, {"source": source, **stats}, only_if_changed=False)
+        _send("compliance-changed", source, {"source": source, "summary": summary})
+    except Exception as e:
+        print(f"[deltas] scan deltas for {source} failed: {e}", flush=True)
+
+def detection_counts(source):
+    rows = db.session.query(
+        Detection.severity, Detection.status, func.count(Detection.id)
+    ).filter(Detection.source == source).group_by(Detection.severity, Detection.status).all()
+    by_sev, total, new = {}, 0, 0
+    for sev, status, n in rows:
+        sev = (sev or "medium").lower()
+        by_sev[sev] = by_sev.get(sev, 0) + int(n)
+        total += int(n)
+        if (status or "new").lower() == "new":
+            new += int(n)
+    return {"source": source, "total": total, "new": new, "by_severity": by_sev}
+
+def publish_detection_counts(app, source):
+    """After detections commit: detections-count when totals changed."""
+    if not _bus.has_listeners():
+        return
+    try:
+        with app.app_context():
+            payload = detection_counts(source)
+        _send("detections-count", source, payload)
+    except Exception as e:
+        print(f"[deltas] detection counts for {source} failed: {e}", flush=True)
+
+def publish_detections_triaged(app, source, summary):
+    """After a bulk status change: one detections-triaged event carrying the new counts
+    (instead of an event per row); also refreshes the detections-count dedupe state."""
+    if not summary.get("updated") or not _bus.has_listeners():
+        return
+    try:
+        with app.app_context():
+            counts = detection_counts(source)
+        with _last_lock:
+            _last_sent[("detections-count", source)] = counts
+        _send("detections-triaged", source, {**summary, "counts": counts}, only_if_changed=False)
+    except Exception as e:
+        print(f"[deltas] triage event for {source} failed: {e}", flush=True)
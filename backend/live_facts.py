@@ -1,8 +1,11 @@
 # backend/live_facts.py
 import os, datetime as dt
 from flask import request, jsonify
-from .models import db, AuditEvent
+from .models import db
+from .db_util import insert_audit_events, has_column
 from .live_rules import evaluate_facts_document, load_rules
+from .live_deltas import publish_scan_deltas
+from .resp_cache import cached_view
 
 # Auto-detect rules file: prefer YAML, fallback to JSON
 _RULES_DIR = os.path.join(os.path.dirname(__file__), "rules")
@@ -27,23 +30,18 @@ def _parse_iso(s):
         return None
 
 def _insert_events(rows):
-    inserted = 0
-    for r in rows:
-        evt = AuditEvent(
-            time=_parse_iso(r.get("time")) or dt.datetime.utcnow(),
-            category=(r.get("category") or "")[:64],
-            control=(r.get("control") or "")[:128],
-            outcome=(r.get("outcome") or "Info")[:32],
-            account=(r.get("account") or "")[:128],
-            description=(r.get("description") or "")[:4096],
-        )
-        # Set additive fields if present on the model (Sprint 1 added them)
-        try: evt.source = "live"
-        except Exception: pass
-        try: evt.host = (r.get("host") or "")[:128]
-        except Exception: pass
-
-        db.session.add(evt); inserted += 1
+    batch = [dict(
+        time=_parse_iso(r.get("time")) or dt.datetime.utcnow(),
+        category=(r.get("category") or "")[:64],
+        control=(r.get("control") or "")[:128],
+        outcome=(r.get("outcome") or "Info")[:32],
+        account=(r.get("account") or "")[:128],
+        description=(r.get("description") or "")[:4096],
+        source="live",
+        host=(r.get("host") or "")[:128],
+    ) for r in rows]
+    # Re-posted facts produce identical rows; INSERT OR IGNORE keeps the batch from failing
+    inserted = insert_audit_events(batch)
     db.session.commit()
     return inserted
 
@@ -58,6 +56,7 @@ def attach_live_facts(live_bp, app):
 
         rows = evaluate_facts_document(payload, RULES_PATH)
         n = _insert_events(rows)
+        publish_scan_deltas(app, "live")
         return jsonify({"ok": True, "inserted": n})
     
 def attach_live_compliance(live_bp, app):
@@ -67,12 +66,8 @@ def attach_live_compliance(live_bp, app):
         from sqlalchemy import text
         where = "1=1"
         # Force source='live' if the column exists
-        try:
-            cols = [r[1] for r in db.session.execute(text("PRAGMA table_info(audit_events)")).all()]
-            if "source" in cols:
-                where += " AND source = 'live'"
-        except Exception:
-            pass
+        if has_column("audit_events", "source"):
+            where += " AND source = 'live'"
         sql = text(f"""
             SELECT
               SUM(CASE WHEN outcome='Passed' THEN 1 ELSE 0 END) AS passed,
@@ -92,22 +87,25 @@ def attach_live_compliance(live_bp, app):
             "compliance_pct": round(pct, 1)
         })
 
+def rules_for_ui():
+    """Rules trimmed to what the UI needs (also bundled into /bootstrap)."""
+    return [
+        {
+            "id": r.get("id"),
+            "title": r.get("title"),
+            "category": r.get("category"),
+            "remediation": r.get("remediation", ""),
+            "severity": r.get("severity", ""),
+            "cc_sfr": r.get("cc_sfr", "")
+        }
+        for r in load_rules(RULES_PATH)
+    ]
+
 def attach_live_rules_api(live_bp, app):
     @live_bp.get("/rules")
+    @cached_view(scopes=(), files=lambda: [RULES_PATH])   # versioned by file mtime; source from the blueprint
     def live_rules_api():
         try:
-            rules = load_rules(RULES_PATH)
+            return jsonify(rules_for_ui())
         except Exception as ex:
-            return jsonify({"error": "rules_load_failed", "detail": str(ex)}), 500
-        # Return only what the UI needs
-        return jsonify([
-            {
-                "id": r.get("id"),
-                "title": r.get("title"),
-                "category": r.get("category"),
-                "remediation": r.get("remediation", ""),
-                "severity": r.get("severity", ""),
-                "cc_sfr": r.get("cc_sfr", "")
-            }
-            for r in rules
-        ])
\ No newline at end of file
+            return jsonify({"error": "rules_load_failed", "detail": str(ex)}), 500
\ No newline at end of file
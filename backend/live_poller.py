@@ -9,6 +9,7 @@ from sqlalchemy.exc import IntegrityError
 import backend.notify as _bus
 
 from .models import db, SecurityEvent, Detection, EventBookmark
+from .live_deltas import publish_detection_counts
 
 # ---- instrumentation for clarity ----
 _POLL_STARTED = False
@@ -341,6 +342,8 @@ def _poll_once(app, event_ids, lookback_min, brute_thr, host, source):
                 db.session.add(bm)
 
             db.session.commit()
+            if ins_alerts:
+                publish_detection_counts(app, source)
 
             # single, consistent log line per poll with bus debug info
             st = {}
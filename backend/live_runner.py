@@ -1,8 +1,10 @@
 import os, sys, json, time, queue, threading, subprocess, platform, shutil, uuid, datetime as dt
 from typing import List, Dict, Any, Optional
 from sqlalchemy import text
-from .models import db, AuditEvent
+from .models import db
+from .db_util import insert_audit_events, table_columns
 from .live_rules import evaluate_facts_document
+from .live_deltas import publish_scan_deltas
 
 CREATE_NO_WINDOW = 0x08000000 if os.name == "nt" else 0
 
@@ -54,18 +56,8 @@ def _load_collectors(app) -> List[Dict[str, Any]]:
             app.logger.warning("Invalid collectors.json (%s). Using defaults.", ex)
         return defaults
 
-def _safe_col_names() -> set:
-    cols = set()
-    try:
-        rows = db.session.execute(text("PRAGMA table_info(audit_events)")).all()
-        for r in rows:
-            cols.add(r[1])
-    except Exception:
-        pass
-    return cols
-
 def _delete_previous_for_host(app, host: str):
-    cols = _safe_col_names()
+    cols = table_columns("audit_events")
     where = "source = 'live'"
     params = {}
     if "host" in cols:
@@ -81,7 +73,7 @@ def _delete_previous_for_host(app, host: str):
 def _delete_for_host_rules(app, host: str, rows: List[Dict[str, Any]]):
     if not host or not rows:
         return
-    cols = _safe_col_names()
+    cols = table_columns("audit_events")
     host_col = "host" if "host" in cols else ("account" if "account" in cols else None)
     use_rule_id = "rule_id" in cols
     use_control = "control" in cols
@@ -116,8 +108,11 @@ def _delete_for_host_rules(app, host: str, rows: List[Dict[str, Any]]):
         db.session.commit()
 
 def _insert_events(app, rows: List[Dict[str, Any]]) -> int:
-    inserted = 0
-    cols = _safe_col_names()
+    cols = table_columns("audit_events")
+    # Optional rule metadata columns, written only when the table has them
+    limits = {"severity": 16, "rule_id": 128, "remediation": 4096, "cc_sfr": 64}
+    extra = [c for c in limits if c in cols]
+    batch = []
     with app.app_context():
         for r in rows:
             try:
@@ -130,79 +125,41 @@ def _insert_events(app, rows: List[Dict[str, Any]]) -> int:
                         time_val = dt.datetime.utcnow()
                 else:
                     time_val = dt.datetime.utcnow()
-                evt = AuditEvent(
+                row = dict(
                     time=time_val,
                     category=(r.get("category") or "")[:64],
                     control=(r.get("control") or "")[:128],
                     outcome=(r.get("outcome") or "Info")[:32],
                     account=(r.get("account") or "")[:128],
                     description=(r.get("description") or "")[:4096],
+                    source="live",
+                    host=(r.get("host") or "")[:128],
                 )
-                try:
-                    evt.source = "live"
-                except Exception:
-                    pass
-                try:
-                    evt.host = (r.get("host") or "")[:128]
-                except Exception:
-                    pass
-                try:
-                    if "severity" in cols:
-                        evt.severity = (r.get("severity") or "")[:16]
-                except Exception:
-                    pass
-                try:
-                    if "rule_id" in cols:
-                        evt.rule_id = (r.get("rule_id") or "")[:128]
-                except Exception:
-                    pass
-                try:
-                    if "remediation" in cols:
-                        evt.remediation = (r.get("remediation") or "")[:4096]
-                except Exception:
-                    pass
-                try:
-                    if "cc_sfr" in cols:
-                        evt.cc_sfr = (r.get("cc_sfr") or "")[:64]
-                except Exception:
-                    pass
-                db.session.add(evt)
-                inserted += 1
+                for c in extra:
+                    row[c] = (r.get(c) or "")[:limits[c]]
+                batch.append(row)
             except Exception as ex:
                 from flask import current_app as app
                 app.logger.warning("Runner: skip bad row: %s", ex)
+        # Duplicate rows (same check re-reported in one scan) are skipped, not fatal
+        inserted = insert_audit_events(batch, extra_cols=extra)
         db.session.commit()
     return inserted
 
 def _summary_for_hosts(app, hosts: List[str]) -> Dict[str, int]:
-    cols = _safe_col_names()
-    where = "source = 'live'"
-    host_col = "host" if "host" in cols else ("account" if "account" in cols else None)
-    total = 0
-    failed = 0
+    # One aggregate over the per-host current state (db_util.ensure_audit_current)
+    hosts = sorted({h for h in hosts if h})
+    if not hosts:
+        return {"total": 0, "failed": 0}
     with app.app_context():
-        if host_col is None:
-            row = db.session.execute(text(f"""
-                SELECT
-                  COUNT(*) AS total,
-                  SUM(CASE WHEN outcome='Failed' THEN 1 ELSE 0 END) AS failed
-                FROM audit_events
-                WHERE {where}
-            """)).first()
-            total += int(row[0] or 0)
-            failed += int(row[1] or 0)
-        else:
-            for h in hosts:
-                row = db.session.execute(text(f"""
-                    SELECT
-                      COUNT(*) AS total,
-                      SUM(CASE WHEN outcome='Failed' THEN 1 ELSE 0 END) AS failed
-                    FROM audit_events
-                    WHERE {where} AND {host_col} = :h
-                """), {"h": h}).first()
-                total += int(row[0] or 0)
-                failed += int(row[1] or 0)
-    return {"total": total, "failed": failed}
+        row = db.session.execute(text(f"""
+            SELECT
+              COUNT(*) AS total,
+              SUM(CASE WHEN outcome='Failed' THEN 1 ELSE 0 END) AS failed
+            FROM audit_current
+            WHERE source = 'live' AND host IN ({', '.join(f':h{i}' for i in range(len(hosts)))})
+        """), {f"h{i}": h for i, h in enumerate(hosts)}).first()
+    return {"total": int(row[0] or 0), "failed": int(row[1] or 0)}
 
 def _now_iso():
     return dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
@@ -300,6 +257,7 @@ class Runner:
         if dur is not None:
             self.jobs[job_id]["duration_ms"] = dur
         self.jobs[job_id]["status"] = "done" if ok_all else "error"
+        publish_scan_deltas(self.app, "live")
 
     def _run_collector(self, col: Dict[str, Any]) -> Dict[str, Any]:
         script = col.get("script")
@@ -69,6 +69,13 @@ class SecurityEvent(db.Model):
             d["raw_xml"] = self.raw_xml
         return d
 
+def _evidence_key(key):
+    # JSON1 lookup of one evidence key; NULL (not an error) for rows whose evidence isn't JSON
+    return f"CASE WHEN json_valid(evidence) THEN json_extract(evidence, '$.{key}') END"
+
+# Hot evidence keys -> generated column (?evidence= filters; indexed in db_util.EVIDENCE_INDEXES)
+EVIDENCE_COLUMNS = {"last_ip": "ev_last_ip", "count": "ev_count", "group": "ev_group", "member": "ev_member"}
+
 class Detection(db.Model):
     __tablename__ = "detections"
     id       = db.Column(db.Integer, primary_key=True)
@@ -81,7 +88,12 @@ class Detection(db.Model):
     ip       = db.Column(db.String(64))
     source   = db.Column(db.String(16), index=True, default="sample")
     host     = db.Column(db.String(128))
-    status   = db.Column(db.String(16), index=True, default="new")  # new|ack|muted
+    status   = db.Column(db.String(16), default="new")              # new|ack|muted (bulk-updated, not indexed)
+    # VIRTUAL generated columns: computed on read, stored only in their partial indexes
+    ev_last_ip = db.Column(db.String(64), db.Computed(_evidence_key("last_ip"), persisted=False))
+    ev_count   = db.Column(db.Integer, db.Computed(_evidence_key("count"), persisted=False))
+    ev_group   = db.Column(db.String(128, collation="NOCASE"), db.Computed(_evidence_key("group"), persisted=False))
+    ev_member  = db.Column(db.String(128, collation="NOCASE"), db.Computed(_evidence_key("member"), persisted=False))
 
     def to_dict(self):
         return {
@@ -1,104 +1,550 @@
 # backend/notify.py
 from __future__ import annotations
 import json
+import sqlite3
 import threading
 import time
 from collections import deque
-from typing import Dict, Any, Iterable
+from typing import Dict, Any, Iterable, Optional
 import os
 import sys
 
-# In-memory, REAL-TIME broadcaster (no DB replay, no 'id:' lines)
+# REAL-TIME broadcaster (no DB replay, no 'id:' lines)
+#
+# Transports (SSE_BUS_BACKEND):
+#   "local"  - in-process fan-out only. Fine for a single server process.
+#   "sqlite" - every publish is also appended to a small WAL-mode SQLite event log
+#              (instance/occt_bus.db) that each worker process tails, so SSE clients
+#              connected to ANY worker see detections published by any other one.
+# Either way the public API is the same: publish_detection() / sse_stream().
+#
+# Besides `detection`, the stream carries small state deltas (publish_event):
+#   scan-completed, compliance-changed, detections-count, detections-triaged
+# Those are not subject to subscription filters; every client gets them.
+
+MAX_QUEUE = 1000   # per-client backlog; past this the oldest queued event is dropped
 
 class _Client:
     def __init__(self) -> None:
-        self.q = deque()                 # queue of payload dicts
+        self.q = deque()                 # queue of (event kind, payload dict, published_at)
         self.cv = threading.Condition()  # wait/notify
+        # diagnostics (see metrics_snapshot)
+        self.connected_at = time.time()
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.last_write_ms = None
+        self.filter_key = None
 
-    def push(self, payload: Dict[str, Any]) -> None:
+    def push(self, payload: Dict[str, Any], published_at: Optional[float] = None, kind: str = "detection") -> None:
         with self.cv:
-            self.q.append(payload)
+            if len(self.q) >= MAX_QUEUE:
+                self.q.popleft()
+                self.dropped += 1
+                _count_drop("queue_overflow")
+            self.q.append((kind, payload, published_at or time.time()))
             self.cv.notify()
 
-_clients: set[_Client] = set()
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "kind": "threaded",
+            "connected_at": round(self.connected_at, 3),
+            "queue_depth": len(self.q),
+            "events_sent": self.events_sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+            "last_write_latency_ms": self.last_write_ms,
+            "filter": _describe_filter(self.filter_key),
+        }
+
+# --------- metrics: publish rate, fan-out time, drops, bytes ---------
+class _Histogram:
+    BOUNDS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500)
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(self.BOUNDS_MS) + 1)
+        self.sum_ms = 0.0
+        self.count = 0
+
+    def observe(self, ms: float) -> None:
+        i = 0
+        while i < len(self.BOUNDS_MS) and ms > self.BOUNDS_MS[i]:
+            i += 1
+        self.buckets[i] += 1
+        self.sum_ms += ms
+        self.count += 1
+
+    def cumulative(self):
+        out, acc = [], 0
+        for bound, n in zip(list(self.BOUNDS_MS) + ["+Inf"], self.buckets):
+            acc += n
+            out.append((str(bound), acc))
+        return out
+
+_metrics_lock = threading.Lock()
+_fanouts: Dict[str, int] = {}                        # kind -> fan-outs done in this process
+_drops = {"queue_overflow": 0, "slow_consumer": 0, "push_error": 0}
+_sent = {"events": 0, "bytes": 0}                    # totals incl. departed clients
+_fanout_ms = {"bus": _Histogram(), "async": _Histogram()}
+_recent_fanouts: deque = deque(maxlen=10000)         # timestamps, for the 60s rate
+RATE_WINDOW_SEC = 60
+
+def _count_drop(reason: str, n: int = 1) -> None:
+    with _metrics_lock:
+        _drops[reason] = _drops.get(reason, 0) + n
+
+def _count_sent(events: int, nbytes: int) -> None:
+    with _metrics_lock:
+        _sent["events"] += events
+        _sent["bytes"] += nbytes
+
+def _observe_fanout(stage: str, kind: str, ms: float) -> None:
+    with _metrics_lock:
+        _fanout_ms[stage].observe(ms)
+        if stage == "bus":
+            _fanouts[kind] = _fanouts.get(kind, 0) + 1
+            _recent_fanouts.append(time.time())
+
+def _publish_rate() -> float:
+    cutoff = time.time() - RATE_WINDOW_SEC
+    with _metrics_lock:
+        n = sum(1 for t in _recent_fanouts if t >= cutoff)
+    return round(n / RATE_WINDOW_SEC, 4)
+
+def _describe_filter(key) -> Optional[Dict[str, Any]]:
+    if not key or key == (0, frozenset(), None, None):
+        return None
+    rank, rules, host, account = key
+    sev = next((k for k, v in SEVERITY_RANK.items() if v == rank), None)
+    return {"min_severity": sev, "rule_id": sorted(rules) or None, "host": host, "account": account}
+
+# --------- server-side subscription filters ---------
+SEVERITY_RANK = {"low": 1, "medium": 2, "high": 3, "critical": 4}
+
+class SubscriptionFilter:
+    """
+    What a stream subscriber wants to see: severity floor, rule_id set, host, account.
+    Subscribers with equal filters share one `key`, so publish evaluates each distinct
+    filter once and then enqueues to the whole bucket.
+    """
+    __slots__ = ("min_rank", "rules", "host", "account", "key")
+
+    def __init__(self, min_severity=None, rules=None, host=None, account=None) -> None:
+        self.min_rank = SEVERITY_RANK.get((min_severity or "").strip().lower(), 0)
+        self.rules = frozenset(r.strip().upper() for r in (rules or []) if r and r.strip())
+        self.host = (host or "").strip().lower() or None
+        self.account = (account or "").strip().lower() or None
+        self.key = (self.min_rank, self.rules, self.host, self.account)
+
+    @classmethod
+    def from_args(cls, args) -> "SubscriptionFilter":
+        """Build from request args (?min_severity=high&rule_id=A,B&host=H&account=U)."""
+        rules = []
+        for name in ("rule_id", "rule"):
+            for v in args.getlist(name) if hasattr(args, "getlist") else [args.get(name) or ""]:
+                rules.extend((v or "").split(","))
+        return cls(
+            min_severity=args.get("min_severity") or args.get("severity"),
+            rules=rules,
+            host=args.get("host"),
+            account=args.get("account"),
+        )
+
+    def matches(self, payload: Dict[str, Any]) -> bool:
+        if self.min_rank and SEVERITY_RANK.get(str(payload.get("severity") or "medium").lower(), 2) < self.min_rank:
+            return False
+        if self.rules and str(payload.get("rule_id") or "").upper() not in self.rules:
+            return False
+        if self.host and str(payload.get("host") or "").strip().lower() != self.host:
+            return False
+        if self.account and str(payload.get("account") or "").strip().lower() != self.account:
+            return False
+        return True
+
+_MATCH_ALL = SubscriptionFilter()
+
+# Subscribers indexed by filter key: {key: (filter, {client, ...})}
+_subs: Dict[tuple, tuple] = {}
+_clients: set = set()           # flat view, kept for debug/state
 _clients_lock = threading.Lock()
 
+def _subscribe(client, filt: Optional[SubscriptionFilter] = None) -> None:
+    filt = filt or _MATCH_ALL
+    if isinstance(client, _Client):
+        client.filter_key = filt.key
+    with _clients_lock:
+        bucket = _subs.get(filt.key)
+        if bucket is None:
+            bucket = _subs[filt.key] = (filt, set())
+        bucket[1].add(client)
+        _clients.add(client)
+    _transport.ensure_tail()
+
+def _unsubscribe(client, filt: Optional[SubscriptionFilter] = None) -> None:
+    filt = filt or _MATCH_ALL
+    with _clients_lock:
+        _clients.discard(client)
+        bucket = _subs.get(filt.key)
+        if bucket is not None:
+            bucket[1].discard(client)
+            if not bucket[1]:
+                del _subs[filt.key]
+
 # Helpful identifiers to detect accidental duplicate module singletons
 _BUS_ID = id(sys.modules[__name__])
-_PID = os.getpid()
+
+def _origin() -> str:
+    # read per call: a preload/fork server imports once, then forks the workers
+    return f"{os.getpid()}:{_BUS_ID}"
+
+# --------- publish -> client write latency (end-to-end, per process) ---------
+_lat_lock = threading.Lock()
+_latency = {"count": 0, "last_ms": None, "avg_ms": None, "max_ms": None}
+
+def _record_latency(published_at: float) -> float:
+    ms = max(0.0, (time.time() - published_at) * 1000.0)
+    with _lat_lock:
+        n = _latency["count"] + 1
+        prev = _latency["avg_ms"] or 0.0
+        _latency["count"] = n
+        _latency["last_ms"] = round(ms, 3)
+        _latency["avg_ms"] = round(prev + (ms - prev) / n, 3)
+        _latency["max_ms"] = round(max(_latency["max_ms"] or 0.0, ms), 3)
+    return round(ms, 3)
 
 def _iter_events(client: _Client):
     """Yield SSE forever for this client. Only items queued AFTER connect are sent."""
     # identify the implementation on connect
-    yield f": connected (occt-inmem-rt)\n\n"
+    hello = f": connected (occt-{_transport.name}-rt)\n\n"
+    yield hello
+    client.bytes_sent += len(hello)
 
     KEEPALIVE_SEC = 15
     last_ping = time.time()
 
     while True:
-        payload = None
+        item = None
         with client.cv:
             if not client.q:
                 # wait until either we get data or it’s time to ping
                 remaining = max(0.0, KEEPALIVE_SEC - (time.time() - last_ping))
                 client.cv.wait(timeout=remaining)
             if client.q:
-                payload = client.q.popleft()
+                item = client.q.popleft()
 
-        if payload is not None:
+        if item is not None:
+            kind, payload, published_at = item
             # No 'id:' lines -> browser won't send Last-Event-ID -> no replay
             data = json.dumps(payload, ensure_ascii=False)
-            yield f"event: detection\ndata: {data}\n\n"
+            chunk = f"event: {kind}\ndata: {data}\n\n"
+            yield chunk
+            nbytes = len(chunk.encode("utf-8"))
+            client.last_write_ms = _record_latency(published_at)
+            client.events_sent += 1
+            client.bytes_sent += nbytes
+            _count_sent(1, nbytes)
             continue
 
         # keepalive
         if time.time() - last_ping >= KEEPALIVE_SEC:
             last_ping = time.time()
-            yield "event: ping\ndata: {}\n\n"
+            ping = "event: ping\ndata: {}\n\n"
+            yield ping
+            client.bytes_sent += len(ping)
+            _count_sent(0, len(ping))
+
+def _deliver_local(payload: Dict[str, Any], published_at: float, kind: str = "detection") -> int:
+    """Fan a payload out to the matching SSE clients connected to THIS process."""
+    t0 = time.perf_counter()
+    sent = 0
+    targets = []
+    with _clients_lock:
+        # one match per distinct filter; only matching buckets are copied
+        for filt, clients in _subs.values():
+            if kind != "detection" or filt is _MATCH_ALL or filt.matches(payload):
+                targets.extend(clients)
+    for c in targets:
+        try:
+            c.push(payload, published_at, kind)
+            sent += 1
+        except Exception:
+            _count_drop("push_error")
+    _observe_fanout("bus", kind, (time.perf_counter() - t0) * 1000.0)
+    return sent
 
-def sse_stream() -> Iterable[str]:
+# --------- transports ---------
+class _LocalTransport:
+    name = "inmem"
+
+    def publish(self, payload: Dict[str, Any], kind: str = "detection") -> int:
+        return _deliver_local(payload, time.time(), kind)
+
+    def ensure_tail(self) -> None:
+        pass
+
+    def state(self) -> Dict[str, Any]:
+        return {}
+
+class _SqliteTransport:
+    """
+    Cross-process transport backed by an append-only SQLite event log in WAL mode.
+    The publisher delivers to its own clients immediately; a tail thread, started in
+    each process when its first client subscribes, picks up rows written by OTHER
+    processes and delivers them locally.
+    """
+    name = "sqlite"
+
+    def __init__(self, path: str, poll_ms: int = 50, retain_sec: int = 300) -> None:
+        self.path = path
+        self.poll_sec = max(int(poll_ms), 5) / 1000.0
+        self.retain_sec = max(int(retain_sec), 30)
+        self._local = threading.local()
+        self._tail_lock = threading.Lock()
+        self._tail_pid = None
+        self.last_id = 0
+        self.errors = 0
+        con = self._con()
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS bus_events (
+              id      INTEGER PRIMARY KEY AUTOINCREMENT,
+              ts      REAL NOT NULL,
+              origin  TEXT NOT NULL,
+              payload TEXT NOT NULL,
+              kind    TEXT NOT NULL DEFAULT 'detection'
+            )
+        """)
+        try:
+            con.execute("ALTER TABLE bus_events ADD COLUMN kind TEXT NOT NULL DEFAULT 'detection'")
+        except sqlite3.OperationalError:
+            pass  # already there
+
+    def _con(self) -> sqlite3.Connection:
+        # a connection inherited across fork() must not be used by the child
+        con = getattr(self._local, "con", None)
+        if con is None or getattr(self._local, "pid", None) != os.getpid():
+            con = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con, self._local.pid = con, os.getpid()
+        return con
+
+    def ensure_tail(self) -> None:
+        """Start this process's tail thread (threads don't survive fork, so check the pid)."""
+        pid = os.getpid()
+        if self._tail_pid == pid:
+            return
+        with self._tail_lock:
+            if self._tail_pid == pid:
+                return
+            # Real-time only: start tailing from the current end of the log
+            self.last_id = self._con().execute("SELECT COALESCE(MAX(id), 0) FROM bus_events").fetchone()[0]
+            threading.Thread(target=self._tail_loop, name="occt-sse-bus-tail", daemon=True).start()
+            self._tail_pid = pid
+
+    def publish(self, payload: Dict[str, Any], kind: str = "detection") -> int:
+        now = time.time()
+        try:
+            self._con().execute(
+                "INSERT INTO bus_events (ts, origin, payload, kind) VALUES (?, ?, ?, ?)",
+                (now, _origin(), json.dumps(payload, ensure_ascii=False), kind),
+            )
+        except Exception as e:
+            self.errors += 1
+            print(f"[sse-bus] publish to {self.path} failed: {e}", flush=True)
+        return _deliver_local(payload, now, kind)
+
+    def _tail_loop(self) -> None:
+        last_prune = 0.0
+        origin = _origin()
+        while True:
+            try:
+                con = self._con()
+                rows = con.execute(
+                    "SELECT id, ts, origin, payload, kind FROM bus_events WHERE id > ? ORDER BY id",
+                    (self.last_id,),
+                ).fetchall()
+                for rid, ts, row_origin, body, kind in rows:
+                    self.last_id = rid
+                    if row_origin == origin:
+                        continue  # already delivered by publish()
+                    try:
+                        _deliver_local(json.loads(body), ts, kind)
+                    except Exception:
+                        pass
+                now = time.time()
+                if now - last_prune > 60:
+                    last_prune = now
+                    con.execute("DELETE FROM bus_events WHERE ts < ?", (now - self.retain_sec,))
+            except Exception as e:
+                self.errors += 1
+                print(f"[sse-bus] tail error: {e}", flush=True)
+                time.sleep(1.0)
+            time.sleep(self.poll_sec)
+
+    def state(self) -> Dict[str, Any]:
+        return {"path": self.path, "tailing": self._tail_pid == os.getpid(), "last_id": self.last_id, "poll_ms": int(self.poll_sec * 1000), "errors": self.errors}
+
+_transport = _LocalTransport()
+
+def configure_bus(app) -> None:
+    """
+    Select the bus transport from app config (SSE_BUS_BACKEND = 'local' | 'sqlite').
+    Call once at startup, after config is loaded and before any client connects.
+    """
+    global _transport
+    kind = (app.config.get("SSE_BUS_BACKEND") or "local").strip().lower()
+    if kind != "sqlite":
+        _transport = _LocalTransport()
+        return
+    path = app.config.get("SSE_BUS_PATH") or os.path.join(app.instance_path, "occt_bus.db")
+    try:
+        _transport = _SqliteTransport(
+            path,
+            poll_ms=int(app.config.get("SSE_BUS_POLL_MS", 50)),
+            retain_sec=int(app.config.get("SSE_BUS_RETAIN_SEC", 300)),
+        )
+        print(f"[sse-bus] cross-process transport: sqlite ({path})", flush=True)
+    except Exception as e:
+        _transport = _LocalTransport()
+        print(f"[sse-bus] sqlite transport unavailable ({e}); falling back to in-process", flush=True)
+
+def sse_stream(filters: Optional[SubscriptionFilter] = None) -> Iterable[str]:
     """
     Server-Sent Events generator.
     - REAL-TIME ONLY: no replay, no DB reads, no 'id:' lines.
+    - `filters` limits which detections are enqueued for this client at all.
     """
     client = _Client()
-    with _clients_lock:
-        _clients.add(client)
+    _subscribe(client, filters)
     try:
         for chunk in _iter_events(client):
             yield chunk
     finally:
-        with _clients_lock:
-            _clients.discard(client)
+        _unsubscribe(client, filters)
 
 def publish_detection(payload: Dict[str, Any]) -> int:
     """
-    Push a detection to all connected SSE clients.
+    Push a detection to all connected SSE clients (in every worker when the
+    sqlite transport is configured). Returns the number of LOCAL clients reached.
     Keys we expect: rule_id, summary, severity, account?, host?, ip?, when?
     """
-    sent = 0
+    return _transport.publish(payload)
+
+def has_listeners() -> bool:
+    """False only when nobody anywhere can receive a publish (lets callers skip work)."""
+    if not isinstance(_transport, _LocalTransport):
+        return True  # clients may be connected to other workers
     with _clients_lock:
-        targets = list(_clients)
-    for c in targets:
-        try:
-            c.push(payload)
-            sent += 1
-        except Exception:
-            pass
-    return sent
+        return bool(_clients)
+
+DELTA_EVENTS = ("scan-completed", "compliance-changed", "detections-count", "detections-triaged")
+
+def publish_event(kind: str, payload: Dict[str, Any]) -> int:
+    """
+    Push a small state delta (see DELTA_EVENTS) to every connected client so pages
+    can update without re-polling. Returns the number of LOCAL clients reached.
+    """
+    if kind not in DELTA_EVENTS:
+        raise ValueError(f"unknown SSE event kind: {kind}")
+    return _transport.publish(payload, kind)
 
 # --------- DEBUG HELPERS (used by /api/live/debug/*) ---------
 def _debug_state():
     with _clients_lock:
-        return {
-            "bus_id": _BUS_ID,
-            "pid": _PID,
-            "clients": len(_clients),
-            "clients_set_id": id(_clients),
+        n = len(_clients)
+        n_filters = len(_subs)
+    with _lat_lock:
+        lat = dict(_latency)
+    return {
+        "bus_id": _BUS_ID,
+        "pid": os.getpid(),
+        "clients": n,
+        "clients_set_id": id(_clients),
+        "filter_buckets": n_filters,
+        "transport": _transport.name,
+        "transport_state": _transport.state(),
+        "latency_ms": lat,
+    }
+
+def metrics_snapshot(client_limit: int = 100) -> Dict[str, Any]:
+    """
+    Bus-wide metrics plus per-client diagnostics for the threaded stream clients.
+    Clients are listed deepest-queue first (slow consumers on top), capped at client_limit.
+    """
+    with _clients_lock:
+        clients = [c for c in _clients if isinstance(c, _Client)]
+    details = sorted((c.stats() for c in clients), key=lambda d: (-d["queue_depth"], d["connected_at"]))
+    with _metrics_lock:
+        out = {
+            "publish_rate_per_sec": None,
+            "fanouts_total": dict(_fanouts),
+            "drops_total": dict(_drops),
+            "sent_total": dict(_sent),
+            "fanout_ms": {
+                stage: {"buckets": dict(h.cumulative()), "sum": round(h.sum_ms, 3), "count": h.count}
+                for stage, h in _fanout_ms.items()
+            },
         }
+    out["publish_rate_per_sec"] = _publish_rate()
+    out["queue_depth_max"] = max((d["queue_depth"] for d in details), default=0)
+    out["clients"] = details[:max(int(client_limit), 0)]
+    return out
+
+def metrics_text(extra_gauges: Optional[Dict[str, float]] = None) -> str:
+    """Prometheus-style text exposition of metrics_snapshot() (no per-client series)."""
+    m = metrics_snapshot(client_limit=0)
+    st = _debug_state()
+    lines = [
+        "# HELP occt_sse_clients Connected SSE subscribers in this process.",
+        "# TYPE occt_sse_clients gauge",
+        f'occt_sse_clients{{pid="{st["pid"]}"}} {st["clients"]}',
+        "# TYPE occt_sse_filter_buckets gauge",
+        f"occt_sse_filter_buckets {st['filter_buckets']}",
+        "# TYPE occt_sse_queue_depth_max gauge",
+        f"occt_sse_queue_depth_max {m['queue_depth_max']}",
+        "# HELP occt_sse_publish_rate_per_sec Fan-outs per second over the last minute.",
+        "# TYPE occt_sse_publish_rate_per_sec gauge",
+        f"occt_sse_publish_rate_per_sec {m['publish_rate_per_sec']}",
+        "# TYPE occt_sse_fanouts_total counter",
+    ]
+    lines += [f'occt_sse_fanouts_total{{kind="{k}"}} {v}' for k, v in sorted(m["fanouts_total"].items())]
+    lines.append("# TYPE occt_sse_drops_total counter")
+    lines += [f'occt_sse_drops_total{{reason="{k}"}} {v}' for k, v in sorted(m["drops_total"].items())]
+    lines += [
+        "# TYPE occt_sse_events_sent_total counter",
+        f"occt_sse_events_sent_total {m['sent_total']['events']}",
+        "# TYPE occt_sse_bytes_sent_total counter",
+        f"occt_sse_bytes_sent_total {m['sent_total']['bytes']}",
+        "# HELP occt_sse_fanout_ms Time spent matching + enqueueing one publish.",
+        "# TYPE occt_sse_fanout_ms histogram",
+    ]
+    for stage, h in m["fanout_ms"].items():
+        lines += [f'occt_sse_fanout_ms_bucket{{stage="{stage}",le="{le}"}} {n}' for le, n in h["buckets"].items()]
+        lines.append(f'occt_sse_fanout_ms_sum{{stage="{stage}"}} {h["sum"]}')
+        lines.append(f'occt_sse_fanout_ms_count{{stage="{stage}"}} {h["count"]}')
+    lat = st["latency_ms"]
+    lines += [
+        "# TYPE occt_sse_write_latency_ms_last gauge",
+        f"occt_sse_write_latency_ms_last {lat['last_ms'] if lat['last_ms'] is not None else 'NaN'}",
+        "# TYPE occt_sse_write_latency_ms_max gauge",
+        f"occt_sse_write_latency_ms_max {lat['max_ms'] if lat['max_ms'] is not None else 'NaN'}",
+    ]
+    for name, value in (extra_gauges or {}).items():
+        lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
 
 def _debug_clear():
-    # nothing buffered globally; return state
+    # nothing buffered globally; reset latency + metrics and return state
+    with _lat_lock:
+        _latency.update({"count": 0, "last_ms": None, "avg_ms": None, "max_ms": None})
+    with _metrics_lock:
+        _fanouts.clear()
+        for k in _drops:
+            _drops[k] = 0
+        _sent.update({"events": 0, "bytes": 0})
+        for stage in _fanout_ms:
+            _fanout_ms[stage] = _Histogram()
+        _recent_fanouts.clear()
     return _debug_state()
 
 # --------- Single-bus alias to avoid accidental duplicate modules ----------
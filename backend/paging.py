@@ -0,0 +1,37 @@
+# backend/paging.py
+"""
+Keyset (cursor) pagination shared by /audit, /events and /detections.
+
+Lists are ordered newest first on (time, id); a cursor is the opaque (time, id) of the
+last row served, and the next page is "rows strictly before it" - an index range seek,
+so page N costs the same as page 1 (OFFSET re-reads every skipped row).
+"""
+import base64
+import datetime as dt
+
+from sqlalchemy import tuple_, literal, desc
+
+def encode_cursor(t, row_id):
+    raw = f"{t.isoformat() if t else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    """(time, id) from an opaque cursor; ValueError when malformed."""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+    t, _, row_id = raw.partition("|")
+    return dt.datetime.fromisoformat(t), int(row_id)
+
+def keyset_newest_first(query, time_col, id_col, after=None):
+    """Order by (time, id) DESC and, with a decoded cursor, keep only rows before it."""
+    if after is not None:
+        t, row_id = after
+        query = query.filter(tuple_(time_col, id_col) < tuple_(literal(t, time_col.type), literal(row_id)))
+    return query.order_by(desc(time_col), desc(id_col))
+
+def page_with_cursor(query, limit, time_attr, id_attr="id"):
+    """(rows, next_cursor) - fetches one extra row to know whether another page exists."""
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(getattr(last, time_attr), getattr(last, id_attr))
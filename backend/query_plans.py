@@ -0,0 +1,173 @@
+# backend/query_plans.py
+"""
+EXPLAIN QUERY PLAN regression check for the read API.
+
+Calls every GET /api/* endpoint (plus the filter/sort/cursor variants in FILTER_CASES)
+through the Flask test client, captures each SELECT it issues, and EXPLAINs it. A plan
+that walks a whole big table - "SCAN audit_events", with or without an index - fails the
+check; index range reads ("SEARCH ... USING INDEX") and FTS lookups pass. So does a
+SEARCH whose only constraint is (source=?) - except in a case that filters on something
+besides the source, where it means every row of the source is read to test the filter.
+The accepted ones (substring LIKEs, newest-first pages that stop once full) are listed
+with their reason in KNOWN_SOURCE_SCANS and reported without failing the check.
+
+    python -m backend.query_plans            # runs against instance/occt.db, exit 1 on a full scan
+    python -m backend.query_plans -v         # also print every captured plan
+"""
+import re
+import sys
+
+from sqlalchemy import event
+
+from .models import db
+
+WATCHED_TABLES = ("audit_events", "security_events", "detections", "audit_current", "event_rollups")
+
+# Endpoints that never finish (SSE) or only write
+SKIP_PATHS = ("/api/live/stream", "/api/live/notify/test")
+
+_CURSOR = "MjEwMC0wMS0wMVQwMDowMDowMHw5MjIzMzcyMDM2ODU0Nzc1ODA3"   # (2100-01-01, max id)
+
+FILTER_CASES = [
+    f"/api/{m}/{path}" for m in ("live", "sample") for path in (
+        "audit?category=Account&outcome=Failed",
+        "audit?from=2025-01-01&to=2025-12-31",
+        "audit?q=password",
+        f"audit?cursor={_CURSOR}",
+        "dashboard?bucket=week&weeks=12",
+        "events?event_id=4625",
+        "events?event_id=4625,4624",
+        "events?account=admin&ip=10.0",
+        "events?q=logon",
+        "events?q=logon&sort=relevance",
+        f"events?cursor={_CURSOR}",
+        "events?page=3",
+        "events?from=2026-01-01&to=2026-01-31",
+        "events?event_id=4625&from=2026-01-01T06:00:00Z",
+        "detections?severity=high",
+        "detections?status=new",
+        "detections?rule=brute",
+        "detections?q=failed",
+        "detections?evidence=last_ip=10.0.0.5",
+        "detections?evidence=count>50",
+        "detections?evidence=group=Domain Admins,member=bob",
+        f"detections?cursor={_CURSOR}",
+        "events/facets?event_id=4625",
+        "events/facets?q=logon&facets=host,ip&bucket=day",
+        "events/facets?event_id=4625&account=adm&from=2026-01-01&bucket=day",
+        "detections/facets?severity=high",
+        "detections/facets?status=new&facets=rule_id",
+        "detections/facets?evidence=count>=10",
+        "bootstrap?include=dashboard,audit,rules,last_scan,weighted",
+    )
+] + [
+    "/api/live/fleet?sort=-failed",
+    "/api/live/fleet?sort=host&q=srv&offset=100",
+]
+
+# Query args that page, sort or shape the response rather than filter rows
+SHAPE_ARGS = ("page", "pagesz", "limit", "offset", "cursor", "sort", "include", "facets", "top",
+              "bucket", "weeks")
+
+_NEWEST_FIRST = "the page walks (source, time) newest first and stops once it is full"
+
+# Filtered cases that are allowed to read a source through a (source=?) index, and why
+KNOWN_SOURCE_SCANS = {
+    f"/api/{m}/{path}": why for m in ("live", "sample") for path, why in (
+        ("audit?q=password", "the source's rows are walked and tested against the FTS matches"),
+        ("events?event_id=4625,4624", _NEWEST_FIRST + "; an IN list can't keep time order"),
+        ("events?account=admin&ip=10.0", "account/ip are substring LIKEs"),
+        ("events?q=logon", _NEWEST_FIRST + "; FTS matches are tested per row"),
+        ("detections?rule=brute", "rule is a substring LIKE"),
+        ("detections?q=failed", _NEWEST_FIRST + "; FTS matches are tested per row"),
+    )
+}
+KNOWN_SOURCE_SCANS["/api/live/fleet?sort=host&q=srv&offset=100"] = \
+    "the matrix aggregates every host of the source; q is a substring LIKE"
+
+_SCAN_RE = re.compile(r"^SCAN (\w+)")
+_SOURCE_ONLY_RE = re.compile(r"^SEARCH (\w+) USING (?:COVERING )?INDEX \w+ \(source=\?\)$")
+_SOURCE_ONLY_SQL_RE = re.compile(r"\bWHERE\s+(?:\w+\.)?source\s*=\s*\?\s*(?:LIMIT\s+\d+\s*)?$", re.I)
+
+def _filters_rows(path):
+    """True when the case's query string filters on something besides the source."""
+    query = path.partition("?")[2]
+    return any(arg.partition("=")[0] not in SHAPE_ARGS for arg in query.split("&") if arg)
+
+def _full_scans(plan_rows, filtered=False):
+    out = []
+    for row in plan_rows:
+        detail = row[-1]
+        m = _SCAN_RE.match(detail) or (_SOURCE_ONLY_RE.match(detail) if filtered else None)
+        if m and m.group(1) in WATCHED_TABLES and "VIRTUAL TABLE" not in detail:
+            out.append(detail)
+    return out
+
+def _get_paths(app):
+    paths = set()
+    for rule in app.url_map.iter_rules():
+        if "GET" in rule.methods and rule.rule.startswith("/api/") and not rule.arguments \
+                and rule.rule not in SKIP_PATHS:
+            paths.add(rule.rule)
+    return sorted(paths) + FILTER_CASES
+
+def check_query_plans(app, verbose=False):
+    """[(path, status, [(sql, [full-scan plan lines])])] for every endpoint case."""
+    from .resp_cache import cache_clear
+    from . import detections_api
+
+    captured = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    results = []
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, "before_cursor_execute", _before)
+        try:
+            for path in _get_paths(app):
+                cache_clear()                      # cached views would skip the queries
+                detections_api._totals.clear()
+                captured.clear()
+                status = client.get(path).status_code
+                statements = list(captured)
+                problems = []
+                with engine.connect() as con:
+                    for sql, params in statements:
+                        plan = con.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params).all()
+                        # probes like has_rollups() filter on nothing but the source
+                        filtered = _filters_rows(path) and not _SOURCE_ONLY_SQL_RE.search(sql)
+                        scans = _full_scans(plan, filtered=filtered)
+                        if verbose:
+                            print(f"  {path}\n    {' '.join(sql.split())[:160]}\n    " +
+                                  "\n    ".join(r[-1] for r in plan))
+                        if scans:
+                            problems.append((" ".join(sql.split()), scans))
+                results.append((path, status, problems))
+        finally:
+            event.remove(engine, "before_cursor_execute", _before)
+    return results
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    from .app import app
+    results = check_query_plans(app, verbose="-v" in argv)
+    failed = 0
+    for path, status, problems in results:
+        if problems:
+            known = KNOWN_SOURCE_SCANS.get(path)
+            if known and all(_SOURCE_ONLY_RE.match(d) for _, scans in problems for d in scans):
+                print(f"KNOWN      {path} [{status}] ({known})")
+                continue
+            failed += 1
+            print(f"FULL SCAN  {path} [{status}]")
+            for sql, scans in problems:
+                print(f"    {'; '.join(scans)}\n      {sql[:300]}")
+    print(f"[query-plans] {len(results)} endpoint cases, {failed} with full scans")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
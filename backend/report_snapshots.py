@@ -0,0 +1,126 @@
+# backend/report_snapshots.py
+"""
+Compliance report snapshots.
+
+/report used to rebuild the dashboard + remediation overview and render report.html on
+every request (download=1 included). Now each (source, data version) is rendered once,
+stored gzipped in report_snapshots, and served as-is:
+
+- scan/ingest commits schedule a background render (live_deltas.publish_scan_deltas);
+- /report serves the snapshot for the current version with Content-Encoding: gzip and an
+  ETag (rendering inline only if the background worker hasn't got to it yet);
+- older snapshots stay fetchable by id as the report history of past scans
+  (newest KEEP_PER_SOURCE per source are kept).
+"""
+import datetime as dt
+import gzip
+import hashlib
+import queue
+import threading
+
+from flask import request, make_response
+from sqlalchemy import text
+
+from .models import db
+from .resp_cache import version_token
+
+KEEP_PER_SOURCE = 50
+
+_render_lock = threading.Lock()        # one render at a time per process
+_jobs = queue.Queue()
+_worker = {"thread": None}
+_worker_lock = threading.Lock()
+
+def current_version(source):
+    from .api import _dashboard_files
+    return version_token(("audit",), source, _dashboard_files())
+
+def _meta(where, params):
+    return db.session.execute(text(
+        f"SELECT id, source, data_version, generated_at, etag, size FROM report_snapshots WHERE {where}"
+    ), params).mappings().first()
+
+def ensure_snapshot(app, source):
+    """Metadata of the snapshot for the current data version, rendering it if missing."""
+    version = current_version(source)
+    row = _meta("source = :s AND data_version = :v", {"s": source, "v": version})
+    if row:
+        return row
+    with _render_lock:
+        row = _meta("source = :s AND data_version = :v", {"s": source, "v": version})
+        if row:
+            return row
+        from .api import _render_report_html
+        generated_at = dt.datetime.utcnow().replace(microsecond=0)
+        # Clean request context: the snapshot must not depend on the caller's query args
+        with app.test_request_context(f"/api/{source}/report"):
+            html = _render_report_html(source, generated_at).encode("utf-8")
+        etag = hashlib.sha1(f"{source}#{version}".encode("utf-8")).hexdigest()[:20]
+        db.session.execute(text("""
+            INSERT OR IGNORE INTO report_snapshots (source, data_version, generated_at, etag, size, html_gz)
+            VALUES (:s, :v, :g, :e, :n, :b)
+        """), {"s": source, "v": version, "g": generated_at.isoformat() + "Z", "e": etag,
+               "n": len(html), "b": gzip.compress(html, compresslevel=6)})
+        db.session.execute(text("""
+            DELETE FROM report_snapshots WHERE source = :s AND id NOT IN (
+                SELECT id FROM report_snapshots WHERE source = :s ORDER BY id DESC LIMIT :keep)
+        """), {"s": source, "keep": KEEP_PER_SOURCE})
+        db.session.commit()
+        print(f"[report] snapshot {source} {generated_at.isoformat()}Z ({len(html)} bytes)", flush=True)
+    return _meta("source = :s AND data_version = :v", {"s": source, "v": version})
+
+# --------- Background generation ---------
+def _work():
+    while True:
+        pending = {_jobs.get()}
+        while True:                         # coalesce bursts of commits
+            try:
+                pending.add(_jobs.get_nowait())
+            except queue.Empty:
+                break
+        for app, source in pending:
+            try:
+                with app.app_context():
+                    ensure_snapshot(app, source)
+            except Exception as e:
+                print(f"[report] snapshot for {source} failed: {e}", flush=True)
+
+def schedule_snapshot(app, source):
+    """Queue a render of the current version (no-op later if it already exists)."""
+    with _worker_lock:
+        if _worker["thread"] is None:
+            _worker["thread"] = threading.Thread(target=_work, name="occt-report-snapshots", daemon=True)
+            _worker["thread"].start()
+    _jobs.put((app, source))
+
+# --------- Serving ---------
+def snapshot_response(row, *, download=False):
+    if request.if_none_match.contains_weak(row["etag"]):
+        resp = make_response("", 304)
+    else:
+        blob = db.session.execute(text("SELECT html_gz FROM report_snapshots WHERE id = :id"),
+                                  {"id": row["id"]}).scalar()
+        if "gzip" in request.accept_encodings:
+            resp = make_response(blob, 200)
+            resp.headers["Content-Encoding"] = "gzip"
+        else:
+            resp = make_response(gzip.decompress(blob), 200)
+        resp.headers["Content-Type"] = "text/html; charset=utf-8"
+    resp.set_etag(row["etag"])
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.headers["X-OCCT-Report-Generated"] = row["generated_at"]
+    if download:
+        stamp = row["generated_at"].replace("-", "").replace(":", "").replace("T", "-").rstrip("Z")
+        resp.headers["Content-Disposition"] = f'attachment; filename="occt-report-{stamp}.html"'
+    return resp
+
+def list_snapshots(source):
+    rows = db.session.execute(text("""
+        SELECT id, generated_at, data_version, size, length(html_gz) AS gz_size
+        FROM report_snapshots WHERE source = :s ORDER BY id DESC
+    """), {"s": source}).mappings().all()
+    return [dict(r) for r in rows]
+
+def find_snapshot(source, snapshot_id):
+    return _meta("source = :s AND id = :id", {"s": source, "id": snapshot_id})
@@ -0,0 +1,145 @@
+# backend/resp_cache.py
+"""
+Versioned response cache + ETag/304 for the read endpoints (dashboard, audit,
+weighted-compliance, last-scan, rules).
+
+Those endpoints only change when a scan/ingest commits. Every write to audit_events,
+detections or security_events bumps data_versions(scope, source) via triggers
+(db_util.ensure_data_versions), so a response stays valid while the versions (and any
+input files' mtimes) it was built from are unchanged:
+
+- unchanged + browser sent a matching If-None-Match -> 304, no body;
+- unchanged, new client/tab                          -> stored body from this process;
+- changed                                            -> rebuild once, store, new ETag.
+
+The token is read BEFORE the view runs, so a write racing a rebuild can only make the
+stored body newer than its token (next request misses and rebuilds), never stale.
+"""
+import functools
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from flask import request, make_response
+from sqlalchemy import text
+
+from .models import db
+
+MAX_ENTRIES = 256
+_KEEP_HEADERS = ("Content-Type", "X-OCCT-Source", "X-OCCT-Dashboard-Source", "X-OCCT-Next-Cursor")
+
+_cache = OrderedDict()          # key -> (token, etag, status, body bytes, headers)
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0, "stores": 0, "evictions": 0, "uncacheable": 0}
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+def data_versions(scopes, source):
+    """{scope: version} for this source (0 when nothing was ever written)."""
+    if not scopes:
+        return {}
+    rows = db.session.execute(
+        text(f"SELECT scope, version FROM data_versions WHERE source = :s AND scope IN ({', '.join(f':sc{i}' for i in range(len(scopes)))})"),
+        {"s": source, **{f"sc{i}": sc for i, sc in enumerate(scopes)}},
+    ).all()
+    found = {sc: int(v) for sc, v in rows}
+    return {sc: found.get(sc, 0) for sc in scopes}
+
+def _file_token(paths):
+    out = []
+    for p in paths or ():
+        try:
+            out.append(f"{os.path.basename(p)}@{os.path.getmtime(p):.6f}")
+        except OSError:
+            out.append(f"{os.path.basename(p)}@-")
+    return ",".join(out)
+
+def version_token(scopes, source, files=None):
+    """'source|scope=N|...|file@mtime' - changes whenever the underlying data or files do."""
+    parts = [source] + [f"{k}={v}" for k, v in data_versions(scopes, source).items()]
+    if files:
+        parts.append(_file_token(files))
+    return "|".join(parts)
+
+def _request_source():
+    return "live" if request.blueprint == "live_api" else "sample"
+
+def _request_key():
+    args = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    return f"{request.path}?{args}"
+
+def cached_view(scopes=("audit",), files=None, prepare=None, source=None):
+    """
+    Decorator for GET views that return a JSON response.
+      scopes  - data_versions scopes the output depends on
+      files   - callable -> list of paths whose mtimes are part of the version
+      prepare - callable run first (e.g. sample auto-sync, which may itself bump versions)
+      source  - fixed source, else derived from the blueprint (live_api -> live, else sample)
+    """
+    def deco(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if prepare:
+                prepare()
+            src = source or _request_source()
+            token = version_token(scopes, src, files() if files else None)
+            key = _request_key()
+            etag = hashlib.sha1(f"{key}#{token}".encode("utf-8")).hexdigest()[:20]
+
+            if request.if_none_match.contains_weak(etag):     # weak: gzip'd copies carry W/ tags
+                _count("not_modified")
+                resp = make_response("", 304)
+                resp.set_etag(etag)
+                return resp
+
+            with _lock:
+                entry = _cache.get(key)
+                if entry and entry[0] == token:
+                    _cache.move_to_end(key)
+                    _stats["hits"] += 1
+                else:
+                    entry = None
+                    _stats["misses"] += 1
+            if entry:
+                _, etag, status, body, headers = entry
+                resp = make_response(body, status)
+                for h, v in headers:
+                    resp.headers[h] = v
+            else:
+                resp = make_response(view(*args, **kwargs))
+                if resp.status_code != 200 or resp.is_streamed:
+                    _count("uncacheable")
+                    return resp
+                headers = [(h, resp.headers[h]) for h in _KEEP_HEADERS if h in resp.headers]
+                with _lock:
+                    _cache[key] = (token, etag, 200, resp.get_data(), headers)
+                    _cache.move_to_end(key)
+                    _stats["stores"] += 1
+                    while len(_cache) > MAX_ENTRIES:
+                        _cache.popitem(last=False)
+                        _stats["evictions"] += 1
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = "no-cache"     # always revalidate; 304 is cheap
+            resp.headers["X-OCCT-Data-Version"] = token
+            return resp
+        return wrapper
+    return deco
+
+def cache_stats():
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "entries": len(_cache),
+            "max_entries": MAX_ENTRIES,
+            "hit_ratio": round(_stats["hits"] / lookups, 3) if lookups else None,
+        }
+
+def cache_clear():
+    with _lock:
+        _cache.clear()
+        for k in _stats:
+            _stats[k] = 0
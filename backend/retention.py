@@ -0,0 +1,320 @@
+# backend/retention.py
+"""
+Retention for security_events and detections.
+
+Raw rows older than their policy are archived, rolled up (events) and deleted by a
+background compactor, in batches of RETENTION_BATCH_ROWS with a pause in between, so the
+poller and ingest never wait long on the SQLite write lock. Policy, in days of raw rows
+(instance/settings.py; empty by default - a source or event_id without an entry is kept
+forever):
+
+    RETENTION_EVENTS = {"live": {"*": 90, 4624: 14}}     # per source, per event_id ("*" = the rest)
+    RETENTION_DETECTIONS = {"live": 365}                   # per source
+
+Each batch, oldest first:
+  1. is appended to instance/<RETENTION_ARCHIVE_DIR>/<table>/<source>/<YYYY-MM-DD>.ndjson.gz
+     (one gzip member per batch and day - gzip readers concatenate members), fsynced;
+  2. events only: is counted into event_rollups per (hour, event_id, host, account);
+  3. is deleted - 2 and 3 in one transaction, so an event is counted either raw or rolled up.
+A crash between 1 and 3 archives that batch again on the next run: archives are
+at-least-once and "id" identifies duplicates. Run one compactor per database: the
+periodic one is started by `python -m backend.app`, not on import; under a WSGI server
+call start_retention_worker(app) from a single process, or use POST /retention/run.
+
+Readers: /events/facets adds event_rollups to its counts and histogram (rollup_where etc.).
+"""
+import datetime as dt
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import Blueprint, jsonify, make_response
+from sqlalchemy import select, text, tuple_, literal, or_
+
+from .models import db, SecurityEvent, Detection
+from .detections_api import time_bounds
+
+START_DELAY_SEC = 60            # first background run, after startup settles
+
+# policy key -> (model, time attribute, roll up before deleting)
+TABLES = {
+    "events":     (SecurityEvent, "time", True),
+    "detections": (Detection, "when", False),
+}
+
+_wake = threading.Event()
+_worker = {"thread": None}
+_worker_lock = threading.Lock()
+_state = {"running": False, "last_run": None, "last_error": None}
+
+# --------- Policy ---------
+def _policies(app):
+    """[(key, source, event_id or None, event_ids excluded, days)] from the config."""
+    out = []
+    for source, per_id in (app.config.get("RETENTION_EVENTS") or {}).items():
+        explicit = [int(k) for k in per_id if k != "*"]
+        for k, days in per_id.items():
+            if days:
+                if k == "*":
+                    out.append(("events", source, None, explicit, int(days)))
+                else:
+                    out.append(("events", source, int(k), [], int(days)))
+    for source, days in (app.config.get("RETENTION_DETECTIONS") or {}).items():
+        if days:
+            out.append(("detections", source, None, [], int(days)))
+    return out
+
+# --------- Compaction ---------
+def _jsonable(v):
+    return v.isoformat() + "Z" if isinstance(v, dt.datetime) else v
+
+def _archive(app, key, source, time_attr, rows):
+    """Append rows to the per-day archive files of (key, source); no-op without an archive dir."""
+    base = app.config.get("RETENTION_ARCHIVE_DIR")
+    if not base:
+        return
+    by_day = {}
+    for r in rows:
+        by_day.setdefault(r[time_attr].strftime("%Y-%m-%d"), []).append(
+            json.dumps({k: _jsonable(v) for k, v in r.items()}, ensure_ascii=False))
+    folder = os.path.join(app.instance_path, base, TABLES[key][0].__tablename__, source)
+    os.makedirs(folder, exist_ok=True)
+    for day, lines in by_day.items():
+        with open(os.path.join(folder, f"{day}.ndjson.gz"), "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6, mtime=0) as gz:
+                gz.write(("\n".join(lines) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+# NULL event_id/host/account are stored as 0/'' (they're part of the primary key) and
+# read back as NULL by rollup_counts
+ROLLUP_NULLS = {"event_id": 0, "host": "", "account": ""}
+
+_ROLLUP_SQL = """
+    INSERT INTO event_rollups (source, hour, event_id, host, account, n)
+    SELECT source, strftime('%Y-%m-%d %H:00:00.000000', time), COALESCE(event_id, 0),
+           COALESCE(host, ''), COALESCE(account, ''), COUNT(*)
+    FROM security_events WHERE id IN (SELECT value FROM json_each(:ids))
+    GROUP BY 1, 2, 3, 4, 5
+    ON CONFLICT (source, hour, event_id, host, account) DO UPDATE SET n = n + excluded.n
+"""
+
+def _compact(app, key, source, event_id, exclude, days):
+    """Archive, roll up and delete one policy's expired rows batch by batch; rows deleted."""
+    model, time_attr, rollup = TABLES[key]
+    t = model.__table__
+    tcol = t.c[time_attr]
+    cols = [c for c in t.c if c.computed is None]           # generated columns are derived
+    cutoff = dt.datetime.utcnow() - dt.timedelta(days=days)
+    batch = max(int(app.config.get("RETENTION_BATCH_ROWS") or 2000), 1)
+    pause = max(int(app.config.get("RETENTION_PAUSE_MS") or 0), 0) / 1000.0
+
+    q = select(*cols).where(t.c.source == source, tcol < cutoff)
+    if event_id is not None:
+        q = q.where(t.c.event_id == event_id)               # (source, event_id, time) index
+    elif exclude:
+        q = q.where(or_(t.c.event_id.is_(None), t.c.event_id.not_in(exclude)))
+    deleted, after = 0, None
+    while True:
+        page = q
+        if after is not None:                               # keyset: skipped (excluded) rows aren't re-read
+            page = page.where(tuple_(tcol, t.c.id) > tuple_(literal(after[0], tcol.type), literal(after[1])))
+        rows = [dict(r) for r in db.session.execute(page.order_by(tcol, t.c.id).limit(batch)).mappings()]
+        db.session.rollback()                               # end the read transaction before writing
+        if not rows:
+            return deleted
+        after = (rows[-1][time_attr], rows[-1]["id"])
+        _archive(app, key, source, time_attr, rows)
+        ids = json.dumps([r["id"] for r in rows])
+        with db.engine.begin() as con:
+            if rollup:
+                con.execute(text(_ROLLUP_SQL), {"ids": ids})
+            deleted += con.execute(text(f"DELETE FROM {t.name} WHERE id IN (SELECT value FROM json_each(:ids))"),
+                                   {"ids": ids}).rowcount or 0
+        if pause:
+            time.sleep(pause)
+
+def compact_once(app):
+    """Apply every retention policy once; {"<key>/<source>[/<event_id>]": rows deleted}."""
+    summary = {}
+    with app.app_context():
+        try:
+            for key, source, event_id, exclude, days in _policies(app):
+                n = _compact(app, key, source, event_id, exclude, days)
+                name = f"{key}/{source}" + ("" if event_id is None else f"/{event_id}")
+                summary[name] = summary.get(name, 0) + n
+                if n:
+                    print(f"[retention] {name}: {n} rows older than {days}d compacted", flush=True)
+        finally:
+            db.session.remove()
+    return summary
+
+# --------- Background worker ---------
+def _loop(app, interval):
+    delay = min(START_DELAY_SEC, interval) if interval else None
+    while True:
+        _wake.wait(delay)
+        _wake.clear()
+        delay = interval or None
+        _state.update(running=True)
+        started = dt.datetime.utcnow().replace(microsecond=0)
+        try:
+            summary = compact_once(app)
+            _state.update(last_error=None, last_run={
+                "started": started.isoformat() + "Z",
+                "finished": dt.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+                "deleted": summary,
+            })
+        except Exception as e:
+            _state.update(last_error=str(e))
+            print(f"[retention] compaction failed: {e}", flush=True)
+        finally:
+            _state.update(running=False)
+
+def start_retention_worker(app, force=False):
+    """Start the compactor thread (every RETENTION_INTERVAL_SEC; 0 = only on request)."""
+    interval = int(app.config.get("RETENTION_INTERVAL_SEC") or 0)
+    if not force and not (interval and _policies(app)):
+        return False
+    if getattr(app, "debug", False) and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        return False                                        # dev reloader primary process
+    with _worker_lock:
+        if _worker["thread"] is None:
+            _worker["thread"] = threading.Thread(target=_loop, args=(app, interval),
+                                                 name="occt-retention", daemon=True)
+            _worker["thread"].start()
+            print(f"[retention] compactor started (every {interval}s)" if interval
+                  else "[retention] compactor started (on request)", flush=True)
+    return True
+
+# --------- Rollup reads ---------
+_HOUR = dt.timedelta(hours=1)
+_HOUR_FMT = "%Y-%m-%d %H:00:00.000000"
+
+def rollup_hour_bounds(args):
+    """
+    (first hour, last hour, clipped) of the rollups inside ?from=/?to=. Only hours lying
+    wholly in the range count, so a bound that isn't on the hour leaves its partial hour
+    out (clipped=True) rather than adding events from outside the range.
+    """
+    t_from, t_to = time_bounds(args)
+    first = last = None
+    clipped = False
+    if t_from:
+        first = t_from.replace(minute=0, second=0, microsecond=0)
+        if first != t_from:
+            first += _HOUR
+            clipped = True
+    if t_to:
+        end = t_to + dt.timedelta(microseconds=1)           # ?to= is inclusive
+        last = end.replace(minute=0, second=0, microsecond=0) - _HOUR
+        clipped = clipped or last + _HOUR != end
+    return first, last, clipped
+
+def rollup_where(source, args):
+    """
+    (SQL condition, params) restricting event_rollups to the /events filters in args, or
+    None when a filter isn't kept in the rollups (ip, q). Time bounds: see rollup_hour_bounds.
+    """
+    if any((args.get(k) or "").strip() for k in ("ip", "q")):
+        return None
+    conds, params = ["source = :source"], {"source": source}
+    ids = [int(x) for x in (args.get("event_id") or "").split(",") if x.strip().isdigit()]
+    if ids:
+        real = [i for i in ids if i != ROLLUP_NULLS["event_id"]]   # the raw filter never matches NULL
+        conds.append(f"event_id IN ({', '.join(str(i) for i in real)})" if real else "0")
+    account = (args.get("account") or "").strip().lower()
+    if account:
+        conds.append("lower(account) LIKE :account")
+        params["account"] = f"%{account}%"
+    first, last, _ = rollup_hour_bounds(args)
+    if first:
+        conds.append("hour >= :t_from")
+        params["t_from"] = first.strftime(_HOUR_FMT)
+    if last:
+        conds.append("hour <= :t_to")
+        params["t_to"] = last.strftime(_HOUR_FMT)
+    return " AND ".join(conds), params
+
+def has_rollups(source):
+    return db.session.execute(text("SELECT 1 FROM event_rollups WHERE source = :s LIMIT 1"),
+                              {"s": source}).first() is not None
+
+def rollup_counts(where, columns):
+    """
+    {column: Counter(value -> events)} over the matching rollups (ROLLUP_NULLS read back as
+    NULL, as stored raw). One GROUP BY per column - hour follows the primary key, the others
+    have covering indexes - unless ?event_id= or ?account= is set: those GROUP BYs would walk
+    the whole source's index to test the filter (and account's LIKE can't use one), so the
+    matching rows are read once and counted here, like facets_api does for raw events. A
+    time range alone keeps the GROUP BYs; it usually spans most of the rollups.
+    """
+    cond, params = where
+    out = {c: Counter() for c in columns}
+    nulls = [ROLLUP_NULLS.get(c) for c in columns]
+    if "account" in params or "event_id IN" in cond:
+        for row in db.session.execute(text(f"SELECT {', '.join(columns)}, n FROM event_rollups WHERE {cond}"), params):
+            for c, null, v in zip(columns, nulls, row):
+                out[c][None if v == null else v] += row[-1]
+    else:
+        for c, null in zip(columns, nulls):
+            for v, n in db.session.execute(text(f"SELECT {c}, SUM(n) FROM event_rollups WHERE {cond} GROUP BY 1"), params):
+                out[c][None if v == null else v] += int(n)
+    return out
+
+# --------- API ---------
+def attach_retention_api(sample_bp: Blueprint, live_bp: Blueprint, app):
+    """
+    GET  /retention      policy for this source, rollup coverage, archive files, last run
+    POST /retention/run  wake the compactor now (starts it if RETENTION_INTERVAL_SEC is 0)
+    """
+
+    def _status(source):
+        roll = db.session.execute(text("""
+            SELECT COUNT(*), COALESCE(SUM(n), 0), MIN(hour), MAX(hour) FROM event_rollups WHERE source = :s
+        """), {"s": source}).first()
+        archives = []
+        base = app.config.get("RETENTION_ARCHIVE_DIR")
+        for key, (model, _, _) in TABLES.items():
+            folder = os.path.join(app.instance_path, base or "", model.__tablename__, source)
+            if base and os.path.isdir(folder):
+                for name in sorted(os.listdir(folder)):
+                    archives.append({"table": model.__tablename__, "file": name,
+                                     "bytes": os.path.getsize(os.path.join(folder, name))})
+        resp = make_response(jsonify({
+            "source": source,
+            "policy": {
+                "events": {str(k): v for k, v in ((app.config.get("RETENTION_EVENTS") or {}).get(source) or {}).items()},
+                "detections": (app.config.get("RETENTION_DETECTIONS") or {}).get(source),
+            },
+            "rollups": {"rows": int(roll[0]), "events": int(roll[1]),
+                        "oldest_hour": roll[2], "newest_hour": roll[3]},
+            "archives": archives,
+            "worker": dict(_state, started=_worker["thread"] is not None),
+        }))
+        resp.headers["Cache-Control"] = "no-store"
+        return resp
+
+    def _run():
+        start_retention_worker(app, force=True)
+        _wake.set()
+        return make_response(jsonify({"ok": True, "queued": True, "running": _state["running"]}), 202)
+
+    @live_bp.get("/retention")
+    def live_retention():
+        return _status("live")
+
+    @sample_bp.get("/retention")
+    def sample_retention():
+        return _status("sample")
+
+    @live_bp.post("/retention/run")
+    def live_retention_run():
+        return _run()
+
+    @sample_bp.post("/retention/run")
+    def sample_retention_run():
+        return _run()
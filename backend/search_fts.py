@@ -0,0 +1,46 @@
+# backend/search_fts.py
+"""
+q= search shared by the audit, events and detections endpoints.
+
+Uses the FTS5 indexes from db_util.ensure_fts_tables(): every word in q becomes a
+prefix phrase ("srv ws01" -> "srv"* "ws01"*, all must match; "10.12.200" ->
+"10 12 200"*), so "fire" finds "Firewall" and a partial IP finds the address.
+Matching is by token prefix, not arbitrary substring. When FTS5 isn't available (or q
+has no word characters) the old lower(col) LIKE '%q%' scan is used.
+"""
+import re
+from sqlalchemy import func, or_, select, table, column
+
+from .db_util import FTS_INDEXES, fts_ready
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)    # same split as the unicode61 tokenizer
+
+def fts_match_expr(q):
+    # one phrase per whitespace-separated word, last token a prefix: "10.12.200" -> "10 12 200"*
+    phrases = []
+    for word in (q or "").lower().split()[:16]:
+        tokens = _TOKEN_RE.findall(word)
+        if tokens:
+            phrases.append('"' + " ".join(tokens) + '"*')
+    return " ".join(phrases) or None
+
+def apply_text_search(query, model, q, like_cols, rank=False):
+    """
+    Filter `query` (over `model`) by q. Returns (query, rank_order) where rank_order is
+    an ORDER BY clause (bm25, best first) when rank=True and FTS served the search, else None.
+    """
+    spec = FTS_INDEXES.get(model.__tablename__)
+    expr = fts_match_expr(q)
+    if spec and expr and fts_ready(spec[0]):
+        name = spec[0]
+        fts = table(name, column("rowid"), column("rank"), column(name))
+        match = fts.c[name].op("MATCH")(expr)
+        if rank:
+            # LIMIT -1 keeps SQLite from flattening the MATCH into the join; flattened, the
+            # planner may walk a (source, ...) index and probe FTS once per row instead.
+            hits = select(fts.c.rowid.label("rid"), fts.c.rank.label("rank")).where(match).limit(-1).subquery()
+            return query.join(hits, hits.c.rid == model.id), hits.c.rank
+        return query.filter(model.id.in_(select(fts.c.rowid).where(match))), None
+
+    like = f"%{(q or '').strip().lower()}%"
+    return query.filter(or_(*[func.lower(c).like(like) for c in like_cols])), None
@@ -0,0 +1,285 @@
+# backend/sse_async.py
+"""
+Asyncio SSE sidecar for /api/live/stream.
+
+The Flask route pins one Werkzeug thread per connected dashboard (blocked in
+client.cv.wait). When SSE_ASYNC_PORT is set, a small stdlib-asyncio HTTP server
+runs on its own thread/event loop instead and the Flask route redirects there:
+
+- every connection is just a socket + StreamWriter (a few KB, no thread);
+- the bus sees ONE subscriber (the bridge); fan-out to sockets happens on the loop,
+  and each payload is serialized once, not once per client;
+- connections are grouped by their stream filter (same query args as the Flask route),
+  so each distinct filter is matched once per payload;
+- keepalive pings come from a single timer for all connections.
+
+No extra dependencies: works with `python -m backend.app` as-is.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs
+
+import backend.notify as _bus
+
+KEEPALIVE_SEC = 15
+MAX_HEADER_BYTES = 8192
+MAX_BUFFERED_BYTES = 256 * 1024   # slow consumer: drop the socket, browser reconnects
+STREAM_PATHS = ("/api/live/stream", "/stream")
+
+_server_state: Dict[str, Any] = {"started": False, "host": None, "port": None, "loop": None, "bridge": None}
+
+class _Args(dict):
+    """Minimal request.args look-alike for SubscriptionFilter.from_args."""
+
+    def get(self, key, default=None):
+        vals = super().get(key)
+        return vals[0] if vals else default
+
+    def getlist(self, key):
+        return list(super().get(key) or [])
+
+class _Conn:
+    __slots__ = ("writer", "connected_at", "filt", "events_sent", "bytes_sent", "last_write_ms")
+
+    def __init__(self, writer: asyncio.StreamWriter, filt: _bus.SubscriptionFilter) -> None:
+        self.writer = writer
+        self.connected_at = time.time()
+        self.filt = filt
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.last_write_ms = None
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            buffered = self.writer.transport.get_write_buffer_size()
+        except Exception:
+            buffered = 0
+        return {
+            "kind": "async",
+            "connected_at": round(self.connected_at, 3),
+            "queue_depth": buffered,          # bytes still buffered in the socket transport
+            "events_sent": self.events_sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": 0,
+            "last_write_latency_ms": self.last_write_ms,
+            "filter": _bus._describe_filter(self.filt.key),
+        }
+
+class _Bridge:
+    """Single bus subscriber that hands payloads to the asyncio loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.conns: set[_Conn] = set()
+        self.by_key: Dict[tuple, tuple] = {}   # filter key -> (filter, {conn, ...})
+
+    def add(self, conn: _Conn) -> None:
+        self.conns.add(conn)
+        bucket = self.by_key.get(conn.filt.key)
+        if bucket is None:
+            bucket = self.by_key[conn.filt.key] = (conn.filt, set())
+        bucket[1].add(conn)
+
+    def discard(self, conn: _Conn) -> None:
+        self.conns.discard(conn)
+        bucket = self.by_key.get(conn.filt.key)
+        if bucket is not None:
+            bucket[1].discard(conn)
+            if not bucket[1]:
+                del self.by_key[conn.filt.key]
+
+    # Called from publisher threads (poller, request handlers, bus tail thread)
+    def push(self, payload: Dict[str, Any], published_at: Optional[float] = None, kind: str = "detection") -> None:
+        self.loop.call_soon_threadsafe(self._fanout, payload, published_at or time.time(), kind)
+
+    def _write_all(self, chunk: bytes, conns=None, latency_ms=None) -> int:
+        written = 0
+        for conn in list(self.conns if conns is None else conns):
+            w = conn.writer
+            if w.is_closing():
+                self.discard(conn)
+                continue
+            if w.transport.get_write_buffer_size() > MAX_BUFFERED_BYTES:
+                self.discard(conn)
+                w.close()
+                _bus._count_drop("slow_consumer")
+                continue
+            w.write(chunk)
+            conn.bytes_sent += len(chunk)
+            if latency_ms is not None:
+                conn.events_sent += 1
+                conn.last_write_ms = latency_ms
+            written += 1
+        return written
+
+    def _fanout(self, payload: Dict[str, Any], published_at: float, kind: str = "detection") -> None:
+        t0 = time.perf_counter()
+        targets = []
+        for filt, conns in self.by_key.values():
+            if kind != "detection" or filt.matches(payload):
+                targets.extend(conns)
+        if not targets:
+            return
+        data = json.dumps(payload, ensure_ascii=False)
+        chunk = f"event: {kind}\ndata: {data}\n\n".encode("utf-8")
+        latency_ms = _bus._record_latency(published_at)
+        n = self._write_all(chunk, targets, latency_ms)
+        _bus._count_sent(n, n * len(chunk))
+        _bus._observe_fanout("async", kind, (time.perf_counter() - t0) * 1000.0)
+
+    async def keepalive(self) -> None:
+        ping = b"event: ping\ndata: {}\n\n"
+        while True:
+            await asyncio.sleep(KEEPALIVE_SEC)
+            self._write_all(ping)
+
+def _http_head(status: str, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status}"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+async def _handle(bridge: _Bridge, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    conn = None
+    try:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=10)
+        except Exception:
+            writer.close()
+            return
+        if len(head) > MAX_HEADER_BYTES:
+            writer.close()
+            return
+        request_line = head.split(b"\r\n", 1)[0].decode("latin-1", "replace")
+        parts = request_line.split(" ")
+        method = parts[0].upper() if parts else ""
+        path, _, query = (parts[1] if len(parts) > 1 else "/").partition("?")
+
+        if method != "GET" or path not in STREAM_PATHS:
+            writer.write(_http_head("404 Not Found", {"Content-Length": "0", "Connection": "close"}))
+            await writer.drain()
+            writer.close()
+            return
+
+        writer.write(_http_head("200 OK", {
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache, no-transform",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+            "Access-Control-Allow-Origin": "*",
+            "X-OCCT-PID": str(os.getpid()),
+        }))
+        writer.write(b": connected (occt-async-rt)\n\n")
+        await writer.drain()
+
+        conn = _Conn(writer, _bus.SubscriptionFilter.from_args(_Args(parse_qs(query))))
+        bridge.add(conn)
+        # Nothing is expected from the browser; wait for it to go away.
+        while await reader.read(1024):
+            pass
+    except Exception:
+        pass
+    finally:
+        if conn is not None:
+            bridge.discard(conn)
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+def _run_loop(host: str, port: int, ready: threading.Event) -> None:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    bridge = _Bridge(loop)
+    try:
+        server = loop.run_until_complete(
+            asyncio.start_server(lambda r, w: _handle(bridge, r, w), host=host, port=port, backlog=1024)
+        )
+    except OSError as e:
+        # e.g. another worker already owns the port; with SSE_BUS_BACKEND=sqlite that
+        # sidecar still receives every detection, so this process simply doesn't serve SSE.
+        print(f"[sse-async] could not bind {host}:{port}: {e}", flush=True)
+        ready.set()
+        return
+    _bus._subscribe(bridge)
+    _server_state.update({"started": True, "host": host, "port": port, "loop": loop, "bridge": bridge})
+    ready.set()
+    print(f"[sse-async] serving SSE on http://{host}:{port}/api/live/stream", flush=True)
+    loop.create_task(bridge.keepalive())
+    try:
+        loop.run_until_complete(server.serve_forever())
+    finally:
+        _bus._unsubscribe(bridge)
+
+def start_async_sse_server(app) -> bool:
+    """Start the asyncio SSE sidecar if SSE_ASYNC_PORT is configured. Returns True when serving."""
+    port = int(app.config.get("SSE_ASYNC_PORT") or 0)
+    if port <= 0 or _server_state["started"]:
+        return bool(_server_state["started"])
+    host = app.config.get("SSE_ASYNC_HOST") or "127.0.0.1"
+    ready = threading.Event()
+    threading.Thread(target=_run_loop, args=(host, port, ready), name="occt-sse-async", daemon=True).start()
+    ready.wait(timeout=5)
+    return bool(_server_state["started"])
+
+_WILDCARD_HOSTS = ("", "0.0.0.0", "::")
+
+def _split_host(netloc: str) -> str:
+    """Hostname of a Host header value: 'h', 'h:port', '[v6]' or '[v6]:port'."""
+    if netloc.startswith("["):
+        return netloc[1:].split("]", 1)[0]
+    return netloc.rsplit(":", 1)[0] if netloc.count(":") == 1 else netloc
+
+def async_stream_url(host_url: str) -> Optional[str]:
+    """
+    Public URL of the sidecar stream for redirects, or None when it isn't running here or
+    the browser can't be assumed to reach it. SSE_ASYNC_URL wins (proxies, TLS, other
+    names); otherwise the request host is reused, but only when the sidecar listens on it
+    or on a wildcard address - a 127.0.0.1 bind is no use to a remote browser.
+    """
+    if not _server_state["started"]:
+        return None
+    try:
+        from flask import current_app
+        configured = current_app.config.get("SSE_ASYNC_URL")
+    except Exception:
+        configured = None
+    if configured:
+        return configured
+    scheme, _, rest = host_url.partition("://")
+    hostname = _split_host(rest.split("/", 1)[0])
+    bind = (_server_state["host"] or "").strip("[]")
+    if bind not in _WILDCARD_HOSTS and bind.lower() != hostname.lower():
+        return None
+    if ":" in hostname:
+        hostname = f"[{hostname}]"
+    return f"{scheme}://{hostname}:{_server_state['port']}/api/live/stream"
+
+async def _snapshot(bridge: "_Bridge", with_details: bool):
+    # runs on the loop: conns/by_key are only mutated there
+    return len(bridge.conns), len(bridge.by_key), [c.stats() for c in bridge.conns] if with_details else []
+
+def async_state(client_limit: int = 0) -> Dict[str, Any]:
+    """Sidecar summary; with client_limit > 0 also per-connection stats, most-buffered first."""
+    bridge, loop = _server_state.get("bridge"), _server_state.get("loop")
+    out = {
+        "enabled": bool(_server_state["started"]),
+        "port": _server_state["port"],
+        "clients": 0,
+        "filter_buckets": 0,
+    }
+    if bridge is None or loop is None or not loop.is_running():
+        return out
+    try:
+        fut = asyncio.run_coroutine_threadsafe(_snapshot(bridge, client_limit > 0), loop)
+        out["clients"], out["filter_buckets"], details = fut.result(timeout=2)
+    except Exception as e:
+        out["error"] = f"snapshot failed: {e!r}"
+        return out
+    if client_limit > 0:
+        details.sort(key=lambda d: (-d["queue_depth"], d["connected_at"]))
+        out["clients_detail"] = details[:client_limit]
+    return out
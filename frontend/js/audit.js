@@ -72,13 +72,12 @@ const tableColspan = () => (headers.length || 9); // robust if headers already u
 async function loadData() {
   tbody.innerHTML = `<tr><td colspan="${tableColspan()}">Loading…</td></tr>`;
   try {
-    const [resAudit, resRules] = await Promise.all([
-      fetch(api('/audit')),
-      fetch(api('/rules')).catch(() => ({ ok:false }))
-    ]);
-    if (!resAudit.ok) throw new Error('HTTP ' + resAudit.status);
+    // Audit rows + rules in one request (same data version)
+    const resBoot = await fetch(api('/bootstrap?include=audit,rules'));
+    if (!resBoot.ok) throw new Error('HTTP ' + resBoot.status);
 
-    const json = await resAudit.json();
+    const boot = await resBoot.json();
+    const json = boot.audit;
     DATA = (Array.isArray(json) ? json : []).map(r => ({
       time:        r.time || r.timestamp || null,
       category:    r.category || '',
@@ -94,8 +93,8 @@ async function loadData() {
       severity:    r.severity || ''     // optional
     }));
 
-    if (resRules && resRules.ok) {
-      const list = await resRules.json();
+    if (Array.isArray(boot.rules) && boot.rules.length) {
+      const list = boot.rules;
       RULES_BY_TITLE = new Map();
       RULES_BY_ID    = new Map();
       if (Array.isArray(list)) {
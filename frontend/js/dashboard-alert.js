@@ -142,30 +142,38 @@
         credentials: 'include'
       });
       if (!res.ok) return;
-      const j = await res.json();
-      if (!j?.has_data) return;
-
-      const completedAt  = j.completed_at || '';
-      if (alreadyShownFor(completedAt)) return;
-
-      const failed = Number(j.failed_count ?? 0);
-      const passed = Number(j.passed_count ?? 0);
-      const checks = Number(j.check_count ?? (passed + failed || 0));
-
-      if (checks > 0 && failed > 0) {
-        const html = `
-          <strong>Warning:</strong> ${failed} check${failed===1?'':'s'} failed compliance.
-          <div class="actions" style="margin-top:.45rem;">
-            <button class="close btn primary" style="margin-right:.5rem">Dismiss</button>
-            <button class="btn primary" onclick="location.href='/audit'">View details</button>
-          </div>
-        `;
-        toast({ html, kind: 'warn', timeout: 7000 });
-      }
+      showComplianceToastFor(await res.json());
     } catch {
     }
   }
 
+  function showComplianceToastFor(j) {
+    if (!j?.has_data) return;
+
+    const completedAt  = j.completed_at || '';
+    if (alreadyShownFor(completedAt)) return;
+
+    const failed = Number(j.failed_count ?? 0);
+    const passed = Number(j.passed_count ?? 0);
+    const checks = Number(j.check_count ?? (passed + failed || 0));
+
+    if (checks > 0 && failed > 0) {
+      const html = `
+        <strong>Warning:</strong> ${failed} check${failed===1?'':'s'} failed compliance.
+        <div class="actions" style="margin-top:.45rem;">
+          <button class="close btn primary" style="margin-right:.5rem">Dismiss</button>
+          <button class="btn primary" onclick="location.href='/audit'">View details</button>
+        </div>
+      `;
+      toast({ html, kind: 'warn', timeout: 7000 });
+    }
+  }
+
+  // Later scans arrive over SSE (see site.js) instead of re-polling /last-scan
+  window.addEventListener('occt:scan-completed', (e) => {
+    if (e.detail?.source === getMode()) showComplianceToastFor(e.detail);
+  });
+
   if (document.readyState === 'loading') {
     document.addEventListener('DOMContentLoaded', maybeShowComplianceToast, { once: true });
   } else {
@@ -18,6 +18,7 @@
   const fSeverity   = $('#fSeverity');
   const fStatus     = $('#fStatus');
   const fRule       = $('#fRule');
+  const fEvidence   = $('#fEvidence');
   const fQAlerts    = $('#fQAlerts');
   const btnSearchAl = $('#btnSearchAlerts');
   const btnClearAl  = $('#btnClearAlerts');
@@ -35,6 +36,9 @@
   let limit = 50;
   let alertsPage = 1, alertsTotal = 0;
   let eventsPage = 1, eventsTotal = 0;
+  // Keyset paging: cursor that starts page N is kept at index N-1 (page 1 has none)
+  const alertsCursors = [null], eventsCursors = [null];
+  let alertsHasNext = false, eventsHasNext = false;
   const alertsPrev = $('#alertsPrev'), alertsNext = $('#alertsNext'), alertsPageEl = $('#alertsPage');
   const eventsPrev = $('#eventsPrev'), eventsNext = $('#eventsNext'), eventsPageEl = $('#eventsPage');
 
@@ -105,9 +109,10 @@
     const qs = new URLSearchParams();
     if (fSeverity?.value) qs.set('severity', fSeverity.value);
     if (fRule?.value)     qs.set('rule_id', fRule.value);
+    if (fEvidence?.value?.trim()) qs.set('evidence', fEvidence.value.trim());
     if (fQAlerts?.value?.trim()) qs.set('q', fQAlerts.value.trim());
     qs.set('limit', String(limit));
-    qs.set('page', String(alertsPage));
+    if (alertsCursors[alertsPage - 1]) qs.set('cursor', alertsCursors[alertsPage - 1]);
 
     const r = await fetch(api('/detections') + '?' + qs.toString(), { headers: { 'X-OCCT-No-Loader': '1' }, cache: 'no-store' });
     const j = await r.json().catch(() => ({ items: [], total: 0 }));
@@ -120,9 +125,10 @@
     else if (st === 'new') items = items.filter(row => !ackSet.has(String(row.id)));
 
     alertsTotal = items.length;
-    const maxPage = Math.max(1, Math.ceil((alertsTotal || 0) / limit));
+    alertsCursors[alertsPage] = j.next_cursor || null;
+    alertsHasNext = !!j.next_cursor;
     alertsPrev.disabled = alertsPage <= 1;
-    alertsNext.disabled = alertsPage >= maxPage;
+    alertsNext.disabled = !alertsHasNext;
     alertsPageEl.textContent = `Page ${alertsPage}`;
 
     if (fRule && fRule.tagName.toLowerCase() === 'select' && fRule.options.length <= 1) {
@@ -172,15 +178,16 @@
     if (fIp?.value?.trim()) qs.set('ip', fIp.value.trim());
     if (fQEvents?.value?.trim()) qs.set('q', fQEvents.value.trim());
     qs.set('limit', String(limit));
-    qs.set('page', String(eventsPage));
+    if (eventsCursors[eventsPage - 1]) qs.set('cursor', eventsCursors[eventsPage - 1]);
 
     const r = await fetch(api('/events') + '?' + qs.toString(), { headers: { 'X-OCCT-No-Loader': '1' }, cache: 'no-store' });
     const j = await r.json().catch(() => ({ items: [], total: 0 }));
 
     eventsTotal = j.total || 0;
-    const maxPage = Math.max(1, Math.ceil((eventsTotal || 0) / limit));
+    eventsCursors[eventsPage] = j.next_cursor || null;
+    eventsHasNext = !!j.next_cursor;
     eventsPrev.disabled = eventsPage <= 1;
-    eventsNext.disabled = eventsPage >= maxPage;
+    eventsNext.disabled = !eventsHasNext;
     eventsPageEl.textContent = `Page ${eventsPage}`;
 
     eventsTbody.innerHTML = '';
@@ -266,6 +273,7 @@
     if (fSeverity) fSeverity.value = '';
     if (fStatus)   fStatus.value = '';
     if (fRule)     fRule.value = '';
+    if (fEvidence) fEvidence.value = '';
     if (fQAlerts)  fQAlerts.value = '';
     alertsPage = 1; loadAlerts();
   });
@@ -281,18 +289,36 @@
 
   alertsPrev.addEventListener('click', () => { if (alertsPage > 1) { alertsPage--; loadAlerts(); } });
   alertsNext.addEventListener('click', () => {
-    const maxPage = Math.max(1, Math.ceil((alertsTotal || 0) / limit));
-    if (alertsPage < maxPage) { alertsPage++; loadAlerts(); }
+    if (alertsHasNext) { alertsPage++; loadAlerts(); }
   });
 
   eventsPrev.addEventListener('click', () => { if (eventsPage > 1) { eventsPage--; loadEvents(); } });
   eventsNext.addEventListener('click', () => {
-    const maxPage = Math.max(1, Math.ceil((eventsTotal || 0) / limit));
-    if (eventsPage < maxPage) { eventsPage++; loadEvents(); }
+    if (eventsHasNext) { eventsPage++; loadEvents(); }
   });
 
   window.addEventListener('storage', (e) => { if (e.key === K.MODE) init(); });
 
+  // Server-pushed deltas (see site.js): reload the alert page only when counts moved,
+  // and flip the no-data banner without re-polling /last-scan.
+  let lastDetectionsTotal = null;
+  window.addEventListener('occt:detections-count', (e) => {
+    const j = e.detail || {};
+    if (j.source !== getMode() || j.total === lastDetectionsTotal) return;
+    lastDetectionsTotal = j.total;
+    if (!alertsPane.classList.contains('hidden')) loadAlerts();
+  });
+  window.addEventListener('occt:detections-triaged', (e) => {
+    const j = e.detail || {};
+    if (j.source !== getMode()) return;
+    lastDetectionsTotal = j.counts ? j.counts.total : lastDetectionsTotal;
+    if (!alertsPane.classList.contains('hidden')) loadAlerts();
+  });
+  window.addEventListener('occt:scan-completed', (e) => {
+    const j = e.detail || {};
+    if (j.source === getMode()) noDataBanner.classList.toggle('hidden', !!j.has_data);
+  });
+
   async function init() {
     setModeBadge();
     wireDelegates();
@@ -105,30 +105,7 @@
         // Safe default: treat as no scan
         hasLastScan = false;
       } else {
-        const j = await res.json();
-        hasLastScan = !!j?.has_data;
-
-        if (viewBtn) {
-          if (hasLastScan) {
-            viewBtn.removeAttribute('disabled');
-            viewBtn.title = 'Open Dashboard to view the most recent results';
-          } else {
-            viewBtn.setAttribute('disabled', 'true');
-            viewBtn.title = 'No previous scan yet — run a scan first';
-          }
-        }
-
-        if (hasLastScan) {
-          if (eventsEl && typeof j.event_count !== 'undefined') eventsEl.textContent = j.event_count;
-          if (failEl   && typeof j.failed_count  !== 'undefined') failEl.textContent  = j.failed_count;
-        } else {
-          if (eventsEl) eventsEl.textContent = '—';
-          if (failEl)   failEl.textContent   = '—';
-        }
-
-        // Mode-aware gating for nav/buttons that require a last scan
-        setRequiresScanButtonsEnabled(hasLastScan, { last_time: j?.completed_at }, mode);
-        setRequiresScanLinksEnabled(hasLastScan, mode);
+        applyLastScan(await res.json(), mode);
       }
     } catch {
       hasLastScan = false;
@@ -137,6 +114,32 @@
     }
   }
 
+  function applyLastScan(j, mode) {
+    hasLastScan = !!j?.has_data;
+
+    if (viewBtn) {
+      if (hasLastScan) {
+        viewBtn.removeAttribute('disabled');
+        viewBtn.title = 'Open Dashboard to view the most recent results';
+      } else {
+        viewBtn.setAttribute('disabled', 'true');
+        viewBtn.title = 'No previous scan yet — run a scan first';
+      }
+    }
+
+    if (hasLastScan) {
+      if (eventsEl && typeof j.event_count !== 'undefined') eventsEl.textContent = j.event_count;
+      if (failEl   && typeof j.failed_count  !== 'undefined') failEl.textContent  = j.failed_count;
+    } else {
+      if (eventsEl) eventsEl.textContent = '—';
+      if (failEl)   failEl.textContent   = '—';
+    }
+
+    // Mode-aware gating for nav/buttons that require a last scan
+    setRequiresScanButtonsEnabled(hasLastScan, { last_time: j?.completed_at }, mode);
+    setRequiresScanLinksEnabled(hasLastScan, mode);
+  }
+
   // --- actions ---
   async function startNewScan() {
     if (getMode() === 'sample') return; // extra guard
@@ -177,6 +180,11 @@
     }
   });
 
+  // Counts + gating pushed by the server after each scan (see site.js)
+  window.addEventListener('occt:scan-completed', (e) => {
+    if (e.detail?.source === getMode()) applyLastScan(e.detail, getMode());
+  });
+
   // Feature fades (unchanged)
   const observer = new IntersectionObserver(entries => {
     entries.forEach(entry => {
@@ -21,17 +21,14 @@
 
 
   try {
-    const [dashRes, auditRes, rulesRes] = await Promise.all([
-      fetch(api('/dashboard')),
-      fetch(api('/audit')),
-      fetch(api('/rules')).catch(() => ({ ok:false }))
-    ]);
-    if (!dashRes.ok)  throw new Error('Dashboard HTTP ' + dashRes.status);
-    if (!auditRes.ok) throw new Error('Audit HTTP ' + auditRes.status);
-
-    const dash  = await dashRes.json();
-    const audit = await auditRes.json();
-    const rules = rulesRes && rulesRes.ok ? await rulesRes.json() : [];
+    // One request for dashboard + audit + rules (same data version)
+    const bootRes = await fetch(api('/bootstrap?include=dashboard,audit,rules'));
+    if (!bootRes.ok) throw new Error('Bootstrap HTTP ' + bootRes.status);
+
+    const boot  = await bootRes.json();
+    const dash  = boot.dashboard || {};
+    const audit = Array.isArray(boot.audit) ? boot.audit : [];
+    const rules = Array.isArray(boot.rules) ? boot.rules : [];
 
     const sevMap = new Map(
       Array.isArray(rules)
@@ -15,15 +15,19 @@
     catch { return iso; }
   }
 
-  async function refreshHint() {
+  function renderHint(j) {
     const hint = document.getElementById('lastScanHeaderHint');
     if (!hint) return;
+    const textEl = hint.querySelector('.text');
+    if (textEl) textEl.textContent = 'Last scan: ' + (j?.has_data ? fmt(j.completed_at) : '—');
+    hint.hidden = false;
+  }
+
+  async function refreshHint() {
+    if (!document.getElementById('lastScanHeaderHint')) return;
     try {
       const res = await fetch(pageApi('/last-scan'), { headers: { 'X-OCCT-No-Loader': '1' } });
-      const j = await res.json();
-      const textEl = hint.querySelector('.text');
-      if (textEl) textEl.textContent = 'Last scan: ' + (j?.has_data ? fmt(j.completed_at) : '—');
-      hint.hidden = false;
+      renderHint(await res.json());
     } catch (_) {
 
     }
@@ -33,4 +37,8 @@
   window.addEventListener('storage', (e) => {
     if (e.key === K.MODE) refreshHint();
   });
+  // Pushed by the server after each scan (see site.js); no re-fetch needed.
+  window.addEventListener('occt:scan-completed', (e) => {
+    if (e.detail?.source === getMode()) renderHint(e.detail);
+  });
 })();
@@ -48,21 +48,14 @@
     return s;
   }
 
-  async function fetchAudit() {
-    const res = await fetch(api('/audit'));
+  // Audit rows + rules in one request (same data version)
+  async function fetchBootstrap() {
+    const res = await fetch(api('/bootstrap?include=audit,rules'));
     if (!res.ok) throw new Error('HTTP ' + res.status);
-    return res.json();
-  }
-
-  async function fetchRulesMap() {
-    try {
-      const res = await fetch(api('/rules'));
-      if (!res.ok) return new Map();
-      const list = await res.json();
-      return new Map(list.map(r => [ (r.title || r.id || '').trim(), { remediation: r.remediation || '', severity: (r.severity || '').toLowerCase() } ]));
-    } catch {
-      return new Map();
-    }
+    const boot = await res.json();
+    const list = Array.isArray(boot.rules) ? boot.rules : [];
+    const rulesMap = new Map(list.map(r => [ (r.title || r.id || '').trim(), { remediation: r.remediation || '', severity: (r.severity || '').toLowerCase() } ]));
+    return [Array.isArray(boot.audit) ? boot.audit : [], rulesMap];
   }
 
   function chooseRemediation(row, rulesMap) {
@@ -82,7 +75,7 @@
   };
 
   try {
-    const [rows, rulesMap] = await Promise.all([fetchAudit(), fetchRulesMap()]);
+    const [rows, rulesMap] = await fetchBootstrap();
 
     const failed = rows
       .filter(r => (r.outcome || '').toLowerCase() === 'failed')
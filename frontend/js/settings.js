@@ -326,6 +326,18 @@
     window.location.replace('/logout');
   }
 
+  // Header + scan gating pushed by the server after each scan (see site.js)
+  window.addEventListener('occt:scan-completed', (e) => {
+    const j = e.detail || {};
+    if (j.source !== getModeLocal()) return;
+    const hint = document.getElementById('lastScanHeaderHint');
+    if (hint) {
+      setText(hint.querySelector('.text') || hint, 'Last scan: ' + (j.has_data ? fmt(j.completed_at) : '—'));
+      hint.hidden = false;
+    }
+    setScanControlsEnabled(!!j.has_data, { last_time: j.completed_at }, j.source);
+  });
+
   window.addEventListener('storage', (e) => {
     if (e.key === K.MODE) {
       updateRescanState();
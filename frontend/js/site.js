@@ -176,6 +176,20 @@
     return true; // SSE enabled everywhere unless explicitly disabled
   }
 
+  // Optional server-side stream filter so the server only sends what this page shows.
+  // e.g. <meta name="occt-sse-filter" content="min_severity=critical"> on a wall display,
+  // or localStorage 'occt.sseFilter' = 'min_severity=high&host=SRV-DC01'.
+  const SSE_FILTER_KEYS = ['min_severity', 'rule_id', 'host', 'account'];
+  function sseFilterQuery() {
+    const meta = d.querySelector('meta[name="occt-sse-filter"]');
+    const raw = (meta && meta.getAttribute('content')) || get('occt.sseFilter', '') || '';
+    const src = new URLSearchParams(raw);
+    const out = new URLSearchParams();
+    SSE_FILTER_KEYS.forEach(k => src.getAll(k).forEach(v => { if (v) out.append(k, v); }));
+    const qs = out.toString();
+    return qs ? `?${qs}` : '';
+  }
+
   // ====== Live SSE hookup (single instance, fresh-only) ======
   function initSSE() {
     if (w.__occtSSEInit) return;               // single initializer
@@ -185,7 +199,7 @@
     if (mode !== 'live') return;               // only listen when in LIVE mode
     if (!pageWantsSSE()) return;               // allow per-page opt-out
 
-    const url = api('/stream');                // /api/live/stream
+    const url = api('/stream') + sseFilterQuery(); // /api/live/stream[?filters]
     let es;
     try {
       es = new EventSource(url, { withCredentials: false });
@@ -212,6 +226,22 @@
       // keepalive from server; nothing to do
     });
 
+    // State deltas pushed after scans/ingest/detections commit.
+    // Re-dispatched as window events ('occt:scan-completed', ...) so pages update
+    // from the payload instead of polling /last-scan, /dashboard or /detections.
+    w.occt.deltas = w.occt.deltas || {};
+    ['scan-completed', 'compliance-changed', 'detections-count', 'detections-triaged'].forEach((kind) => {
+      es.addEventListener(kind, (evt) => {
+        try {
+          const data = JSON.parse(evt.data || '{}');
+          w.occt.deltas[kind] = data;
+          w.dispatchEvent(new CustomEvent(`occt:${kind}`, { detail: data }));
+        } catch (e) {
+          console.warn(`Bad ${kind} payload`, e);
+        }
+      });
+    });
+
     es.addEventListener('detection', (evt) => {
       try {
         const data = JSON.parse(evt.data || '{}');
@@ -0,0 +1,88 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+# backend.app builds the app (and its SQLite DB) on import: point it at a scratch
+# instance dir first and keep background workers off.
+os.environ["OCCT_INSTANCE_PATH"] = tempfile.mkdtemp(prefix="occt-test-")
+os.environ.setdefault("OCCT_DETECTIONS_LIVE", "0")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from backend.app import app as _app  # noqa: E402
+from backend.models import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    return _app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def session(app):
+    """db.session inside an app context; the live source's rows are removed afterwards."""
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+        for table in ("audit_events", "security_events", "detections"):
+            db.session.execute(db.text(f"DELETE FROM {table} WHERE source = 'live'"))
+        db.session.commit()
+
+
+@pytest.fixture
+def churn_audit(session):
+    """
+    churn(check): seed live audit_events, then update every trigger-watched column and
+    delete rows, calling check() after each step - for comparing trigger-maintained
+    tables with the query they replace.
+    """
+    import datetime as dt
+    import random
+    from sqlalchemy import text
+    from backend.db_util import insert_audit_events
+
+    def churn(check):
+        rnd = random.Random(7)
+        t0 = dt.datetime(2026, 3, 1, 8, 0, 0)
+        rows = [dict(time=t0 + dt.timedelta(hours=rnd.randrange(96), seconds=i),
+                     category=rnd.choice(["Security", "System", "Account"]),
+                     control=f"C{rnd.randrange(12)}", outcome=rnd.choice(["Failed", "Passed", "Info"]),
+                     account=rnd.choice(["alice", "bob", "", "HOST-1"]), description=f"row {i}",
+                     source="live", host=rnd.choice(["HOST-1", "HOST-2", "", None]))
+                for i in range(300)]
+        insert_audit_events(rows)
+        session.commit()
+        check()
+        ids = [r[0] for r in session.execute(text("SELECT id FROM audit_events WHERE source = 'live'"))]
+        updates = [
+            "outcome = CASE outcome WHEN 'Failed' THEN 'Passed' ELSE 'Failed' END",
+            "time = datetime(time, '+1 day')",
+            "category = 'Moved'",
+            "control = 'C99'",
+            "account = 'carol'",
+            "host = 'HOST-9'",
+            "source = 'live', host = NULL",
+        ]
+        for sql in updates:
+            chosen = rnd.sample(ids, 40)
+            session.execute(text(f"UPDATE audit_events SET {sql} WHERE id IN ({', '.join(map(str, chosen))})"))
+            session.commit()
+            check()
+        for _ in range(3):
+            gone = rnd.sample(ids, 50)
+            ids = [i for i in ids if i not in gone]
+            session.execute(text(f"DELETE FROM audit_events WHERE id IN ({', '.join(map(str, gone))})"))
+            session.commit()
+            check()
+        session.execute(text("DELETE FROM audit_events WHERE source = 'live'"))
+        session.commit()
+        check()
+
+    return churn
@@ -0,0 +1,23 @@
+# tests/test_audit_current.py
+"""audit_current stays equal to the newest audit_events row per (source, host, control)."""
+from sqlalchemy import text
+
+BRUTE_FORCE = """
+    SELECT source, host, control, outcome, time, id FROM (
+        SELECT COALESCE(source, 'sample') AS source, COALESCE(host, '') AS host,
+               COALESCE(control, '') AS control, COALESCE(outcome, '') AS outcome, time, id,
+               ROW_NUMBER() OVER (
+                   PARTITION BY COALESCE(source, 'sample'), COALESCE(host, ''), COALESCE(control, '')
+                   ORDER BY time DESC, id DESC) AS rn
+        FROM audit_events WHERE source = 'live')
+    WHERE rn = 1
+"""
+
+
+def test_current_matches_row_number(session, churn_audit):
+    def check():
+        current = session.execute(text(
+            "SELECT source, host, control, outcome, time, audit_id FROM audit_current WHERE source = 'live'")).all()
+        assert sorted(current) == sorted(session.execute(text(BRUTE_FORCE)).all())
+
+    churn_audit(check)
@@ -0,0 +1,19 @@
+# tests/test_audit_rollup.py
+"""audit_rollup_daily stays equal to a GROUP BY over audit_events."""
+from sqlalchemy import text
+
+BRUTE_FORCE = """
+    SELECT COALESCE(source, 'sample'), COALESCE(host, ''), substr(time, 1, 10),
+           COALESCE(category, ''), COALESCE(outcome, ''), COUNT(*)
+    FROM audit_events WHERE source = 'live' GROUP BY 1, 2, 3, 4, 5
+"""
+
+
+def test_daily_rollup_matches_group_by(session, churn_audit):
+    def check():
+        rolled = session.execute(text(
+            "SELECT source, host, day, category, outcome, n FROM audit_rollup_daily "
+            "WHERE source = 'live' AND n <> 0")).all()
+        assert sorted(rolled) == sorted(session.execute(text(BRUTE_FORCE)).all())
+
+    churn_audit(check)
@@ -0,0 +1,54 @@
+# tests/test_audit_unique.py
+"""ux_audit_events_unique stands in for the readers' old GROUP BY dedupe."""
+import datetime as dt
+
+import pytest
+from sqlalchemy import exc, text
+
+from backend.db_util import audit_rows_unique, insert_audit_events
+
+KEY = "source, time, category, control, outcome, account, description"
+T0 = dt.datetime(2026, 3, 1, 8, 0, 0)
+
+
+def _row(i, **kw):
+    row = dict(time=T0 + dt.timedelta(minutes=i % 5), category="Security", control=f"C{i % 7}",
+               outcome="Failed" if i % 3 else "Passed", account=f"HOST-{i % 4}",
+               description=f"check {i % 7}", source="live", host=f"HOST-{i % 4}")
+    row.update(kw)
+    return row
+
+
+def _brute_force(session):
+    return session.execute(text(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM audit_events WHERE source = 'live' GROUP BY {KEY})")).scalar()
+
+
+def _rows(session):
+    return session.execute(text("SELECT COUNT(*) FROM audit_events WHERE source = 'live'")).scalar()
+
+
+def test_unique_rows_match_group_by(session, client):
+    assert audit_rows_unique()
+    rows = [_row(i) for i in range(60)]
+    inserted = insert_audit_events(rows + rows[:20])          # the repeats are skipped
+    session.commit()
+    assert inserted == _brute_force(session) == _rows(session)
+
+    session.execute(text("UPDATE audit_events SET outcome = 'Passed' WHERE source = 'live' AND control = 'C1'"))
+    session.execute(text("DELETE FROM audit_events WHERE source = 'live' AND control = 'C2'"))
+    session.commit()
+    assert _rows(session) == _brute_force(session)
+
+    # readers skip the GROUP BY: the list has exactly one row per unique key
+    listed = client.get("/api/live/audit?limit=5000").get_json()
+    assert len(listed) == _brute_force(session)
+
+
+def test_update_into_a_duplicate_is_rejected(session):
+    insert_audit_events([_row(0), _row(0, control="other")])
+    session.commit()
+    with pytest.raises(exc.IntegrityError):
+        session.execute(text("UPDATE audit_events SET control = 'C0' WHERE source = 'live' AND control = 'other'"))
+    session.rollback()
+    assert _rows(session) == _brute_force(session) == 2
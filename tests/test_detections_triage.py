@@ -0,0 +1,80 @@
+# tests/test_detections_triage.py
+"""POST /detections/status: input checks, the UPDATE, and its write-path triggers."""
+import pytest
+from sqlalchemy import text
+
+URL = "/api/live/detections/status"
+
+
+@pytest.fixture
+def detections(session):
+    """Ten live detections (ids returned): rules a/b alternate, every third one is high."""
+    ids = []
+    for i in range(10):
+        ids.append(session.execute(text("""
+            INSERT INTO detections ("when", rule_id, severity, summary, evidence, source, host, status)
+            VALUES (:t, :rule, :sev, 'seeded', '{}', 'live', 'HOST-1', 'new') RETURNING id
+        """), {"t": f"2026-03-01 08:{i:02d}:00.000000", "rule": "ab"[i % 2],
+               "sev": "high" if i % 3 == 0 else "low"}).scalar())
+    session.commit()
+    return ids
+
+
+def _statuses(session):
+    return dict(session.execute(text("SELECT id, status FROM detections WHERE source = 'live'")).all())
+
+
+def _version(session, source="live"):
+    return session.execute(text(
+        "SELECT version FROM data_versions WHERE scope = 'detections' AND source = :s"), {"s": source}).scalar() or 0
+
+
+@pytest.mark.parametrize("ids", ["12", {"5": 1}, [True], [1.5], ["3"], 7])
+def test_bad_ids_are_rejected(session, client, detections, ids):
+    before = _statuses(session)
+    resp = client.post(URL, json={"status": "ack", "ids": ids})
+    assert resp.status_code == 400
+    assert resp.get_json()["error"] == "bad_ids"
+    assert _statuses(session) == before
+
+
+def test_bad_status_and_empty_filter(client, detections):
+    assert client.post(URL, json={"status": "done", "ids": detections}).get_json()["error"] == "bad_status"
+    assert client.post(URL, json=["ack"]).status_code == 400
+    resp = client.post(URL, json={"status": "ack", "filter": {}})
+    assert resp.status_code == 400 and resp.get_json()["error"] == "empty_filter"
+
+
+def test_triage_by_ids_and_by_filter(session, client, detections):
+    v0 = _version(session)
+    body = client.post(URL, json={"status": "ack", "ids": detections[:4] + [10 ** 9]}).get_json()
+    assert body["updated"] == 4
+    assert _version(session) == v0 + 4                  # one data_versions bump per changed row
+
+    # rows already at the target status are skipped
+    assert client.post(URL, json={"status": "ack", "ids": detections[:4]}).get_json()["updated"] == 0
+    assert _version(session) == v0 + 4
+
+    body = client.post(URL, json={"status": "muted", "filter": {"severity": "high"}}).get_json()
+    assert body["updated"] == 4 and body["by"] == {"severity": "high"}
+    statuses = _statuses(session)
+    assert [statuses[i] for i in detections] == [
+        "muted", "ack", "ack", "muted", "new", "new", "muted", "new", "new", "muted"]
+
+    # query args work like GET /detections filters
+    assert client.post(URL + "?rule=b", json={"status": "new"}).get_json()["updated"] == 3
+
+
+def test_moving_source_bumps_both_versions(session, detections):
+    live, sample = _version(session), _version(session, "sample")
+    session.execute(text("UPDATE detections SET source = 'sample' WHERE id = :id"), {"id": detections[0]})
+    session.commit()
+    assert (_version(session), _version(session, "sample")) == (live + 1, sample + 1)
+    session.execute(text("DELETE FROM detections WHERE id = :id"), {"id": detections[0]})
+    session.commit()
+
+
+def test_status_index_dropped(session):
+    names = {r[0] for r in session.execute(text("SELECT name FROM sqlite_master WHERE tbl_name = 'detections'"))}
+    assert "ix_detections_status" not in names
+    assert not {"trg_detections_version_update"} & names
@@ -0,0 +1,20 @@
+# tests/test_failed_rollups.py
+"""audit_failed_controls / audit_failed_accounts stay equal to GROUP BYs over Failed rows."""
+from sqlalchemy import text
+
+BRUTE_FORCE = {
+    "audit_failed_controls": ("COALESCE(category, ''), COALESCE(control, '')", "category, control"),
+    "audit_failed_accounts": ("COALESCE(account, '')", "account"),
+}
+
+
+def test_failed_rollups_match_group_by(session, churn_audit):
+    def check():
+        for table, (keys, cols) in BRUTE_FORCE.items():
+            rolled = session.execute(text(f"SELECT {cols}, n FROM {table} WHERE source = 'live'")).all()
+            expected = session.execute(text(
+                f"SELECT {keys}, COUNT(*) FROM audit_events WHERE source = 'live' AND outcome = 'Failed' "
+                f"GROUP BY {keys}")).all()
+            assert sorted(rolled) == sorted(expected), table
+
+    churn_audit(check)
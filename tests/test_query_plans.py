@@ -0,0 +1,10 @@
+# tests/test_query_plans.py
+"""The EXPLAIN QUERY PLAN check over every read endpoint passes."""
+from backend import query_plans
+
+
+def test_no_full_scans(app, capsys):
+    status = query_plans.main([])
+    out = capsys.readouterr().out
+    assert status == 0, out
+    assert "0 with full scans" in out
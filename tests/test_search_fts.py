@@ -0,0 +1,72 @@
+# tests/test_search_fts.py
+"""q= search through the FTS5 indexes, kept in step by triggers, and the LIKE fallback."""
+import pytest
+from sqlalchemy import text
+
+from backend import search_fts
+from backend.resp_cache import cache_clear
+from backend.db_util import fts_ready
+
+T0 = "2026-03-01 08:00:00.000000"                                # stored DateTime format
+
+# table -> (list endpoint, INSERT for one live row with :word in its searchable text, text column)
+CASES = {
+    "audit_events": ("/api/live/audit", """
+        INSERT INTO audit_events (time, category, control, outcome, account, description, source, host)
+        VALUES (:t, 'Security', 'Password policy', 'Failed', 'HOST-1', :word, 'live', 'HOST-1')""",
+        "description"),
+    "security_events": ("/api/live/events", """
+        INSERT INTO security_events (record_id, time, event_id, channel, provider, message, source, host)
+        VALUES (1, :t, 4625, 'Security', 'Microsoft-Windows-Security-Auditing', :word, 'live', 'HOST-1')""",
+        "message"),
+    "detections": ("/api/live/detections", """
+        INSERT INTO detections ("when", rule_id, severity, summary, evidence, source, host, status)
+        VALUES (:t, 'brute', 'high', :word, '{}', 'live', 'HOST-1', 'new')""",
+        "summary"),
+}
+
+
+def _hits(client, path, q):
+    body = client.get(path, query_string={"q": q, "limit": 100}).get_json()
+    return len(body if isinstance(body, list) else body["items"])
+
+
+def _insert_update_delete(session, client, table):
+    path, insert, col = CASES[table]
+    session.execute(text(insert), {"t": T0, "word": "Quarantined workstation"})
+    session.commit()
+    assert _hits(client, path, "quarant") == 1
+
+    session.execute(text(f"UPDATE {table} SET {col} = 'Released workstation' WHERE source = 'live'"))
+    session.commit()
+    assert _hits(client, path, "quarant") == 0
+    assert _hits(client, path, "releas") == 1
+
+    session.execute(text(f"DELETE FROM {table} WHERE source = 'live'"))
+    session.commit()
+    assert _hits(client, path, "releas") == 0
+
+
+@pytest.mark.parametrize("table", list(CASES))
+def test_fts_follows_insert_update_delete(session, client, table):
+    assert fts_ready(search_fts.FTS_INDEXES[table][0])
+    _insert_update_delete(session, client, table)
+    path, insert, _ = CASES[table]
+    session.execute(text(insert), {"t": T0, "word": "Quarantined workstation"})
+    session.commit()
+    assert _hits(client, path, "workst quarant") == 1              # every word, as a prefix
+    assert _hits(client, path, "uarantined") == 0                  # not a substring
+
+
+@pytest.mark.parametrize("table", list(CASES))
+def test_like_fallback(session, client, table, monkeypatch):
+    monkeypatch.setattr(search_fts, "fts_ready", lambda name: False)
+    _insert_update_delete(session, client, table)
+    path, insert, _ = CASES[table]
+    session.execute(text(insert), {"t": T0, "word": "Service stopped"})
+    session.commit()
+    assert _hits(client, path, "ervice") == 1                       # substring, unlike FTS
+    monkeypatch.undo()
+    cache_clear()                                                   # same data version, same URL
+    assert _hits(client, path, "ervice") == 0
+    assert _hits(client, path, "servi") == 1